@@ -27,30 +27,31 @@
 """The main function of Nikola."""
 
 import importlib.util
+import json
 import os
 import shutil
 import sys
 import textwrap
 import traceback
 import doit.cmd_base
-from collections import defaultdict
+from collections import Counter, defaultdict
 
 from blinker import signal
 from doit.cmd_auto import Auto as DoitAuto
-from doit.cmd_base import TaskLoader, _wrap
+from doit.cmd_base import DoitCmdBase, TaskLoader, _wrap
 from doit.cmd_clean import Clean as DoitClean
 from doit.cmd_completion import TabCompletion
 from doit.cmd_help import Help as DoitHelp
 from doit.cmd_run import Run as DoitRun
 from doit.doit_cmd import DoitMain
 from doit.loader import generate_tasks
-from doit.reporter import ExecutedOnlyReporter
+from doit.reporter import ExecutedOnlyReporter, ZeroReporter
 
 from . import __version__
 from .nikola import Nikola
 from .plugin_categories import Command
 from .log import configure_logging, LOGGER, ColorfulFormatter, LoggingMode
-from .utils import get_root_dir, req_missing, sys_decode
+from .utils import changed_config_keys, config_changed, get_root_dir, req_missing, set_highlight_cache, sys_decode
 
 try:
     import readline  # NOQA
@@ -158,13 +159,39 @@ def main(args=None):
     config['__colorful__'] = colorful
     config['__invariant__'] = invariant
     config['__quiet__'] = quiet
+    config['__profile__'] = len(args) > 0 and args[0] == 'build' and '--profile' in args
     config['__configuration_filename__'] = conf_filename
     config['__cwd__'] = original_cwd
     site = Nikola(**config)
     DN = DoitNikola(site, quiet)
     if _RETURN_DOITNIKOLA:
         return DN
-    _ = DN.run(oargs)
+    try:
+        _ = DN.run(oargs)
+    finally:
+        # Do not leak this site's highlight cache into later sites
+        set_highlight_cache(None)
+
+    if site.filter_cache is not None and (not args or args[0] == 'build'):
+        cache = site.filter_cache
+        if cache.hits or cache.misses:
+            LOGGER.info('Filter cache: {0} hits, {1} misses'.format(cache.hits, cache.misses))
+        removed = cache.prune()
+        if removed:
+            LOGGER.info('Filter cache: removed {0} least recently used entries'.format(removed))
+
+    # Only walk the shortcode cache if this build added entries to it
+    if site._get_shortcode_cache() is not None and site.shortcode_cache.writes and (not args or args[0] == 'build'):
+        removed = site.shortcode_cache.prune()
+        if removed:
+            LOGGER.info('Shortcode cache: removed {0} least recently used entries'.format(removed))
+
+    if site.html_minify_stats.pages and (not args or args[0] == 'build'):
+        LOGGER.info('HTML minifier: {0}'.format(site.html_minify_stats.summary()))
+
+    if site.profiler.enabled:
+        json_path, html_path = site.profiler.write_report(os.path.join(site.config['CACHE_FOLDER'], 'profile'))
+        LOGGER.info('Build profile written to {0} and {1}'.format(json_path, html_path))
 
     if site.invariant:
         freeze.stop()
@@ -218,6 +245,15 @@ class Build(DoitRun):
                 'help': "Generate invariant output (for testing only!).",
             }
         )
+        opts.append(
+            {
+                'name': 'profile',
+                'long': 'profile',
+                'default': False,
+                'type': bool,
+                'help': "Record where build time goes, and write a report into CACHE_FOLDER/profile.",
+            }
+        )
         opts.append(
             {
                 'name': 'quiet',
@@ -245,6 +281,104 @@ class Clean(DoitClean):
         return super(Clean, self).clean_tasks(tasks, dryrun, *a)
 
 
+class ExplainRebuild(DoitCmdBase):
+    """Explain why tasks would be rebuilt."""
+
+    name = 'explain-rebuild'
+    doc_purpose = "explain why tasks would be rebuilt"
+    doc_usage = "[TASK ...]"
+    doc_description = (
+        "List the tasks the next build would run, with the changed settings, "
+        "files and missing targets that caused each of them to be out of date, "
+        "and summarize the most common causes. Changed settings can only be "
+        "named if the previous build ran with RECORD_REBUILD_CAUSES = True.")
+    cmd_options = (
+        {
+            'name': 'top',
+            'long': 'top',
+            'type': int,
+            'default': 10,
+            'help': "Number of top invalidators to show. [default: %(default)s]",
+        },
+        {
+            'name': 'summary',
+            'short': 's',
+            'long': 'summary',
+            'type': bool,
+            'default': False,
+            'help': "Only show the top invalidators.",
+        },
+    )
+
+    def _execute(self, pos_args, top=10, summary=False):
+        """Explain why tasks would be rebuilt."""
+        recorder = self.loader.nikola.config_changed_inputs
+        # Record the current inputs, so the next run can compare against them
+        config_changed.set_recorder(recorder)
+        tasks = {task.name: task for task in self.task_list}
+        invalidators = Counter()
+        outdated = 0
+        for task in self.task_list:
+            # Skip group tasks
+            if not task.actions:
+                continue
+            if pos_args and not any(task.name.startswith(arg) for arg in pos_args):
+                continue
+            status = self.dep_manager.get_status(task, tasks, get_log=True)
+            if status.status == 'up-to-date':
+                continue
+            outdated += 1
+            causes = self._get_causes(task, status.reasons, recorder)
+            invalidators.update(set(causes))
+            if not summary:
+                self.outstream.write('{0}\n'.format(task.name))
+                for cause in causes:
+                    self.outstream.write('  * {0}\n'.format(cause))
+
+        self.outstream.write('{0} tasks out of date.\n'.format(outdated))
+        if invalidators:
+            self.outstream.write('Top invalidators:\n')
+            for cause, count in invalidators.most_common(top):
+                self.outstream.write('{0:8d}  {1}\n'.format(count, cause))
+        return 0
+
+    def _get_causes(self, task, reasons, recorder):
+        """Describe the reasons why task is out of date."""
+        causes = []
+        if reasons['has_no_dependencies']:
+            causes.append('task has no dependencies')
+        if reasons['checker_changed']:
+            causes.append('file_dep checker changed from {0} to {1}'.format(*reasons['checker_changed']))
+        for utd, _, _ in reasons['uptodate_false']:
+            if isinstance(utd, config_changed):
+                causes.extend(self._get_config_causes(task, utd, recorder))
+            else:
+                causes.append('uptodate check {0} failed'.format(getattr(utd, '__name__', type(utd).__name__)))
+        sentences = (
+            ('missing_target', 'missing target: {0}'),
+            ('changed_file_dep', 'file changed: {0}'),
+            ('missing_file_dep', 'file missing: {0}'),
+            ('added_file_dep', 'file dependency added: {0}'),
+            ('removed_file_dep', 'file dependency removed: {0}'),
+        )
+        for reason, sentence in sentences:
+            for item in reasons.get(reason, []):
+                causes.append(sentence.format(item))
+        return causes
+
+    def _get_config_causes(self, task, utd, recorder):
+        """Name the keys which changed in the inputs of a config_changed check."""
+        old_digest = self.dep_manager.get_values(task.name).get(utd.identifier)
+        if old_digest is None:
+            return ['{0}: no previous inputs'.format(utd.identifier)]
+        old_data = recorder.get(old_digest)
+        new_data = recorder.get(utd._calc_digest())
+        if old_data is None or new_data is None:
+            return ['{0}: changed (previous inputs not recorded)'.format(utd.identifier)]
+        return ['{0}: {1}'.format(utd.identifier, key)
+                for key in changed_config_keys(json.loads(old_data), json.loads(new_data))]
+
+
 # Nikola has its own "auto" commands that uses livereload.
 # Expose original doit "auto" command as "doit_auto".
 DoitAuto.name = 'doit_auto'
@@ -263,22 +397,32 @@ class NikolaTaskLoader(TaskLoader):
         if self.quiet:
             DOIT_CONFIG = {
                 'verbosity': 0,
-                'reporter': 'zero',
+                'reporter': ZeroReporter,
             }
         else:
             DOIT_CONFIG = {
                 'reporter': ExecutedOnlyReporter,
                 'outfile': sys.stderr,
             }
+        profiler = self.nikola.profiler
+        if profiler.enabled:
+            DOIT_CONFIG['reporter'] = profiler.reporter_class(ZeroReporter if self.quiet else ExecutedOnlyReporter)
         DOIT_CONFIG['default_tasks'] = ['render_site', 'post_render']
         DOIT_CONFIG.update(self.nikola._doit_config)
         try:
-            tasks = generate_tasks(
-                'render_site',
-                self.nikola.gen_tasks('render_site', "Task", 'Group of tasks to render the site.'))
-            latetasks = generate_tasks(
-                'post_render',
-                self.nikola.gen_tasks('post_render', "LateTask", 'Group of tasks to be executed after site is rendered.'))
+            with profiler.span('gen_tasks'):
+                tasks = generate_tasks(
+                    'render_site',
+                    self.nikola.gen_tasks('render_site', "Task", 'Group of tasks to render the site.'))
+                latetasks = generate_tasks(
+                    'post_render',
+                    self.nikola.gen_tasks('post_render', "LateTask", 'Group of tasks to be executed after site is rendered.'))
+            profiler.tasks_generated(tasks + latetasks)
+            if cmd.name == 'build':
+                self.nikola.target_list.write(tasks + latetasks)
+                if isinstance(DOIT_CONFIG.get('reporter'), type):
+                    self.nikola.output_manifest.start(tasks + latetasks)
+                    DOIT_CONFIG['reporter'] = self.nikola.output_manifest.reporter_class(DOIT_CONFIG['reporter'])
             signal('initialized').send(self.nikola)
         except Exception:
             LOGGER.error('Error loading tasks. An unhandled exception occurred.')
@@ -293,7 +437,7 @@ class DoitNikola(DoitMain):
     """Nikola-specific implementation of DoitMain."""
 
     # overwite help command
-    DOIT_CMDS = list(DoitMain.DOIT_CMDS) + [Help, Build, Clean, DoitAuto]
+    DOIT_CMDS = list(DoitMain.DOIT_CMDS) + [Help, Build, Clean, DoitAuto, ExplainRebuild]
     TASK_LOADER = NikolaTaskLoader
 
     def __init__(self, nikola, quiet=False):
@@ -37,11 +37,13 @@ import shutil
 import shlex
 import subprocess
 import tempfile
-from functools import wraps
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+from inspect import signature
 
 import lxml
-import requests
 
+from . import minifiers
 from .utils import req_missing, LOGGER, slugify
 
 try:
@@ -63,6 +65,28 @@ class _ConfigurableFilter(object):
         return f
 
 
+def _cacheable(f):
+    """Mark filter f as cacheable.
+
+    The output of cacheable filters only depends on the contents of the
+    file and their arguments, so it can be stored in the filter cache.
+    """
+    f.nikola_filter_cacheable = True
+    return f
+
+
+def _batchable(options, ok_returncodes=(0,)):
+    """Mark a filter which runs its executable on a file in place as batchable.
+
+    The executable, followed by options, must accept any number of files,
+    and exit with one of ok_returncodes if it could process all of them.
+    """
+    def decorator(f):
+        f.nikola_filter_batch = (options, ok_returncodes)
+        return f
+    return decorator
+
+
 def apply_to_binary_file(f):
     """Apply a filter to a binary file.
 
@@ -144,6 +168,115 @@ def runinplace(command, infile):
             shutil.rmtree(tmpdir)
 
 
+def runbatch(command, files, chunk_size=50, ok_returncodes=(0,), workers=None):
+    """Run a command in-place on many files, in chunks.
+
+    command is a string or a list, the files of each chunk are appended to
+    it. Chunks run in parallel, in up to workers threads (by default, the
+    number of CPUs). If a chunk fails, its files are processed one by one,
+    to tell which ones failed.
+
+    Return a list of (file, command output) for the files which failed.
+
+    Example usage:
+
+    runbatch("optipng -quiet", ["a.png", "b.png"])
+    """
+    if not isinstance(command, list):
+        command = shlex.split(command)
+
+    def run(chunk):
+        proc = subprocess.run(command + chunk, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        if proc.returncode in ok_returncodes:
+            return []
+        if len(chunk) == 1:
+            return [(chunk[0], proc.stdout.decode('utf-8', 'replace'))]
+        failed = []
+        for fname in chunk:
+            failed.extend(run([fname]))
+        return failed
+
+    chunks = [files[i:i + chunk_size] for i in range(0, len(files), chunk_size)]
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        for result in executor.map(run, chunks):
+            failed.extend(result)
+    return failed
+
+
+class BatchedFilter(object):
+    """A batchable filter, run on all its files by the filter_batches task.
+
+    Until that task is generated, apply_filters adds targets to the batch
+    instead of filtering them one by one. Later targets (and calls to the
+    filter) are filtered one by one.
+    """
+
+    def __init__(self, f, kwargs=None, chunk_size=50, cache=None):
+        """Batch filter f (marked with _batchable), configured with kwargs, caching output in cache."""
+        self.filter = f
+        self.kwargs = kwargs or {}
+        self.chunk_size = chunk_size
+        self.cache = cache
+        self.targets = set()
+        self.closed = False
+        self.__name__ = f.__name__
+        options, self.ok_returncodes = f.nikola_filter_batch
+        executable = self.kwargs.get('executable') or signature(f).parameters['executable'].default
+        self.command = shlex.split(executable) + shlex.split(options)
+        configured = partial(f, **self.kwargs) if self.kwargs else f
+        self._single = cache.wrap(configured) if cache is not None else configured
+        self._repr = repr(configured)
+
+    def __repr__(self):
+        """Return the representation of the filter, so tasks stay up to date when batching is turned on or off."""
+        return self._repr
+
+    def __call__(self, infile):
+        """Filter a single file."""
+        return self._single(infile)
+
+    def add(self, target):
+        """Add target to the batch, return False if the batch is already closed."""
+        if self.closed:
+            return False
+        self.targets.add(target)
+        return True
+
+    def run(self, files):
+        """Filter files, return the list of files which failed."""
+        pending = []
+        keys = {}
+        for fname in files:
+            if os.path.islink(fname):
+                continue
+            if self.cache is not None:
+                with open(fname, 'rb') as inf:
+                    data = inf.read()
+                key = self.cache.key(self._single.identity, data)
+                output = self.cache.get(key)
+                if output is not None:
+                    self.cache.hits += 1
+                    if output != data:
+                        with open(fname, 'wb') as outf:
+                            outf.write(output)
+                    continue
+                self.cache.misses += 1
+                keys[fname] = key
+            pending.append(fname)
+
+        failed = runbatch(self.command, pending, self.chunk_size, self.ok_returncodes)
+        for fname, output in failed:
+            LOGGER.error("{0} failed on {1}: {2}".format(self.__name__, fname, output.strip()))
+        failed = set(fname for fname, _ in failed)
+        for fname, key in keys.items():
+            if fname not in failed:
+                with open(fname, 'rb') as inf:
+                    self.cache.set(key, inf.read())
+        return sorted(failed)
+
+
+@_cacheable
 @_ConfigurableFilter(executable='YUI_COMPRESSOR_EXECUTABLE')
 def yui_compressor(infile, executable=None):
     """Run YUI Compressor on a file."""
@@ -165,28 +298,48 @@ def yui_compressor(infile, executable=None):
     return runinplace('{} --nomunge %1 -o %2'.format(yuicompressor), infile)
 
 
+@_cacheable
 @_ConfigurableFilter(executable='CLOSURE_COMPILER_EXECUTABLE')
 def closure_compiler(infile, executable='closure-compiler'):
     """Run closure-compiler on a file."""
     return runinplace('{} --warning_level QUIET --js %1 --js_output_file %2'.format(executable), infile)
 
 
+_OPTIPNG_OPTIONS = "-preserve -o2 -quiet"
+_JPEGOPTIM_OPTIONS = "-p --strip-all -q"
+_JPEGOPTIM_PROGRESSIVE_OPTIONS = "-p --strip-all --all-progressive -q"
+
+
+@_cacheable
+@_batchable(_OPTIPNG_OPTIONS)
 @_ConfigurableFilter(executable='OPTIPNG_EXECUTABLE')
 def optipng(infile, executable='optipng'):
     """Run optipng on a file."""
-    return runinplace("{} -preserve -o2 -quiet %1".format(executable), infile)
+    return runinplace("{} {} %1".format(executable, _OPTIPNG_OPTIONS), infile)
 
 
+@_cacheable
+@_batchable(_JPEGOPTIM_OPTIONS)
 @_ConfigurableFilter(executable='JPEGOPTIM_EXECUTABLE')
 def jpegoptim(infile, executable='jpegoptim'):
     """Run jpegoptim on a file."""
-    return runinplace("{} -p --strip-all -q %1".format(executable), infile)
+    return runinplace("{} {} %1".format(executable, _JPEGOPTIM_OPTIONS), infile)
 
 
+@_cacheable
+@_batchable(_JPEGOPTIM_PROGRESSIVE_OPTIONS)
 @_ConfigurableFilter(executable='JPEGOPTIM_EXECUTABLE')
 def jpegoptim_progressive(infile, executable='jpegoptim'):
     """Run jpegoptim on a file and convert to progressive."""
-    return runinplace("{} -p --strip-all --all-progressive -q %1".format(executable), infile)
+    return runinplace("{} {} %1".format(executable, _JPEGOPTIM_PROGRESSIVE_OPTIONS), infile)
+
+
+# Warnings (returncode 1) are not critical, and *everything* is a warning.
+_HTML_TIDY_OK_RETURNCODES = (0, 1)
+_HTML_TIDY_NOWRAP_OPTIONS = "-quiet --show-info no --show-warnings no -utf8 -indent --indent-attributes no --sort-attributes alpha --wrap 0 --wrap-sections no --drop-empty-elements no --tidy-mark no -modify"
+_HTML_TIDY_WRAP_OPTIONS = "-quiet --show-info no --show-warnings no -utf8 -indent --indent-attributes no --sort-attributes alpha --wrap 80 --wrap-sections no --drop-empty-elements no --tidy-mark no -modify"
+_HTML_TIDY_WRAP_ATTR_OPTIONS = "-quiet --show-info no --show-warnings no -utf8 -indent --indent-attributes yes --sort-attributes alpha --wrap 80 --wrap-sections no --drop-empty-elements no --tidy-mark no -modify"
+_HTML_TIDY_MINI_OPTIONS = "-quiet --show-info no --show-warnings no -utf8 --indent-attributes no --sort-attributes alpha --wrap 0 --wrap-sections no --tidy-mark no --drop-empty-elements no -modify"
 
 
 @_ConfigurableFilter(executable='HTML_TIDY_EXECUTABLE')
@@ -195,40 +348,48 @@ def html_tidy_withconfig(infile, executable='tidy5'):
     return _html_tidy_runner(infile, "-quiet --show-info no --show-warnings no -utf8 -indent -config tidy5.conf -modify %1", executable=executable)
 
 
+@_cacheable
+@_batchable(_HTML_TIDY_NOWRAP_OPTIONS, _HTML_TIDY_OK_RETURNCODES)
 @_ConfigurableFilter(executable='HTML_TIDY_EXECUTABLE')
 def html_tidy_nowrap(infile, executable='tidy5'):
     """Run HTML Tidy without line wrapping."""
-    return _html_tidy_runner(infile, "-quiet --show-info no --show-warnings no -utf8 -indent --indent-attributes no --sort-attributes alpha --wrap 0 --wrap-sections no --drop-empty-elements no --tidy-mark no -modify %1", executable=executable)
+    return _html_tidy_runner(infile, _HTML_TIDY_NOWRAP_OPTIONS + " %1", executable=executable)
 
 
+@_cacheable
+@_batchable(_HTML_TIDY_WRAP_OPTIONS, _HTML_TIDY_OK_RETURNCODES)
 @_ConfigurableFilter(executable='HTML_TIDY_EXECUTABLE')
 def html_tidy_wrap(infile, executable='tidy5'):
     """Run HTML Tidy with line wrapping."""
-    return _html_tidy_runner(infile, "-quiet --show-info no --show-warnings no -utf8 -indent --indent-attributes no --sort-attributes alpha --wrap 80 --wrap-sections no --drop-empty-elements no --tidy-mark no -modify %1", executable=executable)
+    return _html_tidy_runner(infile, _HTML_TIDY_WRAP_OPTIONS + " %1", executable=executable)
 
 
+@_cacheable
+@_batchable(_HTML_TIDY_WRAP_ATTR_OPTIONS, _HTML_TIDY_OK_RETURNCODES)
 @_ConfigurableFilter(executable='HTML_TIDY_EXECUTABLE')
 def html_tidy_wrap_attr(infile, executable='tidy5'):
     """Run HTML tidy with line wrapping and attribute indentation."""
-    return _html_tidy_runner(infile, "-quiet --show-info no --show-warnings no -utf8 -indent --indent-attributes yes --sort-attributes alpha --wrap 80 --wrap-sections no --drop-empty-elements no --tidy-mark no -modify %1", executable=executable)
+    return _html_tidy_runner(infile, _HTML_TIDY_WRAP_ATTR_OPTIONS + " %1", executable=executable)
 
 
+@_cacheable
+@_batchable(_HTML_TIDY_MINI_OPTIONS, _HTML_TIDY_OK_RETURNCODES)
 @_ConfigurableFilter(executable='HTML_TIDY_EXECUTABLE')
 def html_tidy_mini(infile, executable='tidy5'):
     """Run HTML tidy with minimal settings."""
-    return _html_tidy_runner(infile, "-quiet --show-info no --show-warnings no -utf8 --indent-attributes no --sort-attributes alpha --wrap 0 --wrap-sections no --tidy-mark no --drop-empty-elements no -modify %1", executable=executable)
+    return _html_tidy_runner(infile, _HTML_TIDY_MINI_OPTIONS + " %1", executable=executable)
 
 
 def _html_tidy_runner(infile, options, executable='tidy5'):
     """Run HTML Tidy."""
-    # Warnings (returncode 1) are not critical, and *everything* is a warning.
     try:
         status = runinplace(executable + " " + options, infile)
     except subprocess.CalledProcessError as err:
-        status = 0 if err.returncode == 1 else err.returncode
+        status = 0 if err.returncode in _HTML_TIDY_OK_RETURNCODES else err.returncode
     return status
 
 
+@_cacheable
 @apply_to_text_file
 def html5lib_minify(data):
     """Minify with html5lib."""
@@ -245,6 +406,14 @@ def html5lib_minify(data):
     return data
 
 
+@_cacheable
+@apply_to_text_file
+def html_minify(data):
+    """Minify HTML with lxml (see nikola.minifiers.minify_html)."""
+    return minifiers.minify_html(data)
+
+
+@_cacheable
 @apply_to_text_file
 def html5lib_xmllike(data):
     """Transform document to an XML-like form with html5lib."""
@@ -286,6 +455,7 @@ def _run_typogrify(data, typogrify_filters, ignore_tags=None):
     return rendered_text
 
 
+@_cacheable
 @apply_to_text_file
 def typogrify(data):
     """Prettify text with typogrify."""
@@ -305,6 +475,7 @@ def _smarty_oldschool(text):
         return output
 
 
+@_cacheable
 @apply_to_text_file
 def typogrify_oldschool(data):
     """Prettify text with typogrify."""
@@ -315,6 +486,7 @@ def typogrify_oldschool(data):
     return _run_typogrify(data, [typo.amp, typo.widont, _smarty_oldschool, typo.smartypants, typo.caps, typo.initial_quotes])
 
 
+@_cacheable
 @apply_to_text_file
 def typogrify_sans_widont(data):
     """Prettify text with typogrify, skipping the widont filter."""
@@ -327,6 +499,7 @@ def typogrify_sans_widont(data):
     return _run_typogrify(data, [typo.amp, typo.smartypants, typo.caps, typo.initial_quotes])
 
 
+@_cacheable
 @apply_to_text_file
 def typogrify_custom(data, typogrify_filters, ignore_tags=None):
     """Run typogrify with a custom list of fliter functions."""
@@ -352,38 +525,22 @@ def php_template_injection(data):
         return data
 
 
+@_cacheable
+@_ConfigurableFilter(shorten='CSS_MINIFY_SHORTEN')
 @apply_to_text_file
-def cssminify(data):
-    """Minify CSS using https://cssminifier.com/."""
-    try:
-        url = 'https://cssminifier.com/raw'
-        _data = {'input': data}
-        response = requests.post(url, data=_data)
-        if response.status_code != 200:
-            LOGGER.error("can't use cssminifier.com: HTTP status {}", response.status_code)
-            return data
-        return response.text
-    except Exception as exc:
-        LOGGER.error("can't use cssminifier.com: {}", exc)
-        return data
+def cssminify(data, shorten=False):
+    """Minify CSS (see nikola.minifiers.minify_css)."""
+    return minifiers.minify_css(data, shorten)
 
 
+@_cacheable
 @apply_to_text_file
 def jsminify(data):
-    """Minify JS using https://javascript-minifier.com/."""
-    try:
-        url = 'https://javascript-minifier.com/raw'
-        _data = {'input': data}
-        response = requests.post(url, data=_data)
-        if response.status_code != 200:
-            LOGGER.error("can't use javascript-minifier.com: HTTP status {}", response.status_code)
-            return data
-        return response.text
-    except Exception as exc:
-        LOGGER.error("can't use javascript-minifier.com: {}", exc)
-        return data
+    """Minify JS (see nikola.minifiers.minify_js)."""
+    return minifiers.minify_js(data)
 
 
+@_cacheable
 @apply_to_text_file
 def jsonminify(data):
     """Minify JSON files (strip whitespace and use minimal separators)."""
@@ -391,6 +548,7 @@ def jsonminify(data):
     return data
 
 
+@_cacheable
 @apply_to_binary_file
 def xmlminify(data):
     """Minify XML files (strip whitespace and use minimal separators)."""
@@ -409,7 +567,7 @@ def _normalize_html(data):
 
 
 # The function is used in other filters, so the decorator cannot be used directly.
-normalize_html = apply_to_text_file(_normalize_html)
+normalize_html = _cacheable(apply_to_text_file(_normalize_html))
 
 
 @_ConfigurableFilter(xpath_list='HEADER_PERMALINKS_XPATH_LIST', file_blacklist='HEADER_PERMALINKS_FILE_BLACKLIST')
@@ -458,6 +616,7 @@ def add_header_permalinks(fname, xpath_list=None, file_blacklist=None):
         outf.write('<!DOCTYPE html>\n' + lxml.html.tostring(doc, encoding="unicode"))
 
 
+@_cacheable
 @_ConfigurableFilter(top_classes='DEDUPLICATE_IDS_TOP_CLASSES')
 @apply_to_text_file
 def deduplicate_ids(data, top_classes=None):
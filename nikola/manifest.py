@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2020 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Manifest of the files in the output folder, updated as build tasks run."""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from . import utils
+
+__all__ = ('OutputManifest', 'file_hash')
+
+MANIFEST_VERSION = 1
+
+
+def file_hash(path):
+    """Return the SHA-256 hex digest of the contents of the file at path."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as inf:
+        for chunk in iter(lambda: inf.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class OutputManifest():
+    """The files generated in the output folder, with their size, mtime, hash and task.
+
+    Paths are relative to the output folder and use ``/`` as separator.
+    During ``nikola build``, the doit reporter returned by
+    ``reporter_class`` records the targets of every task which runs (and
+    of up-to-date tasks missing from the manifest); at the end of the
+    build, files changed by later tasks are hashed again and files which
+    are no longer targets are dropped. Comparing ``hashes()`` with those
+    of an earlier build (see ``diff``) gives the changed and removed files
+    without walking the output folder.
+    """
+
+    def __init__(self, output_folder, path):
+        """Manifest of output_folder, stored in path."""
+        self.output_folder = output_folder
+        self._path = path
+        self._files = None
+        self._targets = None
+
+    @property
+    def files(self):
+        """Return the entries, a dict mapping paths to dicts with size, mtime, hash and task."""
+        if self._files is None:
+            self._files = {}
+            try:
+                with open(self._path, 'r', encoding='utf-8') as inf:
+                    data = json.load(inf)
+            except (OSError, ValueError):
+                return self._files
+            if data.get('version') == MANIFEST_VERSION:
+                self._files = data['files']
+        return self._files
+
+    def __contains__(self, path):
+        """Check if path (relative to the output folder) is in the manifest."""
+        return path in self.files
+
+    def __iter__(self):
+        """Iterate over the paths in the manifest, sorted."""
+        return iter(sorted(self.files))
+
+    def __len__(self):
+        """Return the number of files in the manifest."""
+        return len(self.files)
+
+    def get(self, path):
+        """Return the entry of path (relative to the output folder), or None."""
+        return self.files.get(path)
+
+    def hashes(self):
+        """Return a dict mapping the paths in the manifest to their hashes."""
+        return {path: entry['hash'] for path, entry in self.files.items()}
+
+    def diff(self, old_hashes):
+        """Compare with old_hashes (like an earlier ``hashes()``).
+
+        Returns (changed, removed): the sorted paths which are new or whose
+        contents changed, and those which are no longer in the manifest.
+        """
+        files = self.files
+        changed = sorted(path for path, entry in files.items() if old_hashes.get(path) != entry['hash'])
+        removed = sorted(path for path in old_hashes if path not in files)
+        return changed, removed
+
+    def relpath(self, target):
+        """Return target relative to the output folder (with / separators), or None if it is outside."""
+        rel = os.path.relpath(target, self.output_folder)
+        if rel == os.curdir or rel == os.pardir or rel.startswith(os.pardir + os.sep):
+            return None
+        return rel.replace(os.sep, '/')
+
+    def record(self, target, task_name, check=False):
+        """Record target (a path to a file in the output folder) as produced by task_name.
+
+        If check is true, the file is only hashed if it is not in the
+        manifest or its size or mtime changed.
+        """
+        path = self.relpath(target)
+        if path is None:
+            return
+        try:
+            st = os.stat(target)
+        except OSError:
+            self.files.pop(path, None)
+            return
+        if not os.path.isfile(target):
+            return
+        entry = self.files.get(path)
+        if check and entry is not None and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime:
+            entry['task'] = task_name
+            return
+        self.files[path] = {
+            'size': st.st_size,
+            'mtime': st.st_mtime,
+            'hash': file_hash(target),
+            'task': task_name,
+        }
+
+    def start(self, tasks):
+        """Start a build of tasks; files which are not targets of tasks are dropped when it completes."""
+        self._targets = set()
+        for task in tasks:
+            for target in task.targets:
+                path = self.relpath(target)
+                if path is not None:
+                    self._targets.add(path)
+
+    def refresh(self):
+        """Hash files changed since they were recorded, and drop missing files and files which are no longer targets."""
+        for path, entry in list(self.files.items()):
+            if self._targets is not None and path not in self._targets:
+                del self.files[path]
+                continue
+            self.record(os.path.join(self.output_folder, path), entry['task'], check=True)
+
+    def save(self):
+        """Write the manifest."""
+        dname = os.path.dirname(self._path)
+        utils.makedirs(dname)
+        with tempfile.NamedTemporaryFile(dir=dname, delete=False, mode='w+', encoding='utf-8') as outf:
+            tname = outf.name
+            json.dump({'version': MANIFEST_VERSION, 'files': self.files}, outf, sort_keys=True)
+        os.replace(tname, self._path)
+
+    def reporter_class(self, base):
+        """Return a doit reporter class based on base, which also records the targets of tasks in this manifest."""
+        manifest = self
+
+        class ManifestReporter(base):
+            def skip_uptodate(self, task):
+                for target in task.targets:
+                    manifest.record(target, task.name, check=True)
+                super().skip_uptodate(task)
+
+            def add_success(self, task):
+                for target in task.targets:
+                    manifest.record(target, task.name)
+                super().add_success(task)
+
+            def complete_run(self):
+                manifest.refresh()
+                manifest.save()
+                super().complete_run()
+
+        return ManifestReporter
@@ -35,7 +35,7 @@ import natsort
 from nikola.plugin_categories import MetadataExtractor
 from nikola.utils import unslugify
 
-__all__ = ('MetaCondition', 'MetaPriority', 'MetaSource', 'check_conditions')
+__all__ = ('MetaCondition', 'MetaPriority', 'MetaSource', 'check_conditions', 'ExtractorDispatcher', 'get_dispatcher')
 _default_extractors = []
 DEFAULT_EXTRACTOR_NAME = 'nikola'
 DEFAULT_EXTRACTOR = None
@@ -88,11 +88,87 @@ def check_conditions(post, filename: str, conditions: list, config: dict, source
     return True
 
 
+# Conditions which depend on the file, and not only on the configuration
+_FILE_CONDITIONS = (MetaCondition.extension, MetaCondition.compiler, MetaCondition.first_line)
+
+
+class ExtractorDispatcher():
+    """Select the text metadata extractors to try for a file.
+
+    Conditions which only depend on the configuration are checked once, when
+    the dispatcher is created. The remaining conditions only depend on the
+    file extension, the compiler and the first line of the file, so the
+    candidates for every combination of those are computed once and kept in
+    a dispatch table.
+    """
+
+    def __init__(self, metadata_extractors_by: dict, config: dict):
+        """Precompile the conditions of all text extractors for config."""
+        self.config = config
+        self.extractors = []
+        for priority in MetaPriority:
+            for extractor in metadata_extractors_by['priority'].get(priority, []):
+                config_conditions = [c for c in extractor.conditions if c[0] not in _FILE_CONDITIONS]
+                if check_conditions(None, '', config_conditions, config, None):
+                    self.extractors.append(extractor)
+        self.extensions = set()
+        self.first_lines = set()
+        for extractor in self.extractors:
+            for ct, arg in extractor.conditions:
+                if ct == MetaCondition.extension:
+                    self.extensions.add(arg)
+                elif ct == MetaCondition.first_line:
+                    self.first_lines.add(arg)
+        self._table = {}
+
+    def _matches(self, extractor, extensions, compiler_name, first_line):
+        for ct, arg in extractor.conditions:
+            if any((
+                ct == MetaCondition.extension and arg not in extensions,
+                ct == MetaCondition.compiler and compiler_name != arg,
+                ct == MetaCondition.first_line and first_line != arg,
+            )):
+                return False
+        return True
+
+    def candidates(self, post, filename: str, source_text: str) -> list:
+        """Return the extractors to try (in order) for a file."""
+        compiler = getattr(post, 'compiler', None)
+        compiler_name = getattr(compiler, 'name', None)
+        extensions = tuple(sorted(ext for ext in self.extensions if filename.endswith(ext)))
+        first_line = None
+        if self.first_lines and source_text:
+            end = source_text.find('\n')
+            if end >= 0 and source_text[:end] in self.first_lines:
+                first_line = source_text[:end]
+        key = (extensions, compiler_name, first_line)
+        try:
+            return self._table[key]
+        except KeyError:
+            pass
+        candidates = [e for e in self.extractors if self._matches(e, extensions, compiler_name, first_line)]
+        for extractor in candidates:
+            extractor.check_requirements()
+        self._table[key] = candidates
+        return candidates
+
+
+def get_dispatcher(metadata_extractors_by: dict, config: dict) -> ExtractorDispatcher:
+    """Return the extractor dispatcher for metadata_extractors_by and config, creating it if needed."""
+    dispatcher = metadata_extractors_by.get('dispatcher')
+    if dispatcher is None or dispatcher.config is not config:
+        dispatcher = ExtractorDispatcher(metadata_extractors_by, config)
+        metadata_extractors_by['dispatcher'] = dispatcher
+    return dispatcher
+
+
 def classify_extractor(extractor: MetadataExtractor, metadata_extractors_by: dict):
     """Classify an extractor and add it to the metadata_extractors_by dict."""
     global DEFAULT_EXTRACTOR
     if extractor.name == DEFAULT_EXTRACTOR_NAME:
         DEFAULT_EXTRACTOR = extractor
+    # Extractors changed, the dispatch table needs to be rebuilt
+    metadata_extractors_by.pop('dispatcher', None)
     metadata_extractors_by['priority'][extractor.priority].append(extractor)
     metadata_extractors_by['source'][extractor.source].append(extractor)
     metadata_extractors_by['name'][extractor.name] = extractor
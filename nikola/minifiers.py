@@ -0,0 +1,491 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2020 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Minify CSS, JavaScript and HTML.
+
+The CSS and JavaScript minifiers split the input into tokens and only
+remove comments and whitespace between tokens which do not need it, so
+they never change the tokens themselves (except for the optional value
+shortening of CSS). The HTML minifier serializes lxml trees, so pages
+rendered by Nikola can be minified without parsing them again.
+"""
+
+import re
+
+import lxml.etree
+import lxml.html
+
+__all__ = ('minify_css', 'minify_js', 'minify_html', 'minify_html_tree', 'HTMLMinifyStats')
+
+# CSS
+
+_CSS_TOKEN_RE = re.compile(r'''
+    (?P<comment>/\*.*?(?:\*/|\Z))
+  | (?P<space>\s+)
+  | (?P<string>"(?:[^"\\]|\\.)*(?:"|\Z)|'(?:[^'\\]|\\.)*(?:'|\Z))
+  | (?P<url>[uU][rR][lL]\(\s*[^\s"')]*\s*\))
+  | (?P<word>(?:[^\s{}()\[\];:,>~+!=/*"'\\]|\\.)+)
+  | (?P<punct>.)
+''', re.S | re.X)
+
+# No whitespace is needed after these characters, or before the second set
+_CSS_NO_SPACE_AFTER = frozenset('{};,>~(:[=!')
+_CSS_NO_SPACE_BEFORE = frozenset('{};,>~)!=]')
+# At-rules whose blocks contain rules, not declarations
+_CSS_GROUP_RULES = frozenset(('media', 'supports', 'document', 'layer', 'container', 'scope', 'keyframes'))
+_CSS_LENGTH_UNITS = ('px', 'em', 'rem', 'ex', 'ch', 'vw', 'vh', 'vmin', 'vmax', 'cm', 'mm', 'q', 'in', 'pt', 'pc')
+_CSS_NUMBER_RE = re.compile(r'^([+-]?)(\d*)(?:\.(\d+))?([a-zA-Z%]*)$')
+_CSS_HEX_COLOR_RE = re.compile(r'^#([0-9a-fA-F])\1([0-9a-fA-F])\2([0-9a-fA-F])\3$')
+
+
+def _css_block_kind(prelude):
+    """Return whether a block with this prelude contains 'rules' or 'declarations'."""
+    if prelude and prelude[0].startswith('@'):
+        name = prelude[0][1:].lower()
+        # Vendor-prefixed at-rules, like @-webkit-keyframes
+        if name.startswith('-'):
+            name = name.split('-', 2)[-1]
+        if name in _CSS_GROUP_RULES:
+            return 'rules'
+    return 'declarations'
+
+
+def _shorten_css_value(token, prop, depth):
+    """Return a shorter equivalent of token, a word in the value of property prop."""
+    match = _CSS_HEX_COLOR_RE.match(token)
+    if match:
+        return '#' + ''.join(match.groups())
+    match = _CSS_NUMBER_RE.match(token)
+    if not match or not (match.group(2) or match.group(3)):
+        return token
+    sign, integer, fraction, unit = match.groups()
+    integer = integer.lstrip('0')
+    fraction = (fraction or '').rstrip('0')
+    if not integer and not fraction:
+        # Lengths of 0 need no unit, except in functions (like calc) and flex
+        # (where "0" is not a flex-basis).
+        if unit.lower() in _CSS_LENGTH_UNITS and depth == 0 and not prop.startswith(('flex', '-')):
+            unit = ''
+        return '0' + unit
+    return sign + integer + ('.' + fraction if fraction else '') + unit
+
+
+def minify_css(css, shorten=False):
+    """Minify CSS, removing comments and unneeded whitespace and semicolons.
+
+    Comments starting with /*! (like licenses) are kept. If shorten is
+    true, also shorten values of declarations: hex colors (#ffffff becomes
+    #fff), numbers (0.50 becomes .5) and zero lengths (0px becomes 0).
+    """
+    out = []
+    pending_space = False
+    blocks = ['rules']
+    prelude = []
+    prop = ''
+    depth = 0
+    for match in _CSS_TOKEN_RE.finditer(css):
+        kind = match.lastgroup
+        token = match.group()
+        if kind == 'space' or (kind == 'comment' and not token.startswith('/*!')):
+            pending_space = True
+            continue
+        if kind == 'comment':
+            out.append(token)
+            pending_space = False
+            continue
+
+        if token == '}' and out and out[-1] == ';':
+            out.pop()
+        elif shorten and kind == 'word' and blocks[-1] == 'declarations' and prop:
+            token = _shorten_css_value(token, prop, depth)
+
+        if pending_space and out:
+            last, first = out[-1][-1], token[0]
+            if not (last in _CSS_NO_SPACE_AFTER or first in _CSS_NO_SPACE_BEFORE or
+                    (first == ':' and blocks[-1] == 'declarations')):
+                out.append(' ')
+        pending_space = False
+        out.append(token)
+
+        if token == '{':
+            blocks.append(_css_block_kind(prelude))
+            prelude = []
+            prop = ''
+        elif token == '}':
+            if len(blocks) > 1:
+                blocks.pop()
+            prelude = []
+            prop = ''
+        elif token == ';':
+            prelude = []
+            prop = ''
+        elif token == ':' and blocks[-1] == 'declarations' and not prop and len(prelude) == 1:
+            prop = prelude[0].lower()
+        elif token == '(':
+            depth += 1
+        elif token == ')':
+            depth = max(depth - 1, 0)
+        if token not in '{};':
+            prelude.append(token)
+    return ''.join(out)
+
+
+# JavaScript
+
+_JS_TOKEN_RE = re.compile(r'''
+    (?P<comment>//[^\n\r\u2028\u2029]*|/\*.*?(?:\*/|\Z))
+  | (?P<space>\s+)
+  | (?P<string>"(?:[^"\\\n\r]|\\.)*(?:"|(?=[\n\r])|\Z)|'(?:[^'\\\n\r]|\\.)*(?:'|(?=[\n\r])|\Z))
+  | (?P<word>[\w$\\#\u0080-\uffff]+)
+  | (?P<punct>\+\+|--|.)
+''', re.S | re.X)
+_JS_STRING_RE = re.compile(r'''"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*\'''', re.S)
+_JS_REGEX_RE = re.compile(r'/(?:[^/\\\[\n\r]|\\.|\[(?:[^\]\\\n\r]|\\.)*\])+/[\w$]*', re.S)
+_JS_NEWLINES = frozenset('\n\r\u2028\u2029')
+# A regular expression (and not a division) can follow these keywords
+_JS_REGEX_KEYWORDS = frozenset((
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw', 'case', 'do', 'else',
+    'yield', 'await'))
+
+
+def _is_js_word_char(char):
+    return char.isalnum() or char in '_$\\#' or char > '\x7f'
+
+
+def _skip_js_template(js, pos):
+    """Return the position after the template literal starting at pos."""
+    pos += 1
+    while pos < len(js):
+        char = js[pos]
+        if char == '\\':
+            pos += 2
+        elif char == '`':
+            return pos + 1
+        elif js.startswith('${', pos):
+            pos = _skip_js_expression(js, pos + 2)
+        else:
+            pos += 1
+    return len(js)
+
+
+def _skip_js_expression(js, pos):
+    """Return the position after the } closing the template expression starting at pos."""
+    depth = 1
+    while pos < len(js):
+        char = js[pos]
+        if char in '"\'':
+            match = _JS_STRING_RE.match(js, pos)
+            pos = match.end() if match else pos + 1
+        elif char == '`':
+            pos = _skip_js_template(js, pos)
+        elif char == '{':
+            depth += 1
+            pos += 1
+        elif char == '}':
+            depth -= 1
+            pos += 1
+            if depth == 0:
+                return pos
+        else:
+            pos += 1
+    return len(js)
+
+
+def _js_regex_allowed(prev):
+    """Tell whether a / after the token prev starts a regular expression."""
+    if prev is None:
+        return True
+    if _is_js_word_char(prev[0]):
+        return prev in _JS_REGEX_KEYWORDS
+    # Strings, regular expressions and templates are followed by operators
+    return prev[0] not in '\'"`/' and prev not in (')', ']', '++', '--')
+
+
+def _js_can_end_statement(token):
+    return (_is_js_word_char(token[0]) or (token[0] in '\'"`/' and len(token) > 1) or
+            token in (')', ']', '}', '++', '--'))
+
+
+def _js_can_start_statement(token):
+    return _is_js_word_char(token[0]) or token[0] in '\'"`([{+-!~/' or token in ('++', '--')
+
+
+def _js_tokens(js):
+    """Yield (kind, token) pairs for the JavaScript code js."""
+    pos = 0
+    prev = None
+    while pos < len(js):
+        char = js[pos]
+        if char == '`':
+            end = _skip_js_template(js, pos)
+            kind = 'template'
+        elif char == '/' and js[pos + 1:pos + 2] not in ('/', '*') and _js_regex_allowed(prev):
+            match = _JS_REGEX_RE.match(js, pos)
+            end = match.end() if match else pos + 1
+            kind = 'regex' if match else 'punct'
+        else:
+            match = _JS_TOKEN_RE.match(js, pos)
+            end = match.end()
+            kind = match.lastgroup
+        token = js[pos:end]
+        if kind not in ('space', 'comment'):
+            prev = token
+        yield kind, token
+        pos = end
+
+
+def minify_js(js):
+    """Minify JavaScript, removing comments and unneeded whitespace.
+
+    Line breaks are kept wherever a statement could end because of them
+    (automatic semicolon insertion), so the code behaves the same.
+    Comments starting with /*! (like licenses) are kept.
+    """
+    out = []
+    pending = None  # None, ' ' or '\n'
+    for kind, token in _js_tokens(js):
+        if kind == 'space' or (kind == 'comment' and not token.startswith('/*!')):
+            if pending != '\n':
+                newline = not _JS_NEWLINES.isdisjoint(token) or token.startswith('//')
+                pending = '\n' if newline else ' '
+            continue
+        if kind == 'comment':
+            if out:
+                out.append('\n')
+            out.append(token)
+            pending = '\n'
+            continue
+
+        if pending and out:
+            prev = out[-1]
+            last, first = prev[-1], token[0]
+            if pending == '\n' and _js_can_end_statement(prev) and _js_can_start_statement(token):
+                out.append('\n')
+            elif ((_is_js_word_char(last) and _is_js_word_char(first)) or
+                  (last in '+-/' and first == last) or
+                  (prev.isdigit() and first == '.')):
+                out.append(' ')
+        pending = None
+        out.append(token)
+    return ''.join(out)
+
+
+# HTML
+
+# HTML whitespace (unlike \s, this does not match non-breaking spaces)
+_HTML_SPACE_RE = re.compile(r'[ \t\n\r\f]+')
+_HTML_UNQUOTED_VALUE_RE = re.compile(r'^[^ \t\n\r\f"\'=<>`]+$')
+_HTML_DOCTYPE_RE = re.compile(r'^\s*<!doctype', re.I)
+_HTML_DOCUMENT_RE = re.compile(r'^\s*(<!doctype|<html)', re.I)
+# Whitespace is significant inside these elements
+_HTML_PRESERVE_TAGS = frozenset(('pre', 'textarea', 'script', 'style'))
+# The contents of these elements are not escaped
+_HTML_RAW_TAGS = frozenset(('script', 'style'))
+_HTML_VOID_TAGS = frozenset((
+    'area', 'base', 'basefont', 'br', 'col', 'embed', 'frame', 'hr', 'img', 'input',
+    'isindex', 'keygen', 'link', 'meta', 'param', 'source', 'track', 'wbr'))
+# Whitespace around these elements is never rendered. List items are
+# missing on purpose: they are often displayed inline.
+_HTML_BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'base', 'blockquote', 'body', 'caption', 'col',
+    'colgroup', 'dd', 'details', 'div', 'dl', 'dt', 'fieldset', 'figcaption', 'figure',
+    'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'head', 'header', 'hgroup',
+    'hr', 'html', 'link', 'main', 'meta', 'nav', 'ol', 'p', 'pre', 'section', 'summary',
+    'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'title', 'tr', 'ul'))
+_HTML_BOOLEAN_ATTRIBUTES = frozenset((
+    'allowfullscreen', 'async', 'autofocus', 'autoplay', 'checked', 'controls', 'default',
+    'defer', 'disabled', 'formnovalidate', 'hidden', 'ismap', 'itemscope', 'loop',
+    'multiple', 'muted', 'nomodule', 'novalidate', 'open', 'readonly', 'required',
+    'reversed', 'selected'))
+_HTML_SCRIPT_TYPES = frozenset((
+    '', 'text/javascript', 'application/javascript', 'module', 'application/json',
+    'application/ld+json'))
+
+
+def _keep_html_comment(text):
+    """Tell if a comment has to be kept (conditional comments, Nikola markers and <!--! ... -->)."""
+    text = text.strip()
+    return text.startswith(('[if', '<![endif]', '!')) or '__NIKOLA_' in text
+
+
+def _preserves_whitespace(element):
+    """Tell if whitespace is significant inside element."""
+    if element.tag in _HTML_PRESERVE_TAGS:
+        return True
+    # docutils renders inline literals as <span class="pre">
+    if 'pre' in element.get('class', '').split():
+        return True
+    return 'white-space' in element.get('style', '')
+
+
+def _minify_inline_code(element):
+    """Return the contents of a script or style element, minified if that is safe."""
+    code = element.text or ''
+    if not code or '<!--' in code or '-->' in code:
+        return code
+    if element.tag == 'script':
+        if element.get('type', '').strip().lower() not in _HTML_SCRIPT_TYPES:
+            return code
+        minified = minify_js(code)
+    else:
+        if element.get('type', 'text/css').strip().lower() != 'text/css':
+            return code
+        minified = minify_css(code)
+    # Joining tokens must not end the element or start a comment
+    if '</' + element.tag in minified.lower() or '<!--' in minified:
+        return code
+    return minified
+
+
+def _html_attribute(name, value):
+    """Serialize an attribute, without quotes if they are optional."""
+    if not value or (name in _HTML_BOOLEAN_ATTRIBUTES and value.lower() == name):
+        return ' ' + name
+    value = value.replace('&', '&amp;')
+    if _HTML_UNQUOTED_VALUE_RE.match(value):
+        return ' {0}={1}'.format(name, value)
+    if '"' in value and "'" not in value:
+        return " {0}='{1}'".format(name, value)
+    return ' {0}="{1}"'.format(name, value.replace('"', '&quot;'))
+
+
+def _escape_html_text(text):
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _minify_html_text(text, after_block, before_block):
+    """Collapse the whitespace in text and escape it."""
+    text = _HTML_SPACE_RE.sub(' ', text)
+    # Whitespace next to block-level elements is not rendered
+    if after_block:
+        text = text.lstrip(' ')
+    if before_block:
+        text = text.rstrip(' ')
+    return _escape_html_text(text)
+
+
+def _minify_html_children(element, out, block):
+    """Append the minified text and children of element to out."""
+    text = element.text or ''
+    after_block = block
+    for child in element:
+        tag = child.tag
+        if tag is lxml.etree.Comment and not _keep_html_comment(child.text or ''):
+            # Merge the tail of the removed comment with the text before it
+            text += child.tail or ''
+            continue
+        is_block = tag in _HTML_BLOCK_TAGS
+        if text:
+            out.append(_minify_html_text(text, after_block, is_block))
+        _minify_html_element(child, out)
+        text = child.tail or ''
+        after_block = is_block
+    if text:
+        out.append(_minify_html_text(text, after_block, block))
+
+
+def _minify_html_element(element, out):
+    """Append element (without its tail), minified, to out."""
+    tag = element.tag
+    if not isinstance(tag, str):
+        if tag is lxml.etree.Comment:
+            out.append('<!--{0}-->'.format(element.text or ''))
+        elif tag is lxml.etree.ProcessingInstruction:
+            out.append(lxml.etree.tostring(element, encoding='unicode', method='html', with_tail=False))
+        return
+    if _preserves_whitespace(element) and tag not in _HTML_RAW_TAGS:
+        # Nothing to collapse: let lxml serialize the element (like the
+        # highlighted code in pre elements), which is much faster.
+        out.append(lxml.etree.tostring(element, encoding='unicode', method='html', with_tail=False))
+        return
+    out.append('<' + tag)
+    for name, value in element.items():
+        out.append(_html_attribute(name, value))
+    out.append('>')
+    if tag in _HTML_VOID_TAGS:
+        return
+    if tag in _HTML_RAW_TAGS:
+        out.append(_minify_inline_code(element))
+    else:
+        _minify_html_children(element, out, tag in _HTML_BLOCK_TAGS)
+    out.append('</' + tag + '>')
+
+
+def minify_html_tree(doc, doctype=None, fragment=False):
+    """Serialize an lxml HTML tree, minified, in a single pass over the tree.
+
+    Comments are removed (except conditional comments, comments starting
+    with <!--! and comments used by Nikola filters), and so are optional
+    attribute quotes. Whitespace is collapsed to a single space, except
+    inside pre, textarea, script and style (and elements with a white-space
+    style or the "pre" class), and removed around block-level elements.
+    Inline scripts and styles are minified. The tree is not modified.
+
+    With ``fragment``, only the contents of ``doc`` are serialized.
+    """
+    out = [doctype] if doctype else []
+    if fragment:
+        _minify_html_children(doc, out, True)
+    else:
+        _minify_html_element(doc, out)
+    return ''.join(out)
+
+
+def minify_html(html):
+    """Minify HTML (a full document or a fragment)."""
+    parser = lxml.html.HTMLParser()
+    if _HTML_DOCUMENT_RE.match(html):
+        doc = lxml.html.document_fromstring(html, parser)
+        doctype = '<!DOCTYPE html>' if _HTML_DOCTYPE_RE.match(html) else None
+        return minify_html_tree(doc, doctype)
+    doc = lxml.html.fragment_fromstring(html, create_parent='div', parser=parser)
+    return minify_html_tree(doc, fragment=True)
+
+
+class HTMLMinifyStats(object):
+    """Count the pages, bytes and time of HTML minification during a build."""
+
+    def __init__(self):
+        """Start with no pages."""
+        self.pages = 0
+        self.input_size = 0
+        self.output_size = 0
+        self.seconds = 0.0
+
+    def add(self, input_size, output_size, seconds):
+        """Record a page minified from input_size to output_size bytes in seconds."""
+        self.pages += 1
+        self.input_size += input_size
+        self.output_size += output_size
+        self.seconds += seconds
+
+    def summary(self):
+        """Describe the savings and throughput."""
+        saved = self.input_size - self.output_size
+        percent = 100.0 * saved / self.input_size if self.input_size else 0.0
+        rate = self.pages / self.seconds if self.seconds else 0.0
+        return ('{0} pages, {1:.1f} kB saved ({2:.1f}% of {3:.1f} kB), '
+                '{4:.0f} pages/s'.format(self.pages, saved / 1024, percent, self.input_size / 1024, rate))
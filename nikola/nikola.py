@@ -27,7 +27,6 @@
 """The main Nikola site object."""
 
 import datetime
-import io
 import json
 import functools
 import logging
@@ -35,6 +34,7 @@ import operator
 import os
 import sys
 import mimetypes
+import time
 from collections import defaultdict
 from copy import copy
 from urllib.parse import urlparse, urlsplit, urlunsplit, urljoin, unquote, parse_qs
@@ -49,7 +49,8 @@ from blinker import signal
 from yapsy.PluginManager import PluginManager
 
 from . import DEBUG, SHOW_TRACEBACKS, filters, utils, hierarchy_utils, shortcodes
-from . import metadata_extractors
+from . import metadata_extractors, minifiers, profiler
+from .manifest import OutputManifest
 from .metadata_extractors import default_metadata_extractors_by
 from .post import Post  # NOQA
 from .plugin_categories import (
@@ -69,7 +70,7 @@ from .plugin_categories import (
     PostScanner,
     Taxonomy,
 )
-from .state import Persistor
+from .state import CachedFilter, DiskCache, FilterCache, Persistor, TargetList
 
 try:
     import pyphen
@@ -370,6 +371,49 @@ def _enclosure(post, lang):
         return url, length, mime
 
 
+def _formatmsg(s, *a):
+    """Format a message with printf-style arguments (``formatmsg`` in templates)."""
+    return s % a
+
+
+class _GlobalContext(dict):
+    """The global context, which counts changes to its entries.
+
+    Values computed from the global context can be cached for as long as
+    ``version`` does not change.
+    """
+
+    version = 0
+
+    def __setitem__(self, key, value):
+        self.version += 1
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.version += 1
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self.version += 1
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        self.version += 1
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self.version += 1
+        return super().pop(*args)
+
+    def popitem(self):
+        self.version += 1
+        return super().popitem()
+
+    def clear(self):
+        self.version += 1
+        super().clear()
+
+
 class Nikola(object):
     """Class that handles site generation.
 
@@ -394,6 +438,8 @@ class Nikola(object):
         self.posts_per_tag = defaultdict(list)
         self.posts_per_category = defaultdict(list)
         self.tags_per_language = defaultdict(list)
+        # lang -> {tag: slug}, for all tags of posts in feeds
+        self.tag_slugs = defaultdict(dict)
         self.post_per_file = {}
         self.timeline = []
         self.pages = []
@@ -407,6 +453,8 @@ class Nikola(object):
         self.colorful = config.pop('__colorful__', False)
         self.invariant = config.pop('__invariant__', False)
         self.quiet = config.pop('__quiet__', False)
+        self.profiler = profiler.BuildProfiler() if config.pop('__profile__', False) else profiler.NullProfiler()
+        profiler.set_profiler(self.profiler)
         self._doit_config = config.pop('DOIT_CONFIG', {})
         self.original_cwd = config.pop('__cwd__', False)
         self.configuration_filename = config.pop('__configuration_filename__', False)
@@ -414,6 +462,7 @@ class Nikola(object):
         self.injected_deps = defaultdict(list)
         self.shortcode_registry = {}
         self.metadata_extractors_by = default_metadata_extractors_by()
+        self._feed_item_cache = {}
 
         self.rst_transforms = []
         self.template_hooks = {
@@ -442,7 +491,10 @@ class Nikola(object):
             'BLOG_EMAIL': '',
             'BLOG_DESCRIPTION': 'Default Description',
             'BODY_END': "",
+            'BUNDLE_SOURCE_MAPS': False,
             'CACHE_FOLDER': 'cache',
+            'BATCH_FILTERS': False,
+            'CACHEABLE_FILTERS': [],
             'CATEGORIES_INDEX_PATH': '',
             'CATEGORY_PATH': None,  # None means: same as TAG_PATH
             'CATEGORY_PAGES_ARE_INDEXES': None,  # None means: same as TAG_PAGES_ARE_INDEXES
@@ -478,6 +530,7 @@ class Nikola(object):
             'RSS_COPYRIGHT_PLAIN': '',
             'RSS_COPYRIGHT_FORMATS': {},
             'COPY_SOURCES': True,
+            'CSS_MINIFY_SHORTEN': False,
             'CREATE_ARCHIVE_NAVIGATION': False,
             'CREATE_MONTHLY_ARCHIVE': False,
             'CREATE_SINGLE_ARCHIVE': False,
@@ -492,6 +545,7 @@ class Nikola(object):
             'DATE_FANCINESS': 0,
             'DEFAULT_LANG': "en",
             'DEPLOY_COMMANDS': {'default': []},
+            'DEPLOY_DIRECTORIES': {},
             'DISABLED_PLUGINS': [],
             'EXTRA_PLUGINS_DIRS': [],
             'EXTRA_THEMES_DIRS': [],
@@ -516,7 +570,9 @@ class Nikola(object):
             'GZIP_COMMAND': None,
             'GZIP_FILES': False,
             'GZIP_EXTENSIONS': ('.txt', '.htm', '.html', '.css', '.js', '.json', '.xml'),
+            'HASH_BUNDLES': False,
             'HIDDEN_AUTHORS': [],
+            'HTML_MINIFY': False,
             'HIDDEN_TAGS': [],
             'HIDE_REST_DOCINFO': False,
             'HIDDEN_CATEGORIES': [],
@@ -558,9 +614,17 @@ class Nikola(object):
             'PAGES': (("pages/*.txt", "pages", "page.tmpl"),),
             'PANDOC_OPTIONS': [],
             'PRETTY_URLS': True,
+            'POST_LIST_DETAIL': {},
+            'PURE_SHORTCODES': [],
+            'SHORTCODE_CACHE_MAX_SIZE': 64 * 1024 * 1024,
+            'FILTER_BATCH_SIZE': 50,
+            'FILTER_CACHE_MAX_SIZE': 256 * 1024 * 1024,
             'FUTURE_IS_NOW': False,
             'INDEX_READ_MORE_LINK': DEFAULT_INDEX_READ_MORE_LINK,
+            'RECORD_REBUILD_CAUSES': False,
             'REDIRECTIONS': [],
+            'REDIRECTIONS_BULK': False,
+            'REDIRECTIONS_SERVER_MAPS': {},
             'ROBOTS_EXCLUSIONS': [],
             'GENERATE_ATOM': False,
             'ATOM_EXTENSION': '.atom',
@@ -619,6 +683,7 @@ class Nikola(object):
             'DEMOTE_HEADERS': 1,
             'GITHUB_SOURCE_BRANCH': 'master',
             'GITHUB_DEPLOY_BRANCH': 'gh-pages',
+            'GITHUB_DEPLOY_INCREMENTAL': False,
             'GITHUB_REMOTE_NAME': 'origin',
             'GITHUB_COMMIT_SOURCE': False,  # WARNING: conf.py.in overrides this with True for backwards compatibility
             'META_GENERATOR_TAG': True,
@@ -627,7 +692,11 @@ class Nikola(object):
         }
 
         # set global_context for template rendering
-        self._GLOBAL_CONTEXT = {}
+        self._GLOBAL_CONTEXT = _GlobalContext()
+        # lang -> (global context version, translatable settings in lang)
+        self._translated_global_context = {}
+        # lang -> (global context version, base template context for lang)
+        self._base_template_context = {}
 
         # dependencies for all pages, not included in global context
         self.ALL_PAGE_DEPS = {}
@@ -964,12 +1033,16 @@ class Nikola(object):
         # Register default filters
         filter_name_format = 'filters.{0}'
         for filter_name, filter_definition in filters.__dict__.items():
-            # Ignore objects whose name starts with an underscore, or which are not callable
-            if filter_name.startswith('_') or not callable(filter_definition):
+            # Ignore objects whose name starts with an underscore, or which are not callable,
+            # and classes
+            if filter_name.startswith('_') or not callable(filter_definition) or isinstance(filter_definition, type):
                 continue
             # Register all other objects as filters
             self.register_filter(filter_name_format.format(filter_name), filter_definition)
 
+        # Content-hashed names of bundles (filled by the bundles plugin, see HASH_BUNDLES)
+        self.bundle_manifest = {}
+
         self._set_global_context_from_config()
         self._set_all_page_deps_from_config()
         # Read data files only if a site exists (Issue #2708)
@@ -982,6 +1055,36 @@ class Nikola(object):
         # Set cache facility
         self.cache = Persistor(os.path.join(self.config['CACHE_FOLDER'], 'cache_data.json'))
 
+        # Set cache for the output of pure shortcodes
+        self.shortcode_cache = DiskCache(os.path.join(self.config['CACHE_FOLDER'], 'shortcodes'),
+                                         self.config['SHORTCODE_CACHE_MAX_SIZE'])
+
+        # Set cache for code highlighted by Pygments (listings, code blocks)
+        # The cache is global (like the lexers it is used by), so it must not
+        # depend on the current directory when highlighting happens.
+        self.highlight_cache = DiskCache(os.path.abspath(os.path.join(self.config['CACHE_FOLDER'], 'highlight')))
+        utils.set_highlight_cache(None if self.invariant or not self.configured else self.highlight_cache)
+
+        # Set cache for the output of cacheable filters
+        self.filter_cache = None
+        if self.config['FILTER_CACHE_MAX_SIZE'] > 0 and self.configured and not self.invariant:
+            self.filter_cache = FilterCache(os.path.join(self.config['CACHE_FOLDER'], 'filters'),
+                                            self.config['FILTER_CACHE_MAX_SIZE'])
+
+        # Savings and throughput of HTML_MINIFY
+        self.html_minify_stats = minifiers.HTMLMinifyStats()
+
+        # Inputs of config_changed digests, used by `nikola explain-rebuild`
+        self.config_changed_inputs = DiskCache(os.path.join(self.config['CACHE_FOLDER'], 'config_changed'))
+        utils.config_changed.set_recorder(self.config_changed_inputs if self.config['RECORD_REBUILD_CAUSES'] else None)
+
+        # Targets of the last build, for `nikola check -f` and `nikola orphans`
+        self.target_list = TargetList(os.path.join(self.config['CACHE_FOLDER'], 'targets.json'))
+
+        # Files in the output folder, with their hashes, updated by `nikola build`
+        self.output_manifest = OutputManifest(self.config['OUTPUT_FOLDER'],
+                                              os.path.join(self.config['CACHE_FOLDER'], 'output_manifest.json'))
+
         # Create directories for persistors only if a site exists (Issue #2334)
         if self.configured:
             self.state._set_site(self)
@@ -1175,21 +1278,35 @@ class Nikola(object):
         self._register_templated_shortcodes()
 
         # Check with registered filters and configure filters
+        self.batched_filters = {}
         for actions in self.config['FILTERS'].values():
             for i, f in enumerate(actions):
+                if isinstance(f, (CachedFilter, filters.BatchedFilter)):
+                    continue
+                cacheable = f in self.config['CACHEABLE_FILTERS']
                 if isinstance(f, str):
                     # Check whether this denotes a registered filter
                     _f = self.filters.get(f)
                     if _f is not None:
                         f = _f
                         actions[i] = f
+                cacheable = cacheable or getattr(f, 'nikola_filter_cacheable', False)
+                args = {}
                 if hasattr(f, 'configuration_variables'):
-                    args = {}
                     for arg, config in f.configuration_variables.items():
                         if config in self.config:
                             args[arg] = self.config[config]
                     if args:
                         actions[i] = functools.partial(f, **args)
+                if self.config['BATCH_FILTERS'] and hasattr(f, 'nikola_filter_batch'):
+                    # Filters with the same configuration share a batch
+                    key = (f, tuple(sorted(args.items())))
+                    if key not in self.batched_filters:
+                        self.batched_filters[key] = filters.BatchedFilter(
+                            f, args, self.config['FILTER_BATCH_SIZE'], self.filter_cache if cacheable else None)
+                    actions[i] = self.batched_filters[key]
+                elif cacheable and self.filter_cache is not None:
+                    actions[i] = self.filter_cache.wrap(actions[i])
 
         # Signal that we are configured
         signal('configured').send(self)
@@ -1214,6 +1331,7 @@ class Nikola(object):
             'INDEX_DISPLAY_POST_COUNT']
         self._GLOBAL_CONTEXT['index_file'] = self.config['INDEX_FILE']
         self._GLOBAL_CONTEXT['use_bundles'] = self.config['USE_BUNDLES']
+        self._GLOBAL_CONTEXT['bundle_manifest'] = self.bundle_manifest
         self._GLOBAL_CONTEXT['use_cdn'] = self.config.get("USE_CDN")
         self._GLOBAL_CONTEXT['theme_color'] = self.config.get("THEME_COLOR")
         self._GLOBAL_CONTEXT['theme_config'] = self.config.get("THEME_CONFIG")
@@ -1306,6 +1424,7 @@ class Nikola(object):
         self.ALL_PAGE_DEPS['slug_author_path'] = self.config.get('SLUG_AUTHOR_PATH')
         self.ALL_PAGE_DEPS['slug_tag_path'] = self.config.get('SLUG_TAG_PATH')
         self.ALL_PAGE_DEPS['locale'] = self.config.get('LOCALE')
+        self.ALL_PAGE_DEPS['html_minify'] = self.config.get('HTML_MINIFY')
 
     def _activate_plugins_of_category(self, category):
         """Activate all the plugins of a given category and return them."""
@@ -1373,6 +1492,39 @@ class Nikola(object):
 
     GLOBAL_CONTEXT = property(_get_global_context)
 
+    def translated_global_context(self, lang):
+        """Return the values of the translatable global context entries in lang.
+
+        The values are computed once per language, and computed again only
+        if the global context changes. Do not modify the returned dict.
+        """
+        version = self._GLOBAL_CONTEXT.version
+        cached = self._translated_global_context.get(lang)
+        if cached is None or cached[0] != version:
+            cached = self._translated_global_context[lang] = (
+                version, {k: self._GLOBAL_CONTEXT[k](lang) for k in self._GLOBAL_CONTEXT_TRANSLATABLE})
+        return cached[1]
+
+    def _get_base_template_context(self, lang):
+        """Return the template context shared by all pages in lang.
+
+        It contains the global context (with translatable entries in lang)
+        and the entries which only depend on the language. It is built again
+        when the global context changes. Do not modify the returned dict.
+        """
+        global_context = self.GLOBAL_CONTEXT
+        version = global_context.version
+        cached = self._base_template_context.get(lang)
+        if cached is None or cached[0] != version:
+            base = dict(global_context)
+            base.update(self.translated_global_context(lang))
+            base['is_rtl'] = lang in LEGAL_VALUES['RTL_LANGUAGES']
+            base['url_type'] = self.config['URL_TYPE']
+            base['translations_feedorder'] = sorted(base['translations'], key=lambda x: (int(x != lang), x))
+            base['formatmsg'] = _formatmsg
+            cached = self._base_template_context[lang] = (version, base)
+        return cached[1]
+
     def _get_template_system(self):
         if self._template_system is None:
             # Load template plugin
@@ -1446,28 +1598,31 @@ class Nikola(object):
         If ``is_fragment`` is set to ``True``, a HTML fragment will
         be rendered and not a whole HTML document.
         """
-        local_context = {}
+        lang = context['lang'] if 'lang' in context else self.GLOBAL_CONTEXT['lang']
+        base_context = self._get_base_template_context(lang)
+        local_context = base_context.copy()
         local_context["template_name"] = template_name
-        local_context.update(self.GLOBAL_CONTEXT)
         local_context.update(context)
+        # The page context can override global entries, but not the
+        # entries computed from the language.
         for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-            local_context[k] = local_context[k](local_context['lang'])
-        local_context['is_rtl'] = local_context['lang'] in LEGAL_VALUES['RTL_LANGUAGES']
+            if k in context:
+                local_context[k] = context[k](lang)
+        for k in ('is_rtl', 'translations_feedorder', 'formatmsg'):
+            local_context[k] = base_context[k]
+        if 'translations' in context:
+            local_context["translations_feedorder"] = sorted(
+                local_context["translations"], key=lambda x: (int(x != lang), x))
         local_context['url_type'] = self.config['URL_TYPE'] if url_type is None else url_type
-        local_context["translations_feedorder"] = sorted(
-            local_context["translations"],
-            key=lambda x: (int(x != local_context['lang']), x)
-        )
-        # string, arguments
-        local_context["formatmsg"] = lambda s, *a: s % a
         for h in local_context['template_hooks'].values():
             h.context = context
 
         for func in self.config['GLOBAL_CONTEXT_FILLER']:
             func(local_context, template_name)
 
-        data = self.template_system.render_template(
-            template_name, None, local_context)
+        with self.profiler.span('render_template'):
+            data = self.template_system.render_template(
+                template_name, None, local_context)
 
         if output_name is None:
             return data
@@ -1489,8 +1644,17 @@ class Nikola(object):
             doc = lxml.html.fragment_fromstring(data.strip(), parser)
         else:
             doc = lxml.html.document_fromstring(data.strip(), parser)
-        self.rewrite_links(doc, src, context['lang'], url_type)
-        if is_fragment:
+        with self.profiler.span('rewrite_links'):
+            self.rewrite_links(doc, src, context['lang'], url_type)
+        if self.config['HTML_MINIFY']:
+            # Minify the tree we already have instead of parsing the output again
+            start = time.perf_counter()
+            output = minifiers.minify_html_tree(doc, None if is_fragment else '<!DOCTYPE html>', is_fragment).encode('utf-8')
+            elapsed = time.perf_counter() - start
+            self.html_minify_stats.add(len(data.strip().encode('utf-8')), len(output), elapsed)
+            self.profiler.add('html_minify', elapsed)
+            data = output
+        elif is_fragment:
             # doc.text contains text before the first HTML, or None if there was no text
             # The text after HTML elements is added by tostring() (because its implicit
             # argument with_tail has default value True).
@@ -1589,6 +1753,13 @@ class Nikola(object):
         # Normalize
         dst = urljoin(src, dst)
 
+        # Link to the content-hashed names of bundles
+        if self.bundle_manifest:
+            parsed_dst = urlsplit(dst)
+            hashed = self.bundle_manifest.get(parsed_dst.path.lstrip('/'))
+            if hashed:
+                dst = urlunsplit(parsed_dst._replace(path='/' + hashed))
+
         # Avoid empty links.
         if src == dst:
             if url_type == 'absolute':
@@ -1658,11 +1829,10 @@ class Nikola(object):
         """
         def render_shortcode(*args, **kw):
             context = self.GLOBAL_CONTEXT.copy()
+            context.update(self.translated_global_context(utils.LocaleBorg().current_lang))
             context.update(kw)
             context['_args'] = args
             context['lang'] = utils.LocaleBorg().current_lang
-            for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-                context[k] = context[k](context['lang'])
             output = self.template_system.render_template_to_string(t_data, context)
             if fname is not None:
                 dependencies = [fname] + self.template_system.get_deps(fname)
@@ -1700,11 +1870,10 @@ class Nikola(object):
     def _template_shortcode_handler(self, *args, **kw):
         t_data = kw.pop('data', '')
         context = self.GLOBAL_CONTEXT.copy()
+        context.update(self.translated_global_context(utils.LocaleBorg().current_lang))
         context.update(kw)
         context['_args'] = args
         context['lang'] = utils.LocaleBorg().current_lang
-        for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-            context[k] = context[k](context['lang'])
         output = self.template_system.render_template_to_string(t_data, context)
         dependencies = self.template_system.get_string_deps(t_data)
         return output, dependencies
@@ -1714,15 +1883,23 @@ class Nikola(object):
         if name in self.shortcode_registry:
             utils.LOGGER.warning('Shortcode name conflict: {}', name)
             return
+        if name in self.config['PURE_SHORTCODES']:
+            f = shortcodes.mark_pure(f)
         self.shortcode_registry[name] = f
 
+    def _get_shortcode_cache(self):
+        """Return the cache for pure shortcodes, or None if it should not be used."""
+        if self.invariant or not self.configured:
+            return None
+        return self.shortcode_cache
+
     def apply_shortcodes(self, data, filename=None, lang=None, extra_context=None):
         """Apply shortcodes from the registry on data."""
         if extra_context is None:
             extra_context = {}
         if lang is None:
             lang = utils.LocaleBorg().current_lang
-        return shortcodes.apply_shortcodes(data, self.shortcode_registry, self, filename, lang=lang, extra_context=extra_context)
+        return shortcodes.apply_shortcodes(data, self.shortcode_registry, self, filename, lang=lang, extra_context=extra_context, cache=self._get_shortcode_cache())
 
     def apply_shortcodes_uuid(self, data, _shortcodes, filename=None, lang=None, extra_context=None):
         """Apply shortcodes from the registry on data."""
@@ -1731,10 +1908,18 @@ class Nikola(object):
         if extra_context is None:
             extra_context = {}
         deps = []
+        replacements = {}
+        cache = self._get_shortcode_cache()
         for k, v in _shortcodes.items():
-            replacement, _deps = shortcodes.apply_shortcodes(v, self.shortcode_registry, self, filename, lang=lang, extra_context=extra_context)
-            data = data.replace(k, replacement)
+            replacement, _deps = shortcodes.apply_shortcodes(v, self.shortcode_registry, self, filename, lang=lang, extra_context=extra_context, cache=cache)
+            if shortcodes.SHORTCODE_ID_RE.fullmatch(k):
+                replacements[k] = replacement
+            else:
+                data = data.replace(k, replacement)
             deps.extend(_deps)
+        if replacements:
+            # Substitute all placeholders in a single pass over data
+            data = shortcodes.SHORTCODE_ID_RE.sub(lambda m: replacements.get(m.group(0), m.group(0)), data)
         return data, deps
 
     def _get_rss_copyright(self, lang, rss_plain):
@@ -1745,86 +1930,126 @@ class Nikola(object):
         else:
             return self.config['RSS_COPYRIGHT'](lang)
 
-    def generic_rss_feed(self, lang, title, link, description, timeline,
-                         rss_teasers, rss_plain, feed_length=10, feed_url=None,
-                         enclosure=_enclosure, rss_links_append_query=None, copyright_=None):
-        """Generate an ExtendedRSS2 feed object for later use."""
-        rss_obj = utils.ExtendedRSS2(
-            title=title,
-            link=utils.encodelink(link),
-            description=description,
-            lastBuildDate=datetime.datetime.utcnow(),
-            generator='Nikola (getnikola.com)',
-            language=lang
-        )
+    def feed_item_description(self, post, lang, teaser_only, plain, feed_append_query=None):
+        """Return the description of post used in RSS and Atom feeds.
+
+        Unless plain, this is the post HTML with absolute links (and the
+        preview image, if any). It is computed once per post, language and
+        set of options, and shared by all feeds generated during a build.
+        """
+        key = (post, lang, teaser_only, plain, feed_append_query)
+        try:
+            return self._feed_item_cache[key]
+        except KeyError:
+            pass
+        data = post.text(lang, teaser_only=teaser_only, strip_html=plain,
+                         feed_read_more_link=True, feed_links_append_query=feed_append_query)
+        if data and not plain:
+            # Massage the post's HTML
+            if 'previewimage' in post.meta[lang] and post.meta[lang]['previewimage'] not in data:
+                data = "<figure><img src=\"{}\"></figure> {}".format(post.meta[lang]['previewimage'], data)
+            # FIXME: this is duplicated with code in Post.text()
+            try:
+                doc = lxml.html.document_fromstring(data)
+                doc.rewrite_links(lambda dst: self.url_replacer(post.permalink(lang), dst, lang, 'absolute'))
+                try:
+                    body = doc.body
+                    data = (body.text or '') + ''.join(
+                        [lxml.html.tostring(child, encoding='unicode')
+                            for child in body.iterchildren()])
+                except IndexError:  # No body there, it happens sometimes
+                    data = ''
+            except lxml.etree.ParserError as e:
+                if str(e) == "Document is empty":
+                    data = ""
+                else:  # let other errors raise
+                    raise
+        self._feed_item_cache[key] = data
+        return data
+
+    def _rss_feed_channel(self, lang, title, link, description, rss_plain, feed_url=None, copyright_=None):
+        """Return the channel data and the stylesheet URL of a RSS feed."""
+        channel = {
+            'title': title,
+            'link': utils.encodelink(link),
+            'description': description,
+            'lastBuildDate': datetime.datetime.utcnow(),
+            'generator': 'Nikola (getnikola.com)',
+            'language': lang,
+        }
 
         if copyright_ is None:
             copyright_ = self._get_rss_copyright(lang, rss_plain)
         # Use the configured or specified copyright string if present.
         if copyright_:
-            rss_obj.copyright = copyright_
+            channel['copyright'] = copyright_
 
+        xsl_stylesheet_href = None
         if feed_url:
             absurl = '/' + feed_url[len(self.config['BASE_URL']):]
-            rss_obj.xsl_stylesheet_href = self.url_replacer(absurl, "/assets/xml/rss.xsl")
-
-        items = []
-
-        feed_append_query = None
-        if rss_links_append_query:
-            if rss_links_append_query is True:
-                raise ValueError("RSS_LINKS_APPEND_QUERY (or FEED_LINKS_APPEND_QUERY) cannot be True. Valid values are False or a formattable string.")
-            feed_append_query = rss_links_append_query.format(
-                feedRelUri='/' + feed_url[len(self.config['BASE_URL']):],
-                feedFormat="rss")
-
+            xsl_stylesheet_href = self.url_replacer(absurl, "/assets/xml/rss.xsl")
+        return channel, xsl_stylesheet_href
+
+    def _rss_feed_append_query(self, rss_links_append_query, feed_url):
+        """Return the query to append to links in a RSS feed, if any."""
+        if not rss_links_append_query:
+            return None
+        if rss_links_append_query is True:
+            raise ValueError("RSS_LINKS_APPEND_QUERY (or FEED_LINKS_APPEND_QUERY) cannot be True. Valid values are False or a formattable string.")
+        return rss_links_append_query.format(
+            feedRelUri='/' + feed_url[len(self.config['BASE_URL']):],
+            feedFormat="rss")
+
+    def _rss_feed_items(self, lang, timeline, rss_teasers, rss_plain, feed_length=10, feed_url=None,
+                        enclosure=_enclosure, feed_append_query=None):
+        """Generate the items of a RSS feed, as dicts accepted by utils.rss_stream_writer."""
         for post in timeline[:feed_length]:
-            data = post.text(lang, teaser_only=rss_teasers, strip_html=rss_plain,
-                             feed_read_more_link=True, feed_links_append_query=feed_append_query)
-            if feed_url is not None and data:
-                # Massage the post's HTML (unless plain)
-                if not rss_plain:
-                    if 'previewimage' in post.meta[lang] and post.meta[lang]['previewimage'] not in data:
-                        data = "<figure><img src=\"{}\"></figure> {}".format(post.meta[lang]['previewimage'], data)
-                    # FIXME: this is duplicated with code in Post.text()
-                    try:
-                        doc = lxml.html.document_fromstring(data)
-                        doc.rewrite_links(lambda dst: self.url_replacer(post.permalink(), dst, lang, 'absolute'))
-                        try:
-                            body = doc.body
-                            data = (body.text or '') + ''.join(
-                                [lxml.html.tostring(child, encoding='unicode')
-                                    for child in body.iterchildren()])
-                        except IndexError:  # No body there, it happens sometimes
-                            data = ''
-                    except lxml.etree.ParserError as e:
-                        if str(e) == "Document is empty":
-                            data = ""
-                        else:  # let other errors raise
-                            raise
-            args = {
+            if feed_url is not None:
+                data = self.feed_item_description(post, lang, rss_teasers, rss_plain, feed_append_query)
+            else:
+                data = post.text(lang, teaser_only=rss_teasers, strip_html=rss_plain,
+                                 feed_read_more_link=True, feed_links_append_query=feed_append_query)
+            item = {
                 'title': post.title(lang) if post.should_show_title() else None,
                 'link': post.permalink(lang, absolute=True, query=feed_append_query),
                 'description': data,
-                # PyRSS2Gen's pubDate is GMT time.
-                'pubDate': (post.date if post.date.tzinfo is None else
-                            post.date.astimezone(dateutil.tz.tzutc())),
+                'pubDate': post.date,
                 'categories': post._tags.get(lang, []),
                 'creator': post.author(lang),
                 'guid': post.guid(lang),
             }
 
-            if post.author(lang):
-                rss_obj.rss_attrs["xmlns:dc"] = "http://purl.org/dc/elements/1.1/"
-
             if enclosure:
                 # enclosure callback returns None if post has no enclosure, or a
                 # 3-tuple of (url, length (0 is valid), mimetype)
-                enclosure_details = enclosure(post=post, lang=lang)
-                if enclosure_details is not None:
-                    args['enclosure'] = rss.Enclosure(*enclosure_details)
+                item['enclosure'] = enclosure(post=post, lang=lang)
+
+            yield item
+
+    def generic_rss_feed(self, lang, title, link, description, timeline,
+                         rss_teasers, rss_plain, feed_length=10, feed_url=None,
+                         enclosure=_enclosure, rss_links_append_query=None, copyright_=None):
+        """Generate an ExtendedRSS2 feed object for later use.
+
+        To write a feed to a file, use generic_rss_renderer, which does not
+        keep the whole feed in memory.
+        """
+        channel, xsl_stylesheet_href = self._rss_feed_channel(lang, title, link, description, rss_plain, feed_url, copyright_)
+        rss_obj = utils.ExtendedRSS2(**channel)
+        rss_obj.xsl_stylesheet_href = xsl_stylesheet_href
 
-            items.append(utils.ExtendedItem(**args))
+        items = []
+        feed_append_query = self._rss_feed_append_query(rss_links_append_query, feed_url)
+        for item in self._rss_feed_items(lang, timeline, rss_teasers, rss_plain, feed_length, feed_url,
+                                         enclosure, feed_append_query):
+            # PyRSS2Gen's pubDate is GMT time.
+            if item['pubDate'].tzinfo is not None:
+                item['pubDate'] = item['pubDate'].astimezone(dateutil.tz.tzutc())
+            if item.get('enclosure') is not None:
+                item['enclosure'] = rss.Enclosure(*item['enclosure'])
+            if item['creator']:
+                rss_obj.rss_attrs["xmlns:dc"] = "http://purl.org/dc/elements/1.1/"
+            items.append(utils.ExtendedItem(**item))
 
         rss_obj.items = items
         rss_obj.self_url = feed_url
@@ -1835,10 +2060,11 @@ class Nikola(object):
                              rss_teasers, rss_plain, feed_length=10, feed_url=None,
                              enclosure=_enclosure, rss_links_append_query=None, copyright_=None):
         """Take all necessary data, and render a RSS feed in output_path."""
-        rss_obj = self.generic_rss_feed(lang, title, link, description, timeline,
-                                        rss_teasers, rss_plain, feed_length=feed_length, feed_url=feed_url,
-                                        enclosure=enclosure, rss_links_append_query=rss_links_append_query, copyright_=copyright_)
-        utils.rss_writer(rss_obj, output_path)
+        channel, xsl_stylesheet_href = self._rss_feed_channel(lang, title, link, description, rss_plain, feed_url, copyright_)
+        feed_append_query = self._rss_feed_append_query(rss_links_append_query, feed_url)
+        items = self._rss_feed_items(lang, timeline, rss_teasers, rss_plain, feed_length, feed_url,
+                                     enclosure, feed_append_query)
+        utils.rss_stream_writer(output_path, channel, items, xsl_stylesheet_href, self_url=feed_url)
 
     def path(self, kind, name, lang=None, is_link=False, **kwargs):
         r"""Build the path to a certain kind of page.
@@ -2052,7 +2278,8 @@ class Nikola(object):
 
         task_dep = []
         for pluginInfo in self.plugin_manager.getPluginsOfCategory(plugin_category):
-            for task in flatten(pluginInfo.plugin_object.gen_tasks()):
+            span_name = 'gen_tasks:' + pluginInfo.plugin_object.name
+            for task in self.profiler.timed_iter(span_name, flatten(pluginInfo.plugin_object.gen_tasks())):
                 if 'basename' not in task:
                     raise ValueError("Task {0} does not have a basename".format(task))
                 task = self.clean_task_paths(task)
@@ -2154,8 +2381,13 @@ class Nikola(object):
         """
         if self._scanned and not really:
             return
+        with self.profiler.span('scan_posts'):
+            self._scan_posts(ignore_quit)
 
+    def _scan_posts(self, ignore_quit):
+        """Scan all the posts (unconditionally)."""
         # Reset things
+        self._feed_item_cache = {}
         self.posts = []
         self.all_posts = []
         self.posts_per_year = defaultdict(list)
@@ -2163,6 +2395,7 @@ class Nikola(object):
         self.posts_per_tag = defaultdict(list)
         self.posts_per_category = defaultdict(list)
         self.tags_per_language = defaultdict(list)
+        self.tag_slugs = defaultdict(dict)
         self.category_hierarchy = {}
         self.post_per_file = {}
         self.post_per_input_file = {}
@@ -2171,7 +2404,8 @@ class Nikola(object):
 
         for p in sorted(self.plugin_manager.getPluginsOfCategory('PostScanner'), key=operator.attrgetter('name')):
             try:
-                timeline = p.plugin_object.scan()
+                with self.profiler.span('scan_posts:' + p.name):
+                    timeline = p.plugin_object.scan()
             except Exception:
                 utils.LOGGER.error('Error reading timeline')
                 raise
@@ -2180,18 +2414,20 @@ class Nikola(object):
 
         quit = False
         # Classify posts per year/tag/month/whatever
-        slugged_tags = defaultdict(set)
         for post in self.timeline:
             if post.use_in_feeds:
                 self.posts.append(post)
                 self.posts_per_year[str(post.date.year)].append(post)
                 self.posts_per_month[
                     '{0}/{1:02d}'.format(post.date.year, post.date.month)].append(post)
+                post_tags = set()
                 for lang in self.config['TRANSLATIONS'].keys():
+                    tag_slugs = self.tag_slugs[lang]
                     for tag in post.tags_for_language(lang):
-                        _tag_slugified = utils.slugify(tag, lang)
-                        slugged_tags[lang].add(_tag_slugified)
-                        if post not in self.posts_per_tag[tag]:
+                        if tag not in tag_slugs:
+                            tag_slugs[tag] = utils.slugify(tag, lang)
+                        if tag not in post_tags:
+                            post_tags.add(tag)
                             self.posts_per_tag[tag].append(post)
                     self.tags_per_language[lang].extend(post.tags_for_language(lang))
                 self._add_post_to_category(post, post.meta('category'))
@@ -2282,8 +2518,7 @@ class Nikola(object):
         for k, v in self.GLOBAL_CONTEXT['template_hooks'].items():
             deps_dict['||template_hooks|{0}||'.format(k)] = v.calculate_deps()
 
-        for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-            deps_dict[k] = deps_dict['global'][k](lang)
+        deps_dict.update(self.translated_global_context(lang))
         for k in self._ALL_PAGE_DEPS_TRANSLATABLE:
             deps_dict[k] = deps_dict['all_page_deps'][k](lang)
 
@@ -2360,13 +2595,25 @@ class Nikola(object):
                                     post_deps_dict=deps_dict,
                                     url_type=post.url_type)
 
-    def generic_post_list_renderer(self, lang, posts, output_name, template_name, filters, extra_context):
-        """Render pages with lists of posts."""
+    def generic_post_list_renderer(self, lang, posts, output_name, template_name, filters, extra_context, post_detail='text'):
+        """Render pages with lists of posts.
+
+        post_detail says how much of each post the page shows, and thus on
+        what the page depends: 'title' (title, date, link and other metadata),
+        'teaser' or 'text'. The POST_LIST_DETAIL setting overrides it.
+        """
+        post_detail = self._post_list_detail(template_name, post_detail)
+        if post_detail == 'teaser' and self._read_more_link_depends_on_text(lang):
+            post_detail = 'text'
+
         deps = []
         uptodate_deps = []
         for post in posts:
-            deps += post.deps(lang)
-            uptodate_deps += post.deps_uptodate(lang)
+            if post_detail == 'text':
+                deps += post.deps(lang)
+                uptodate_deps += post.deps_uptodate(lang)
+            elif post_detail == 'teaser':
+                uptodate_deps.append(post.teaser_deps_uptodate(lang))
 
         context = {}
         context["posts"] = posts
@@ -2380,13 +2627,36 @@ class Nikola(object):
             context['has_other_languages'] = False
 
         post_deps_dict = {}
-        post_deps_dict["posts"] = [(p.meta[lang]['title'], p.permalink(lang)) for p in posts]
+        if post_detail == 'text':
+            post_deps_dict["posts"] = [(p.meta[lang]['title'], p.permalink(lang)) for p in posts]
+        else:
+            post_deps_dict["posts"] = [p.summary_deps_dict(lang) for p in posts]
 
-        return self.generic_renderer(lang, output_name, template_name, filters,
+        task = self.generic_renderer(lang, output_name, template_name, filters,
                                      file_deps=deps,
                                      uptodate_deps=uptodate_deps,
                                      context=context,
                                      post_deps_dict=post_deps_dict)
+        if post_detail == 'teaser' and posts:
+            # Teasers are read from the compiled posts
+            task['task_dep'] = ['render_posts']
+        return task
+
+    def _post_list_detail(self, template_name, default):
+        """Find the POST_LIST_DETAIL of a template, or of a template it inherits from or includes."""
+        overrides = self.config['POST_LIST_DETAIL']
+        if overrides:
+            names = [template_name] + [os.path.basename(dep) for dep in self.template_system.template_deps(template_name)]
+            for name in names:
+                if name in overrides:
+                    return overrides[name]
+        return default
+
+    def _read_more_link_depends_on_text(self, lang):
+        """Return True if INDEX_READ_MORE_LINK shows something about the text after the teaser."""
+        return any(field in self.config['INDEX_READ_MORE_LINK'](lang) for field in
+                   ('{min_remaining_read}', '{reading_time}', '{remaining_reading_time}',
+                    '{paragraph_count}', '{remaining_paragraph_count}'))
 
     def atom_feed_renderer(self, lang, posts, output_path, filters,
                            extra_context):
@@ -2394,13 +2664,6 @@ class Nikola(object):
 
         Feeds are considered archives when no future updates to them are expected.
         """
-        def atom_link(link_rel, link_type, link_href):
-            link = lxml.etree.Element("link")
-            link.set("rel", link_rel)
-            link.set("type", link_type)
-            link.set("href", utils.encodelink(link_href))
-            return link
-
         utils.LocaleBorg().set_locale(lang)
         deps = []
         uptodate_deps = []
@@ -2424,34 +2687,20 @@ class Nikola(object):
         deps_context["global"] = self.GLOBAL_CONTEXT
         deps_context["all_page_deps"] = self.ALL_PAGE_DEPS
 
-        for k in self._GLOBAL_CONTEXT_TRANSLATABLE:
-            deps_context[k] = deps_context['global'][k](lang)
+        deps_context.update(self.translated_global_context(lang))
         for k in self._ALL_PAGE_DEPS_TRANSLATABLE:
             deps_context[k] = deps_context['all_page_deps'][k](lang)
 
-        feed_xsl_link = self.abs_link("/assets/xml/atom.xsl")
-        feed_root = lxml.etree.Element("feed")
-        feed_root.addprevious(lxml.etree.ProcessingInstruction(
-            "xml-stylesheet",
-            'href="' + utils.encodelink(feed_xsl_link) + '" type="text/xsl media="all"'))
-        feed_root.set("{http://www.w3.org/XML/1998/namespace}lang", lang)
-        feed_root.set("xmlns", "http://www.w3.org/2005/Atom")
-        feed_title = lxml.etree.SubElement(feed_root, "title")
-        feed_title.text = context["title"]
-        feed_id = lxml.etree.SubElement(feed_root, "id")
-        feed_id.text = self.abs_link(context["feedlink"])
-        feed_updated = lxml.etree.SubElement(feed_root, "updated")
-        feed_updated.text = utils.LocaleBorg().formatted_date('webiso', datetime.datetime.now(tz=dateutil.tz.tzutc()))
-        feed_author = lxml.etree.SubElement(feed_root, "author")
-        feed_author_name = lxml.etree.SubElement(feed_author, "name")
-        feed_author_name.text = self.config["BLOG_AUTHOR"](lang)
-        feed_root.append(atom_link("self", "application/atom+xml",
-                                   self.abs_link(context["feedlink"])))
-        feed_root.append(atom_link("alternate", "text/html",
-                                   self.abs_link(context["permalink"])))
-        feed_generator = lxml.etree.SubElement(feed_root, "generator")
-        feed_generator.set("uri", "https://getnikola.com/")
-        feed_generator.text = "Nikola"
+        feed = {
+            'lang': lang,
+            'title': context["title"],
+            'id': self.abs_link(context["feedlink"]),
+            'updated': utils.LocaleBorg().formatted_date('webiso', datetime.datetime.now(tz=dateutil.tz.tzutc())),
+            'author': self.config["BLOG_AUTHOR"](lang),
+            'links': [("self", "application/atom+xml", self.abs_link(context["feedlink"])),
+                      ("alternate", "text/html", self.abs_link(context["permalink"]))],
+            'generator': ("https://getnikola.com/", "Nikola"),
+        }
 
         feed_append_query = None
         if self.config["FEED_LINKS_APPEND_QUERY"]:
@@ -2459,81 +2708,28 @@ class Nikola(object):
                 feedRelUri=context["feedlink"],
                 feedFormat="atom")
 
-        def atom_post_text(post, text):
-            if not self.config["FEED_PLAIN"]:
-                if 'previewimage' in post.meta[lang] and post.meta[lang]['previewimage'] not in text:
-                    text = "<figure><img src=\"{}\"></figure> {}".format(post.meta[lang]['previewimage'], text)
-
-                # FIXME: this is duplicated with code in Post.text() and generic_rss_renderer
-                try:
-                    doc = lxml.html.document_fromstring(text)
-                    doc.rewrite_links(lambda dst: self.url_replacer(post.permalink(lang), dst, lang, 'absolute'))
-                    try:
-                        body = doc.body
-                        text = (body.text or '') + ''.join(
-                            [lxml.html.tostring(child, encoding='unicode')
-                                for child in body.iterchildren()])
-                    except IndexError:  # No body there, it happens sometimes
-                        text = ''
-                except lxml.etree.ParserError as e:
-                    if str(e) == "Document is empty":
-                        text = ""
-                    else:  # let other errors raise
-                        raise
-            return text.strip()
-
-        for post in posts:
-            summary = atom_post_text(post, post.text(lang, teaser_only=True,
-                                                     strip_html=self.config["FEED_PLAIN"],
-                                                     feed_read_more_link=True,
-                                                     feed_links_append_query=feed_append_query))
-            content = None
-            if not self.config["FEED_TEASERS"]:
-                content = atom_post_text(post, post.text(lang, teaser_only=self.config["FEED_TEASERS"],
-                                                         strip_html=self.config["FEED_PLAIN"],
-                                                         feed_read_more_link=True,
-                                                         feed_links_append_query=feed_append_query))
-
-            entry_root = lxml.etree.SubElement(feed_root, "entry")
-            entry_title = lxml.etree.SubElement(entry_root, "title")
-            entry_title.text = post.title(lang)
-            entry_id = lxml.etree.SubElement(entry_root, "id")
-            entry_id.text = post.permalink(lang, absolute=True)
-            entry_updated = lxml.etree.SubElement(entry_root, "updated")
-            entry_updated.text = post.formatted_updated('webiso')
-            entry_published = lxml.etree.SubElement(entry_root, "published")
-            entry_published.text = post.formatted_date('webiso')
-            entry_author = lxml.etree.SubElement(entry_root, "author")
-            entry_author_name = lxml.etree.SubElement(entry_author, "name")
-            entry_author_name.text = post.author(lang)
-            entry_root.append(atom_link("alternate", "text/html",
-                                        post.permalink(lang, absolute=True,
-                                                       query=feed_append_query)))
-            entry_summary = lxml.etree.SubElement(entry_root, "summary")
-            if not self.config["FEED_PLAIN"]:
-                entry_summary.set("type", "html")
-            else:
-                entry_summary.set("type", "text")
-            entry_summary.text = summary
-            if content:
-                entry_content = lxml.etree.SubElement(entry_root, "content")
-                if not self.config["FEED_PLAIN"]:
-                    entry_content.set("type", "html")
-                else:
-                    entry_content.set("type", "text")
-                entry_content.text = content
-            for category in post.tags_for_language(lang):
-                entry_category = lxml.etree.SubElement(entry_root, "category")
-                entry_category.set("term", utils.slugify(category, lang))
-                entry_category.set("label", category)
-
-        dst_dir = os.path.dirname(output_path)
-        utils.makedirs(dst_dir)
-        with io.open(output_path, "w+", encoding="utf-8") as atom_file:
-            data = lxml.etree.tostring(feed_root.getroottree(), encoding="UTF-8", pretty_print=True, xml_declaration=True)
-            if isinstance(data, bytes):
-                data = data.decode('utf-8')
-            atom_file.write(data)
+        def atom_entries():
+            for post in posts:
+                summary = self.feed_item_description(post, lang, True, self.config["FEED_PLAIN"],
+                                                     feed_append_query).strip()
+                content = None
+                if not self.config["FEED_TEASERS"]:
+                    content = self.feed_item_description(post, lang, self.config["FEED_TEASERS"], self.config["FEED_PLAIN"],
+                                                         feed_append_query).strip()
+                yield {
+                    'title': post.title(lang),
+                    'id': post.permalink(lang, absolute=True),
+                    'updated': post.formatted_updated('webiso'),
+                    'published': post.formatted_date('webiso'),
+                    'author': post.author(lang),
+                    'links': [("alternate", "text/html", post.permalink(lang, absolute=True, query=feed_append_query))],
+                    'summary': summary,
+                    'content': content,
+                    'type': "text" if self.config["FEED_PLAIN"] else "html",
+                    'categories': [(utils.slugify(category, lang), category) for category in post.tags_for_language(lang)],
+                }
+
+        utils.atom_stream_writer(output_path, feed, atom_entries(), utils.encodelink(self.abs_link("/assets/xml/atom.xsl")))
 
     def generic_index_renderer(self, lang, posts, indexes_title, template_name, context_source, kw, basename, page_link, page_path, additional_dependencies=None):
         """Create an index page.
@@ -2679,6 +2875,7 @@ class Nikola(object):
                 template_name,
                 kw['filters'],
                 context,
+                post_detail='teaser' if kw['index_teasers'] else 'text',
             )
             task['uptodate'] = task['uptodate'] + [utils.config_changed(kw, 'nikola.nikola.Nikola.generic_index_renderer')] + additional_dependencies
             task['basename'] = basename
@@ -36,6 +36,7 @@ import doit
 from doit.cmd_base import Command as DoitCommand
 from yapsy.IPlugin import IPlugin
 
+from .shortcodes import mark_pure
 from .utils import LOGGER, first_line, get_logger, req_missing
 
 if typing.TYPE_CHECKING:
@@ -476,11 +477,18 @@ class ShortcodePlugin(BasePlugin):
     """A plugin that adds a shortcode."""
 
     name = "dummy_shortcode_plugin"
+    # Set to True if the output of the shortcode only depends on its
+    # arguments, data, language and the dependencies it returns. The output
+    # of pure shortcodes is cached in CACHE_FOLDER.
+    pure = False
 
     def set_site(self, site):
         """Set Nikola site."""
         self.site = site
-        site.register_shortcode(self.name, self.handler)
+        handler = self.handler
+        if self.pure:
+            handler = mark_pure(handler)
+        site.register_shortcode(self.name, handler)
         return super().set_site(site)
 
 
@@ -648,6 +656,13 @@ class Taxonomy(BasePlugin):
     template_for_single_list = "tagindex.tmpl":
         The template to use for the post list for one classification.
 
+    post_list_detail = "text":
+        How much of each post the post list for one classification shows
+        (when show_list_as_index is False): "title" (title, date, link and
+        other metadata), "teaser" or "text". Post lists are only rebuilt when
+        that part of one of their posts changes, so set it to "title" if
+        template_for_single_list only shows titles.
+
     template_for_classification_overview = "list.tmpl":
         The template to use for the classification overview page.
         Set to None to avoid generating overviews.
@@ -701,6 +716,7 @@ class Taxonomy(BasePlugin):
     show_list_as_index = False
     subcategories_list_template = "taxonomy_list.tmpl"
     template_for_single_list = "tagindex.tmpl"
+    post_list_detail = "text"
     template_for_classification_overview = "list.tmpl"
     always_disable_atom = False
     always_disable_rss = False
@@ -39,22 +39,28 @@ import requests
 from doit.loader import generate_tasks
 
 from nikola.plugin_categories import Command
+from nikola.state import DirectoryListingCache
 
 
 def _call_nikola_list(site, cache=None):
     if cache is not None:
         if 'files' in cache and 'deps' in cache:
             return cache['files'], cache['deps']
-    files = []
-    deps = defaultdict(list)
-    for task in generate_tasks('render_site', site.gen_tasks('render_site', "Task", '')):
-        files.extend(task.targets)
-        for target in task.targets:
-            deps[target].extend(task.file_dep)
-    for task in generate_tasks('post_render', site.gen_tasks('render_site', "LateTask", '')):
-        files.extend(task.targets)
-        for target in task.targets:
-            deps[target].extend(task.file_dep)
+    # Use the targets of the last build, unless the configuration changed since
+    stored = site.target_list.read(newer_than=[site.configuration_filename] if site.configuration_filename else [])
+    if stored is not None:
+        files, deps = stored[0], defaultdict(list, stored[1])
+    else:
+        files = []
+        deps = defaultdict(list)
+        for task in generate_tasks('render_site', site.gen_tasks('render_site', "Task", '')):
+            files.extend(task.targets)
+            for target in task.targets:
+                deps[target].extend(task.file_dep)
+        for task in generate_tasks('post_render', site.gen_tasks('render_site', "LateTask", '')):
+            files.extend(task.targets)
+            for target in task.targets:
+                deps[target].extend(task.file_dep)
     if cache is not None:
         cache['files'] = files
         cache['deps'] = deps
@@ -64,7 +70,6 @@ def _call_nikola_list(site, cache=None):
 def real_scan_files(site, cache=None):
     """Scan for files."""
     task_fnames = set([])
-    real_fnames = set([])
     output_folder = site.config['OUTPUT_FOLDER']
     # First check that all targets are generated in the right places
     for fname in _call_nikola_list(site, cache)[0]:
@@ -72,10 +77,8 @@ def real_scan_files(site, cache=None):
         if fname.startswith(output_folder):
             task_fnames.add(fname)
     # And now check that there are no non-target files
-    for root, dirs, files in os.walk(output_folder, followlinks=True):
-        for src_name in files:
-            fname = os.path.join(root, src_name)
-            real_fnames.add(fname)
+    listing_cache = DirectoryListingCache(os.path.join(site.config['CACHE_FOLDER'], 'output_listing.json'))
+    real_fnames = set(listing_cache.files(output_folder))
 
     only_on_output = list(real_fnames - task_fnames)
 
@@ -26,7 +26,12 @@
 
 """Deploy site."""
 
+import concurrent.futures
+import json
+import os
+import shutil
 import subprocess
+import tempfile
 import time
 from datetime import datetime
 
@@ -34,23 +39,103 @@ import dateutil
 from blinker import signal
 from dateutil.tz import gettz
 
+from nikola import utils
+from nikola.manifest import file_hash
 from nikola.plugin_categories import Command
 from nikola.utils import clean_before_deployment
 
 
+def directory_hashes(target):
+    """Return a dict mapping the paths of the files in target (with / separators) to their hashes."""
+    hashes = {}
+    for root, dirs, files in os.walk(target):
+        for fname in files:
+            path = os.path.join(root, fname)
+            hashes[os.path.relpath(path, target).replace(os.sep, '/')] = file_hash(path)
+    return hashes
+
+
+def plan_deploy(hashes, deployed):
+    """Compare the hashes of the output with those of the deployed files.
+
+    Returns (upload, delete): the sorted paths to upload, with HTML files
+    last (so pages are not published before the files they use), and the
+    sorted paths to delete.
+    """
+    upload = sorted((path for path, digest in hashes.items() if deployed.get(path) != digest),
+                    key=lambda path: (path.endswith('.html'), path))
+    delete = sorted(path for path in deployed if path not in hashes)
+    return upload, delete
+
+
+def copy_atomic(source, destination):
+    """Copy source to destination, replacing it atomically."""
+    dname = os.path.dirname(destination)
+    utils.makedirs(dname)
+    with tempfile.NamedTemporaryFile(dir=dname, prefix='.' + os.path.basename(destination) + '.', delete=False) as outf:
+        tname = outf.name
+        try:
+            with open(source, 'rb') as inf:
+                shutil.copyfileobj(inf, outf)
+        except BaseException:
+            outf.close()
+            os.unlink(tname)
+            raise
+    shutil.copymode(source, tname)
+    os.replace(tname, destination)
+
+
+def remove_deployed(target, path):
+    """Remove path from target, and the directories it leaves empty."""
+    fname = os.path.join(target, *path.split('/'))
+    try:
+        os.unlink(fname)
+    except FileNotFoundError:
+        pass
+    dname = os.path.dirname(fname)
+    while os.path.normpath(dname) != os.path.normpath(target):
+        try:
+            os.rmdir(dname)
+        except OSError:
+            break
+        dname = os.path.dirname(dname)
+
+
 class CommandDeploy(Command):
     """Deploy site."""
 
     name = "deploy"
 
-    doc_usage = "[preset [preset...]]"
+    doc_usage = "[-n] [-j N] [preset [preset...]]"
     doc_purpose = "deploy the site"
-    doc_description = "Deploy the site by executing deploy commands from the presets listed on the command line.  If no presets are specified, `default` is executed."
+    doc_description = """\
+Deploy the site by executing deploy commands from the presets listed on the command line.  If no presets are specified, `default` is executed.
+
+Presets in DEPLOY_DIRECTORIES copy the files which changed since their last deployment to a directory, and remove the files which are no longer generated."""
+    cmd_options = [
+        {
+            'name': 'dry_run',
+            'short': 'n',
+            'long': 'dry-run',
+            'type': bool,
+            'default': False,
+            'help': 'Only show what would be copied to and removed from DEPLOY_DIRECTORIES',
+        },
+        {
+            'name': 'jobs',
+            'short': 'j',
+            'long': 'jobs',
+            'type': int,
+            'default': 8,
+            'help': 'Number of files copied to DEPLOY_DIRECTORIES in parallel (default: %(default)s)',
+        },
+    ]
 
-    def _execute(self, command, args):
+    def _execute(self, options, args):
         """Execute the deploy command."""
         # Get last-deploy from persistent state
         last_deploy = self.site.state.get('last_deploy')
+        clean = True
         if last_deploy is not None:
             last_deploy = dateutil.parser.parse(last_deploy)
             clean = False
@@ -64,11 +149,6 @@ class CommandDeploy(Command):
                                 "(press Ctrl+C to abort)\n")
             time.sleep(5)
 
-        # Remove drafts and future posts if requested
-        undeployed_posts = clean_before_deployment(self.site)
-        if undeployed_posts:
-            self.logger.warning("Deleted {0} posts due to DEPLOY_* settings".format(len(undeployed_posts)))
-
         if args:
             presets = args
         else:
@@ -76,15 +156,34 @@ class CommandDeploy(Command):
 
         # test for preset existence
         for preset in presets:
-            try:
-                self.site.config['DEPLOY_COMMANDS'][preset]
-            except KeyError:
+            if preset not in self.site.config['DEPLOY_COMMANDS'] and preset not in self.site.config['DEPLOY_DIRECTORIES']:
                 self.logger.error('No such preset: {0}'.format(preset))
                 return 255
 
+        # Remove drafts and future posts if requested
+        undeployed_posts = clean_before_deployment(self.site, dry_run=options['dry_run'])
+        if options['dry_run']:
+            excluded = set()
+            for post in undeployed_posts:
+                excluded.update(self.site.output_manifest.relpath(path) for path in utils.undeployed_post_files(self.site, post))
+            for preset in presets:
+                if preset in self.site.config['DEPLOY_DIRECTORIES']:
+                    self.logger.info("=> preset '{0}'".format(preset))
+                    self.deploy_directory(preset, excluded=excluded, dry_run=True)
+            return
+        if undeployed_posts:
+            self.logger.warning("Deleted {0} posts due to DEPLOY_* settings".format(len(undeployed_posts)))
+
         for preset in presets:
             self.logger.info("=> preset '{0}'".format(preset))
-            for command in self.site.config['DEPLOY_COMMANDS'][preset]:
+            if preset in self.site.config['DEPLOY_DIRECTORIES']:
+                try:
+                    self.deploy_directory(preset, jobs=options['jobs'])
+                except Exception as e:
+                    self.logger.error('Failed deployment to {0}: {1}'.format(
+                        self.site.config['DEPLOY_DIRECTORIES'][preset], e))
+                    return 1
+            for command in self.site.config['DEPLOY_COMMANDS'].get(preset, []):
                 self.logger.info("==> {0}".format(command))
                 try:
                     subprocess.check_call(command, shell=True)
@@ -106,6 +205,77 @@ class CommandDeploy(Command):
                 'Let us know you are using Nikola '
                 'at <https://users.getnikola.com/add/> if you want!')
 
+    def deploy_directory(self, preset, jobs=8, excluded=(), dry_run=False):
+        """Copy the files which changed since the last deployment of preset to its directory.
+
+        The files to copy and remove are found by comparing the hashes of
+        the output manifest with those of the files deployed last time
+        (stored in CACHE_FOLDER/deploy), or, the first time, with those of
+        the files in the directory.
+        """
+        output_folder = self.site.config['OUTPUT_FOLDER']
+        target = os.path.abspath(os.path.expanduser(self.site.config['DEPLOY_DIRECTORIES'][preset]))
+        manifest = self.site.output_manifest
+        if not len(manifest):
+            raise Exception("The output manifest is empty, run `nikola build` first.")
+        manifest.refresh()
+        hashes = {path: digest for path, digest in manifest.hashes().items() if path not in excluded}
+
+        record_path = os.path.join(self.site.config['CACHE_FOLDER'], 'deploy', preset + '.json')
+        deployed = None
+        try:
+            with open(record_path, 'r', encoding='utf-8') as inf:
+                record = json.load(inf)
+            if record.get('target') == target:
+                deployed = record['files']
+        except (OSError, ValueError):
+            pass
+        if deployed is None:
+            # Never deployed there: compare with what the directory has, and do not remove anything
+            deployed = directory_hashes(target)
+            deployed = {path: digest for path, digest in deployed.items() if path in hashes}
+
+        upload, delete = plan_deploy(hashes, deployed)
+        if dry_run:
+            for path in upload:
+                print('upload {0}'.format(path))
+            for path in delete:
+                print('delete {0}'.format(path))
+            self.logger.info("{0} files to upload, {1} to delete, {2} unchanged".format(
+                len(upload), len(delete), len(hashes) - len(upload)))
+            return
+
+        self.logger.info("==> {0} ({1} files to upload, {2} to delete)".format(target, len(upload), len(delete)))
+        error = None
+        # Copy other files before HTML pages, so pages never link to missing files
+        for html in (False, True):
+            batch = [path for path in upload if path.endswith('.html') == html]
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+                futures = {executor.submit(copy_atomic,
+                                           os.path.join(output_folder, *path.split('/')),
+                                           os.path.join(target, *path.split('/'))): path for path in batch}
+                for future in concurrent.futures.as_completed(futures):
+                    path = futures[future]
+                    if future.exception() is not None:
+                        self.logger.error('Cannot copy {0}: {1}'.format(path, future.exception()))
+                        error = future.exception()
+                    else:
+                        deployed[path] = hashes[path]
+            if error is not None:
+                break
+        if error is None:
+            for path in delete:
+                remove_deployed(target, path)
+                del deployed[path]
+
+        utils.makedirs(os.path.dirname(record_path))
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(record_path), delete=False, mode='w+', encoding='utf-8') as outf:
+            tname = outf.name
+            json.dump({'target': target, 'files': deployed}, outf, sort_keys=True)
+        os.replace(tname, record_path)
+        if error is not None:
+            raise error
+
     def _emit_deploy_event(self, last_deploy, new_deploy, clean=False, undeployed=None):
         """Emit events for all timeline entries newer than last deploy.
 
@@ -126,12 +296,12 @@ class CommandDeploy(Command):
             'undeployed': undeployed
         }
 
-        if last_deploy.tzinfo is None:
+        if last_deploy is not None and last_deploy.tzinfo is None:
             last_deploy = last_deploy.replace(tzinfo=gettz('UTC'))
 
         deployed = [
             entry for entry in self.site.timeline
-            if entry.date > last_deploy and entry not in undeployed
+            if (last_deploy is None or entry.date > last_deploy) and entry not in undeployed
         ]
 
         event['deployed'] = deployed
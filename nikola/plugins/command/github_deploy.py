@@ -26,13 +26,15 @@
 
 """Deploy site to GitHub Pages."""
 
+import json
 import os
 import subprocess
+import tempfile
 from textwrap import dedent
 
 from nikola.plugin_categories import Command
 from nikola.plugins.command.check import real_scan_files
-from nikola.utils import req_missing, clean_before_deployment
+from nikola.utils import makedirs, req_missing, clean_before_deployment
 from nikola.__main__ import main
 from nikola import __version__
 
@@ -53,6 +55,94 @@ def check_ghp_import_installed():
         req_missing(['ghp-import2'], 'deploy the site to GitHub Pages')
 
 
+def _git(args, input=None, env=None):
+    """Run a git command and return its output as Unicode (UTF-8)."""
+    return subprocess.check_output(['git'] + args, input=input, env=env).decode('utf-8')
+
+
+def incremental_commit(manifest, branch, message, record_path):
+    """Commit the files of the output manifest to branch, with git plumbing commands.
+
+    Only the files whose hash changed since the last deployed commit (as
+    recorded in record_path) are read and written as git blobs; the
+    others reuse the blobs of that commit, and unchanged directories
+    reuse its trees. The branch is updated, but not checked out, and the
+    working tree is not touched. A ``.nojekyll`` file is added, like
+    ``ghp-import -n`` does.
+
+    Returns the new commit, or None if nothing changed.
+    """
+    ref = 'refs/heads/' + branch
+    try:
+        parent = _git(['rev-parse', '--verify', '-q', ref + '^{commit}']).strip()
+    except subprocess.CalledProcessError:
+        parent = None
+    try:
+        with open(record_path, 'r', encoding='utf-8') as inf:
+            record = json.load(inf)
+    except (OSError, ValueError):
+        record = {}
+    deployed = record.get('files', {}) if parent is not None and record.get('commit') == parent else {}
+
+    files = manifest.files
+    blobs = {}
+    modes = {}
+    to_hash = []
+    for path, entry in files.items():
+        old = deployed.get(path)
+        if old is not None and old[0] == entry['hash']:
+            blobs[path] = old[1]
+        else:
+            to_hash.append(path)
+    if to_hash:
+        fnames = [os.path.join(manifest.output_folder, *path.split('/')) for path in to_hash]
+        output = _git(['hash-object', '-w', '--no-filters', '--stdin-paths'], input='\n'.join(fnames).encode('utf-8'))
+        for path, fname, blob in zip(to_hash, fnames, output.split()):
+            blobs[path] = blob
+            modes[path] = '100755' if os.access(fname, os.X_OK) else '100644'
+    if '.nojekyll' not in blobs:
+        blobs['.nojekyll'] = _git(['hash-object', '-w', '--stdin'], input=b'').strip()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        env = dict(os.environ, GIT_INDEX_FILE=os.path.join(tmpdir, 'index'))
+        index = {}
+        if parent is not None:
+            _git(['read-tree', parent], env=env)
+            for line in _git(['ls-files', '-s', '-z'], env=env).split('\0'):
+                if line:
+                    info, path = line.split('\t', 1)
+                    mode, blob, _ = info.split()
+                    index[path] = (mode, blob)
+        updates = []
+        for path, blob in blobs.items():
+            mode = modes.get(path) or index.get(path, ('100644',))[0]
+            if index.get(path) != (mode, blob):
+                updates.append('{0} {1}\t{2}'.format(mode, blob, path))
+        for path in index:
+            if path not in blobs:
+                updates.append('0 {0}\t{1}'.format('0' * 40, path))
+        if updates:
+            _git(['update-index', '-z', '--index-info'], input='\0'.join(updates).encode('utf-8') + b'\0', env=env)
+        tree = _git(['write-tree'], env=env).strip()
+
+    if parent is not None and tree == _git(['rev-parse', parent + '^{tree}']).strip():
+        commit = None
+    else:
+        command = ['commit-tree', tree, '-m', message]
+        if parent is not None:
+            command += ['-p', parent]
+        commit = _git(command).strip()
+        _git(['update-ref', ref, commit] + ([parent] if parent is not None else []))
+
+    makedirs(os.path.dirname(record_path))
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(record_path), delete=False, mode='w+', encoding='utf-8') as outf:
+        tname = outf.name
+        json.dump({'commit': commit or parent,
+                   'files': {path: [entry['hash'], blobs[path]] for path, entry in files.items()}}, outf)
+    os.replace(tname, record_path)
+    return commit
+
+
 class DeployFailedException(Exception):
     """An internal exception for deployment errors."""
 
@@ -86,7 +176,8 @@ class CommandGitHubDeploy(Command):
     def _execute(self, options, args):
         """Run the deployment."""
         # Check if ghp-import is installed
-        check_ghp_import_installed()
+        if not self.site.config['GITHUB_DEPLOY_INCREMENTAL']:
+            check_ghp_import_installed()
 
         # Build before deploying
         build = main(['build'])
@@ -160,9 +251,21 @@ class CommandGitHubDeploy(Command):
             )
             output_folder = self.site.config['OUTPUT_FOLDER']
 
-            command = ['ghp-import', '-n', '-m', commit_message, '-p', '-r', remote, '-b', deploy, output_folder]
+            if self.site.config['GITHUB_DEPLOY_INCREMENTAL']:
+                manifest = self.site.output_manifest
+                if not len(manifest):
+                    self.logger.error('The output manifest is empty, not deploying to GitHub')
+                    return 1
+                manifest.refresh()
+                record_path = os.path.join(self.site.config['CACHE_FOLDER'], 'github_deploy.json')
+                self.logger.info("==> committing {0} to {1}".format(output_folder, deploy))
+                if incremental_commit(manifest, deploy, commit_message, record_path) is None:
+                    self.logger.info('Nothing to commit to deploy branch.')
+                self._run_command(['git', 'push', remote, deploy])
+            else:
+                command = ['ghp-import', '-n', '-m', commit_message, '-p', '-r', remote, '-b', deploy, output_folder]
 
-            self._run_command(command)
+                self._run_command(command)
 
             if autocommit:
                 self._run_command(['git', 'push', '-u', remote, source])
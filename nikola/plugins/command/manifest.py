@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2020 Roberto Alsina, Chris Warrick and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""List the files in the output folder, with their hashes."""
+
+import json
+import os
+
+from nikola.manifest import file_hash
+from nikola.plugin_categories import Command
+from nikola.utils import get_logger
+
+LOGGER = get_logger('manifest')
+
+
+class CommandManifest(Command):
+    """List the files in the output folder, with their hashes."""
+
+    name = "manifest"
+    doc_usage = "[--json] [--since FILE] [--verify]"
+    doc_purpose = "list the files in the output folder, with their hashes"
+    doc_description = """\
+List the files generated by the last build (path, size, SHA-256 hash and
+the task which produced them), as recorded while building.
+
+With --since, list the files added (A), modified (M) or deleted (D)
+since the manifest saved in FILE with `nikola manifest --json > FILE`."""
+    cmd_options = [
+        {
+            'name': 'json',
+            'long': 'json',
+            'type': bool,
+            'default': False,
+            'help': 'Print the manifest as JSON',
+        },
+        {
+            'name': 'since',
+            'long': 'since',
+            'type': str,
+            'default': '',
+            'help': 'List the changes since the manifest saved in FILE',
+        },
+        {
+            'name': 'verify',
+            'long': 'verify',
+            'type': bool,
+            'default': False,
+            'help': 'Check that the files in the output folder match the manifest',
+        },
+    ]
+
+    def _execute(self, options, args):
+        """List the files in the output folder."""
+        manifest = self.site.output_manifest
+        if not len(manifest):
+            LOGGER.warning("The manifest is empty, run `nikola build` first.")
+
+        if options['verify']:
+            return self.verify(manifest)
+
+        if options['since']:
+            with open(options['since'], 'r', encoding='utf-8') as inf:
+                old = json.load(inf)
+            old_hashes = {path: entry['hash'] if isinstance(entry, dict) else entry for path, entry in old.items()}
+            changed, removed = manifest.diff(old_hashes)
+            for path in changed:
+                print('{0} {1}'.format('M' if path in old_hashes else 'A', path))
+            for path in removed:
+                print('D {0}'.format(path))
+            return
+
+        if options['json']:
+            print(json.dumps(manifest.files, indent=2, sort_keys=True))
+            return
+
+        for path in manifest:
+            entry = manifest.get(path)
+            print('\t'.join([path, str(entry['size']), entry['hash'], entry['task']]))
+
+    def verify(self, manifest):
+        """Check that the files in the output folder match the manifest."""
+        failure = False
+        for path in manifest:
+            fname = os.path.join(manifest.output_folder, path)
+            if not os.path.isfile(fname):
+                LOGGER.warning("Missing: {0}".format(fname))
+                failure = True
+            elif file_hash(fname) != manifest.get(path)['hash']:
+                LOGGER.warning("Modified: {0}".format(fname))
+                failure = True
+        if failure:
+            return 1
+        LOGGER.info("{0} files match the manifest.".format(len(manifest)))
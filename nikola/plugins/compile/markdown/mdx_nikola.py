@@ -32,16 +32,18 @@
 
 import re
 
+from nikola import utils
 from nikola.plugin_categories import MarkdownExtension
 
 try:
     from markdown.postprocessors import Postprocessor
     from markdown.inlinepatterns import SimpleTagPattern
-    from markdown.extensions import Extension
+    from markdown.extensions import Extension, codehilite
 except ImportError:
     # No need to catch this, if you try to use this without Markdown,
     # the markdown compiler will fail first
     Postprocessor = SimpleTagPattern = Extension = object
+    codehilite = None
 
 
 CODERE = re.compile('<div class="codehilite"><pre>(.*?)</pre></div>', flags=re.MULTILINE | re.DOTALL)
@@ -75,8 +77,15 @@ class NikolaExtension(MarkdownExtension, Extension):
         pattern = SimpleTagPattern(STRIKE_RE, 'del')
         md.inlinePatterns.register(pattern, 'strikethrough', 175)
 
+    def _use_highlight_cache(self):
+        """Make CodeHilite share the highlight cache of listings and reST code blocks."""
+        if codehilite is not None and getattr(codehilite, 'pygments', False):
+            codehilite.highlight = utils.highlight_code
+            codehilite.guess_lexer = utils.guess_lexer
+
     def extendMarkdown(self, md, md_globals=None):
         """Extend markdown to Nikola flavours."""
+        self._use_highlight_cache()
         self._add_nikola_post_processor(md)
         self._add_strikethrough_inline_pattern(md)
         md.registerExtension(self)
@@ -153,9 +153,11 @@ class Chart(Directive):
     def run(self):
         """Run the directive."""
         self.options['site'] = None
-        html = _site.plugin_manager.getPluginByName(
+        html, deps = _site.plugin_manager.getPluginByName(
             'chart', 'ShortcodePlugin').plugin_object.handler(
                 self.arguments[0],
                 data='\n'.join(self.content),
                 **self.options)
+        for dep in deps:
+            self.state.document.settings.record_dependencies.add(dep)
         return [nodes.raw('', html, format='html')]
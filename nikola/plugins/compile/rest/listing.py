@@ -104,7 +104,7 @@ class CodeBlock(Directive):
             anchor_ref = 'rest_code_' + uuid.uuid4().hex
 
         formatter = utils.NikolaPygmentsHTML(anchor_ref=anchor_ref, classes=classes, linenos=linenos, linenostart=linenostart)
-        out = pygments.highlight(code, lexer, formatter)
+        out = utils.highlight_code(code, lexer, formatter)
         node = nodes.raw('', out, format='html')
 
         self.add_name(node)
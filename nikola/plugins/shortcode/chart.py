@@ -48,7 +48,7 @@ class ChartShortcode(ShortcodePlugin):
         if pygal is None:
             msg = req_missing(
                 ['pygal'], 'use the Chart directive', optional=True)
-            return '<div class="text-error">{0}</div>'.format(msg)
+            return '<div class="text-error">{0}</div>'.format(msg), []
         options = {}
         chart_data = []
         _options.pop('post', None)
@@ -59,9 +59,10 @@ class ChartShortcode(ShortcodePlugin):
             line = line.strip()
             if line:
                 chart_data.append(literal_eval('({0})'.format(line)))
+        deps = []
         if 'data_file' in _options:
             options = load_data(_options['data_file'])
-            _options.pop('data_file')
+            deps.append(_options.pop('data_file'))
             if not chart_data:  # If there is data in the document, it wins
                 for k, v in options.pop('data', {}).items():
                     chart_data.append((k, v))
@@ -87,4 +88,4 @@ class ChartShortcode(ShortcodePlugin):
         chart.config(**options)
         for label, series in chart_data:
             chart.add(label, series)
-        return chart.render().decode('utf8')
+        return chart.render().decode('utf8'), deps
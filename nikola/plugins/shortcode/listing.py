@@ -31,6 +31,7 @@ from urllib.parse import urlunsplit
 
 import pygments
 
+from nikola import utils
 from nikola.plugin_categories import ShortcodePlugin
 
 
@@ -72,6 +73,6 @@ class Plugin(ShortcodePlugin):
             formatter = pygments.formatters.get_formatter_by_name(
                 'html', linenos=linenumbers)
             output = '<a href="{1}">{0}</a>  <a href="{3}">({2})</a>' .format(
-                fname, target, src_label, src_target) + pygments.highlight(data, lexer, formatter)
+                fname, target, src_label, src_target) + utils.highlight_code(data, lexer, formatter)
 
         return output, deps
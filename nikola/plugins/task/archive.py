@@ -75,6 +75,8 @@ class Archive(Taxonomy):
         self.show_list_as_subcategories_list = not site.config['CREATE_FULL_ARCHIVES']
         self.show_list_as_index = site.config['ARCHIVES_ARE_INDEXES']
         self.template_for_single_list = "archiveindex.tmpl" if site.config['ARCHIVES_ARE_INDEXES'] else "archive.tmpl"
+        # archive.tmpl only shows the titles of posts
+        self.post_list_detail = "text" if self.show_list_as_index else "title"
         # Determine maximum hierarchy height
         if site.config['CREATE_DAILY_ARCHIVE'] or site.config['CREATE_FULL_ARCHIVES']:
             self.max_levels = 3
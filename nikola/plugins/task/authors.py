@@ -74,6 +74,8 @@ link://author_rss/joe => /authors/joe.xml""",
         super().set_site(site)
         self.show_list_as_index = site.config['AUTHOR_PAGES_ARE_INDEXES']
         self.template_for_single_list = "authorindex.tmpl" if self.show_list_as_index else "author.tmpl"
+        # author.tmpl only shows the titles of posts
+        self.post_list_detail = "text" if self.show_list_as_index else "title"
         self.translation_manager = utils.ClassificationTranslationManager()
 
     def is_enabled(self, lang=None):
@@ -28,20 +28,47 @@
 
 
 import configparser
+import errno
+import hashlib
 import io
 import itertools
+import json
 import os
 import shutil
 
+from blinker import signal
+
 from nikola.plugin_categories import LateTask
 from nikola import utils
 
+# Where the names of content-hashed bundles are written (see HASH_BUNDLES)
+MANIFEST_PATH = os.path.join('assets', 'bundles.json')
+
+_BASE64_DIGITS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+_SOURCE_MAP_COMMENTS = {
+    '.css': '/*# sourceMappingURL={0} */\n',
+    '.js': '//# sourceMappingURL={0}\n',
+}
+
 
 class BuildBundles(LateTask):
     """Bundle assets."""
 
     name = "create_bundles"
 
+    def set_site(self, site):
+        """Set Nikola site."""
+        super().set_site(site)
+        if site.config['USE_BUNDLES'] and site.config['HASH_BUNDLES']:
+            # The hashes depend on the filters, which are ready once the site is configured
+            signal('configured').connect(self._hash_bundles, sender=site)
+
+    def _hash_bundles(self, site):
+        """Add the content-hashed names of bundles to the site's bundle manifest."""
+        for name, files in (get_theme_bundles(site.THEMES) or {}).items():
+            inputs = get_bundle_inputs(site, name, files)
+            site.bundle_manifest[name.replace(os.sep, '/')] = hashed_name(name, bundle_hash(site, name, inputs))
+
     def gen_tasks(self):
         """Bundle assets."""
         kw = {
@@ -52,50 +79,33 @@ class BuildBundles(LateTask):
             'themes': self.site.THEMES,
             'files_folders': self.site.config['FILES_FOLDERS'],
             'code_color_scheme': self.site.config['CODE_COLOR_SCHEME'],
+            'bundle_manifest': self.site.bundle_manifest,
+            'bundle_source_maps': self.site.config['BUNDLE_SOURCE_MAPS'],
         }
 
-        def build_bundle(output, inputs):
-            out_dir = os.path.join(kw['output_folder'],
-                                   os.path.dirname(output))
-            inputs = [
-                os.path.join(
-                    out_dir,
-                    os.path.relpath(i, out_dir))
-                for i in inputs if os.path.isfile(i)
-            ]
-            with open(os.path.join(out_dir, os.path.basename(output)), 'wb+') as out_fh:
-                for i in inputs:
-                    with open(i, 'rb') as in_fh:
-                        shutil.copyfileobj(in_fh, out_fh)
-                    out_fh.write(b'\n')
-
         yield self.group_task()
 
         if self.site.config['USE_BUNDLES']:
             for name, _files in kw['theme_bundles'].items():
-                output_path = os.path.join(kw['output_folder'], name)
-                dname = os.path.dirname(name)
-                files = []
-                for fname in _files:
-                    # paths are relative to dirname
-                    files.append(os.path.join(dname, fname))
-                file_dep = [os.path.join(kw['output_folder'], fname)
-                            for fname in files if
-                            utils.get_asset_path(
-                                fname,
-                                self.site.THEMES,
-                                self.site.config['FILES_FOLDERS'],
-                                output_dir=kw['output_folder']) or fname == os.path.join('assets', 'css', 'code.css')]
+                file_dep = [output for output, source in get_bundle_inputs(self.site, name, _files)]
                 # code.css will be generated by us if it does not exist in
                 # FILES_FOLDERS or theme assets.  It is guaranteed that the
                 # generation will happen before this task.
+                output_path = os.path.join(kw['output_folder'], kw['bundle_manifest'].get(name.replace(os.sep, '/'), name))
+                targets = [output_path]
+                ext = os.path.splitext(name)[1].lower()
+                # Filters changing the bundle would make the source map wrong
+                source_map = (kw['bundle_source_maps'] and ext in _SOURCE_MAP_COMMENTS and
+                              not get_filters(kw['filters'], ext))
+                if source_map:
+                    targets.append(output_path + '.map')
                 task = {
                     'file_dep': list(file_dep),
                     'task_dep': ['copy_assets', 'copy_files'],
                     'basename': str(self.name),
                     'name': str(output_path),
-                    'actions': [(build_bundle, (name, file_dep))],
-                    'targets': [output_path],
+                    'actions': [(build_bundle, (output_path, file_dep, source_map))],
+                    'targets': targets,
                     'uptodate': [
                         utils.config_changed({
                             1: kw,
@@ -105,6 +115,156 @@ class BuildBundles(LateTask):
                 }
                 yield utils.apply_filters(task, kw['filters'])
 
+            if kw['bundle_manifest']:
+                manifest_path = os.path.join(kw['output_folder'], MANIFEST_PATH)
+                yield {
+                    'basename': str(self.name),
+                    'name': str(manifest_path),
+                    'actions': [(write_manifest, (manifest_path, kw['bundle_manifest']))],
+                    'targets': [manifest_path],
+                    'uptodate': [utils.config_changed(kw['bundle_manifest'], 'nikola.plugins.task.bundles:manifest')],
+                    'clean': True,
+                }
+
+
+def get_bundle_inputs(site, name, files):
+    """Return the (output path, source path) of the inputs of a bundle.
+
+    Only inputs which exist (in themes, FILES_FOLDERS or the output) are
+    returned, and code.css, which is generated from CODE_COLOR_SCHEME if
+    no theme or FILES_FOLDERS provides it. Its source path is None then.
+    """
+    dname = os.path.dirname(name)
+    code_css = os.path.join('assets', 'css', 'code.css')
+    inputs = []
+    for fname in files:
+        # paths are relative to dirname
+        fname = os.path.join(dname, fname)
+        source = utils.get_asset_path(fname, site.THEMES, site.config['FILES_FOLDERS'],
+                                      output_dir=None if fname == code_css else site.config['OUTPUT_FOLDER'])
+        if source or fname == code_css:
+            inputs.append((os.path.join(site.config['OUTPUT_FOLDER'], fname), source))
+    return inputs
+
+
+def get_filters(filters, ext):
+    """Return the filters applied to files with extension ext."""
+    for key, value in filters.items():
+        if key == ext or (isinstance(key, (tuple, list)) and ext in key):
+            return value
+    return []
+
+
+def bundle_hash(site, name, inputs):
+    """Hash the inputs of a bundle, and everything else which changes its contents."""
+    ext = os.path.splitext(name)[1].lower()
+    digest = hashlib.sha256(json.dumps(
+        [site.config['CODE_COLOR_SCHEME'], get_filters(site.config['FILTERS'], ext)],
+        cls=utils.CustomEncoder).encode('utf-8'))
+    for output, source in inputs:
+        digest.update(output.replace(os.sep, '/').encode('utf-8') + b'\0')
+        if source:
+            with open(source, 'rb') as in_fh:
+                for chunk in iter(lambda: in_fh.read(1024 * 1024), b''):
+                    digest.update(chunk)
+        digest.update(b'\0')
+    return digest.hexdigest()[:12]
+
+
+def hashed_name(name, digest):
+    """Insert digest in the file name, like assets/css/all.0123456789ab.css."""
+    root, ext = os.path.splitext(name.replace(os.sep, '/'))
+    return '{0}.{1}{2}'.format(root, digest, ext)
+
+
+def write_manifest(path, manifest):
+    """Write the bundle manifest (bundle name: content-hashed name) as JSON."""
+    utils.makedirs(os.path.dirname(path))
+    with io.open(path, 'w', encoding='utf-8') as outf:
+        json.dump(manifest, outf, indent=2, sort_keys=True)
+
+
+def _append_file(in_path, out_fh):
+    """Append the file at in_path to the unbuffered file out_fh.
+
+    copy_file_range copies the data in the kernel (without reading it into
+    Python), where it is supported.
+    """
+    with open(in_path, 'rb', buffering=0) as in_fh:
+        if hasattr(os, 'copy_file_range'):
+            copied = 0
+            try:
+                while True:
+                    count = os.copy_file_range(in_fh.fileno(), out_fh.fileno(), 1024 * 1024 * 1024)
+                    if not count:
+                        return
+                    copied += count
+            except OSError as e:
+                # Not supported for these files, copy them the usual way
+                if copied or e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF):
+                    raise
+        shutil.copyfileobj(in_fh, out_fh)
+
+
+def _count_lines(path):
+    """Return the number of lines in the file, and whether it ends with a newline."""
+    lines, last = 0, b'\n'
+    with open(path, 'rb') as in_fh:
+        for chunk in iter(lambda: in_fh.read(1024 * 1024), b''):
+            lines += chunk.count(b'\n')
+            last = chunk[-1:]
+    return lines, last == b'\n'
+
+
+def _vlq(value):
+    """Encode an integer as a source map Base64 VLQ."""
+    value = (-value << 1) | 1 if value < 0 else value << 1
+    digits = []
+    while True:
+        digit, value = value & 31, value >> 5
+        digits.append(_BASE64_DIGITS[digit | 32 if value else digit])
+        if not value:
+            return ''.join(digits)
+
+
+def source_map(output, inputs):
+    """Return a source map mapping the lines of a bundle to the lines of its inputs."""
+    out_dir = os.path.dirname(output)
+    lines = []
+    prev_source = prev_line = 0
+    for index, path in enumerate(inputs):
+        count, newline = _count_lines(path)
+        # build_bundle adds a newline after every input
+        if not newline:
+            count += 1
+        for line in range(count):
+            lines.append(_vlq(0) + _vlq(index - prev_source) + _vlq(line - prev_line) + _vlq(0))
+            prev_source, prev_line = index, line
+        if newline:
+            lines.append('')
+    return {
+        'version': 3,
+        'file': os.path.basename(output),
+        'sources': [os.path.relpath(path, out_dir).replace(os.sep, '/') for path in inputs],
+        'names': [],
+        'mappings': ';'.join(lines),
+    }
+
+
+def build_bundle(output, inputs, with_source_map=False):
+    """Concatenate the existing inputs into output, with a source map if requested."""
+    inputs = [i for i in inputs if os.path.isfile(i)]
+    with open(output, 'wb+', buffering=0) as out_fh:
+        for i in inputs:
+            _append_file(i, out_fh)
+            out_fh.write(b'\n')
+        if with_source_map:
+            comment = _SOURCE_MAP_COMMENTS[os.path.splitext(output)[1].lower()]
+            out_fh.write(comment.format(os.path.basename(output) + '.map').encode('utf-8'))
+    if with_source_map:
+        with io.open(output + '.map', 'w', encoding='utf-8') as outf:
+            json.dump(source_map(output, inputs), outf, separators=(',', ':'))
+
 
 def get_theme_bundles(themes):
     """Given a theme chain, return the bundle definitions."""
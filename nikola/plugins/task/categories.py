@@ -82,6 +82,8 @@ link://category_rss/dogs => /categories/dogs.xml""",
         super().set_site(site)
         self.show_list_as_index = self.site.config['CATEGORY_PAGES_ARE_INDEXES']
         self.template_for_single_list = "tagindex.tmpl" if self.show_list_as_index else "tag.tmpl"
+        # tag.tmpl only shows the titles of posts
+        self.post_list_detail = "text" if self.show_list_as_index else "title"
         self.translation_manager = utils.ClassificationTranslationManager()
 
         # Needed to undo names for CATEGORY_PAGES_FOLLOW_DESTPATH
@@ -121,7 +123,9 @@ link://category_rss/dogs => /categories/dogs.xml""",
     def slugify_tag_name(self, name, lang):
         """Slugify a tag name."""
         if self.site.config['SLUG_TAG_PATH']:
-            name = utils.slugify(name, lang)
+            # Tags of posts were slugified while scanning them
+            slug = self.site.tag_slugs[lang].get(name)
+            name = utils.slugify(name, lang) if slug is None else slug
         return name
 
     def slugify_category_name(self, path, lang):
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2020 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Run batched filters on all their files at once."""
+
+import json
+import os
+
+from nikola.plugin_categories import LateTask
+from nikola.state import DiskCache
+from nikola import utils
+from nikola.plugins.task.gzip import create_gzipped_copy, should_gzip
+
+
+class FilterBatches(LateTask):
+    """Run batched filters on all their files at once."""
+
+    name = "filter_batches"
+
+    def gen_tasks(self):
+        """Run every batched filter on the targets it was applied to."""
+        yield self.group_task()
+
+        # The configuration each batch last ran with
+        state = DiskCache(os.path.join(self.site.config['CACHE_FOLDER'], 'filter_batches'))
+        for batch in sorted(self.site.batched_filters.values(), key=lambda batch: batch.__name__):
+            # Targets of tasks generated from now on are filtered one by one
+            batch.closed = True
+            if not batch.targets:
+                continue
+            # The gzip task skips batched targets, they are gzipped once filtered
+            gzipped = sorted(target for target in batch.targets if should_gzip(self.site, target))
+            config = {
+                'command': batch.command,
+                'ok_returncodes': batch.ok_returncodes,
+                'gzip_command': self.site.config['GZIP_COMMAND'] if gzipped else None,
+            }
+            yield {
+                'basename': self.name,
+                'name': batch.__name__,
+                'file_dep': sorted(batch.targets),
+                'targets': [target + '.gz' for target in gzipped],
+                'actions': [(self.run_batch, (batch, set(gzipped), self.site.config['GZIP_COMMAND'], state,
+                                              json.dumps(config, cls=utils.CustomEncoder, sort_keys=True)))],
+                'uptodate': [utils.config_changed(config, 'nikola.plugins.task.filter_batches:' + batch.__name__)],
+                'clean': True,
+            }
+
+    @staticmethod
+    def run_batch(batch, gzipped, gzip_command, state, config, changed):
+        """Run batch on the changed files (or on all of them, if the filter changed), and gzip them."""
+        # doit tells which files changed, but not whether the configuration did
+        if state.get(batch.__name__) != config:
+            files = sorted(batch.targets)
+        else:
+            files = sorted(changed or batch.targets)
+        failed = batch.run(files)
+        for fname in files:
+            if fname in gzipped and fname not in failed:
+                create_gzipped_copy(fname, fname + '.gz', gzip_command)
+        if not failed:
+            state.set(batch.__name__, config)
+        return not failed
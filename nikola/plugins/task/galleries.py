@@ -28,7 +28,6 @@
 
 import datetime
 import glob
-import io
 import json
 import mimetypes
 import os
@@ -36,7 +35,6 @@ from collections import OrderedDict
 from urllib.parse import urljoin
 
 import natsort
-import PyRSS2Gen as rss
 from PIL import Image
 
 from nikola.plugin_categories import Task
@@ -218,8 +216,7 @@ class Galleries(Task, ImageProcessor):
                     self.site.path("gallery", gallery, lang))
                 dst = os.path.normpath(dst)
 
-                for k in self.site._GLOBAL_CONTEXT_TRANSLATABLE:
-                    self.kw[k] = self.site.GLOBAL_CONTEXT[k](lang)
+                self.kw.update(self.site.translated_global_context(lang))
 
                 context = {}
 
@@ -336,6 +333,7 @@ class Galleries(Task, ImageProcessor):
                         1: self.kw.copy(),
                         2: self.site.config["COMMENTS_IN_GALLERIES"],
                         3: context.copy(),
+                        4: self.site.config["HTML_MINIFY"],
                     }, 'nikola.plugins.task.galleries:gallery')],
                 }, self.kw['filters'])
 
@@ -725,40 +723,29 @@ class Galleries(Task, ImageProcessor):
         else:
             img_list, dest_img_list, img_titles = [], [], []
 
-        items = []
-        for img, srcimg, title in list(zip(dest_img_list, img_list, img_titles))[:self.kw["feed_length"]]:
-            img_size = os.stat(
-                os.path.join(
-                    self.site.config['OUTPUT_FOLDER'], img)).st_size
-            args = {
-                'title': title,
-                'link': make_url(img),
-                'guid': rss.Guid(img, False),
-                'pubDate': self.image_date(srcimg),
-                'enclosure': rss.Enclosure(
-                    make_url(img),
-                    img_size,
-                    mimetypes.guess_type(img)[0]
-                ),
-            }
-            items.append(rss.RSSItem(**args))
-        rss_obj = rss.RSS2(
-            title=title,
-            link=make_url(permalink),
-            description='',
-            lastBuildDate=datetime.datetime.utcnow(),
-            items=items,
-            generator='https://getnikola.com/',
-            language=lang
-        )
-
-        rss_obj.rss_attrs["xmlns:dc"] = "http://purl.org/dc/elements/1.1/"
-        rss_obj.self_url = make_url(permalink)
-        rss_obj.rss_attrs["xmlns:atom"] = "http://www.w3.org/2005/Atom"
-        dst_dir = os.path.dirname(output_path)
-        utils.makedirs(dst_dir)
-        with io.open(output_path, "w+", encoding="utf-8") as rss_file:
-            data = rss_obj.to_xml(encoding='utf-8')
-            if isinstance(data, bytes):
-                data = data.decode('utf-8')
-            rss_file.write(data)
+        def items():
+            for img, srcimg, title in list(zip(dest_img_list, img_list, img_titles))[:self.kw["feed_length"]]:
+                img_size = os.stat(
+                    os.path.join(
+                        self.site.config['OUTPUT_FOLDER'], img)).st_size
+                yield {
+                    'title': title,
+                    'link': make_url(img),
+                    'guid': (img, False),
+                    'pubDate': self.image_date(srcimg),
+                    'enclosure': (
+                        make_url(img),
+                        img_size,
+                        mimetypes.guess_type(img)[0]
+                    ),
+                }
+
+        channel = {
+            'title': title,
+            'link': make_url(permalink),
+            'description': '',
+            'lastBuildDate': datetime.datetime.utcnow(),
+            'generator': 'https://getnikola.com/',
+            'language': lang,
+        }
+        utils.rss_stream_writer(output_path, channel, items(), self_url=make_url(permalink))
@@ -57,9 +57,10 @@ class GzipFiles(TaskMultiplier):
         targets = task.get('targets', [])
         flag = False
         for target in targets:
-            ext = os.path.splitext(target)[1]
-            if (ext.lower() in self.site.config['GZIP_EXTENSIONS'] and
-                    target.startswith(self.site.config['OUTPUT_FOLDER'])):
+            if is_batched(self.site, target):
+                # Gzipped by the filter_batches task, once filtered
+                continue
+            if should_gzip(self.site, target):
                 flag = True
                 gzipped = target + '.gz'
                 gzip_task['file_dep'].append(target)
@@ -70,6 +71,18 @@ class GzipFiles(TaskMultiplier):
         return [gzip_task]
 
 
+def should_gzip(site, target):
+    """Check if GZIP_FILES applies to target."""
+    ext = os.path.splitext(target)[1]
+    return (site.config['GZIP_FILES'] and ext.lower() in site.config['GZIP_EXTENSIONS'] and
+            target.startswith(site.config['OUTPUT_FOLDER']))
+
+
+def is_batched(site, target):
+    """Check if a batched filter (see BATCH_FILTERS) rewrites target after its task ran."""
+    return any(target in batch.targets for batch in site.batched_filters.values())
+
+
 def create_gzipped_copy(in_path, out_path, command=None):
     """Create gzipped copy of in_path and save it as out_path."""
     if command:
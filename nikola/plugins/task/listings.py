@@ -30,8 +30,6 @@ import os
 from collections import defaultdict
 
 import natsort
-from pygments import highlight
-from pygments.lexers import get_lexer_for_filename, guess_lexer, TextLexer
 
 from nikola.plugin_categories import Task
 from nikola import utils
@@ -62,6 +60,7 @@ class Listings(Task):
             "index_file": site.config["INDEX_FILE"],
             "strip_indexes": site.config['STRIP_INDEXES'],
             "filters": site.config["FILTERS"],
+            "html_minify": site.config["HTML_MINIFY"],
         }
 
         # Verify that no folder in LISTINGS_FOLDERS appears twice (on output side)
@@ -126,17 +125,11 @@ class Listings(Task):
                 needs_ipython_css = True
             elif in_name:
                 with open(in_name, 'r', encoding='utf-8-sig') as fd:
-                    try:
-                        lexer = get_lexer_for_filename(in_name)
-                    except Exception:
-                        try:
-                            lexer = guess_lexer(fd.read())
-                        except Exception:
-                            lexer = TextLexer()
-                        fd.seek(0)
-                    code = highlight(
-                        fd.read(), lexer,
-                        utils.NikolaPygmentsHTML(in_name, linenos='table'))
+                    code = fd.read()
+                lexer = utils.get_lexer_for_file(in_name, code)
+                code = utils.highlight_code(
+                    code, lexer,
+                    utils.NikolaPygmentsHTML(in_name, linenos='table'))
                 title = os.path.basename(in_name)
             else:
                 code = ''
@@ -190,8 +183,7 @@ class Listings(Task):
                 for k, v in self.site.GLOBAL_CONTEXT['template_hooks'].items():
                     uptodate['||template_hooks|{0}||'.format(k)] = v.calculate_deps()
 
-                for k in self.site._GLOBAL_CONTEXT_TRANSLATABLE:
-                    uptodate[k] = self.site.GLOBAL_CONTEXT[k](self.kw['default_lang'])
+                uptodate.update(self.site.translated_global_context(self.kw['default_lang']))
 
                 # save navigation links as dependencies
                 uptodate['navigation_links'] = uptodate['c']['navigation_links'](self.kw['default_lang'])
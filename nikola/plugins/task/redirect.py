@@ -27,11 +27,23 @@
 """Generate redirections."""
 
 
+import hashlib
+import io
+import json
 import os
+import re
+from urllib.parse import urljoin, urlparse
 
 from nikola.plugin_categories import Task
+from nikola.state import Persistor
 from nikola import utils
 
+# Line templates for REDIRECTIONS_SERVER_MAPS
+SERVER_MAP_LINES = {
+    'htaccess': 'RedirectMatch 301 ^{src_re}$ {dst}',
+    'nginx': '{src} {dst};',
+}
+
 
 class Redirect(Task):
     """Generate redirections."""
@@ -42,22 +54,141 @@ class Redirect(Task):
         """Generate redirections tasks."""
         kw = {
             'redirections': self.site.config['REDIRECTIONS'],
+            'redirections_bulk': self.site.config['REDIRECTIONS_BULK'],
+            'redirections_server_maps': self.site.config['REDIRECTIONS_SERVER_MAPS'],
             'output_folder': self.site.config['OUTPUT_FOLDER'],
+            'cache_folder': self.site.config['CACHE_FOLDER'],
+            'base_url': self.site.config['BASE_URL'],
             'filters': self.site.config['FILTERS'],
             'index_file': self.site.config['INDEX_FILE'],
         }
+        # Settings shared by all redirections. Each task only depends on
+        # these and its own redirection, so that changing one redirection
+        # does not rewrite all the others.
+        shared_kw = {
+            'output_folder': kw['output_folder'],
+            'filters': kw['filters'],
+            'index_file': kw['index_file'],
+        }
 
         yield self.group_task()
-        if kw['redirections']:
-            for src, dst in kw["redirections"]:
-                src_path = os.path.join(kw["output_folder"], src.lstrip('/'))
-                if src_path.endswith("/"):
-                    src_path += kw['index_file']
+        if not kw['redirections']:
+            return
+
+        redirects = [(self._src_path(src, kw), src, dst) for src, dst in kw['redirections']]
+        if kw['redirections_bulk']:
+            yield {
+                'basename': self.name,
+                'name': 'bulk',
+                'targets': [src_path for src_path, _, _ in redirects],
+                'actions': [(self.create_redirects, ([(src_path, dst) for src_path, _, dst in redirects], kw))],
+                'clean': True,
+                'uptodate': [utils.config_changed(dict(shared_kw, redirections=kw['redirections']), 'nikola.plugins.task.redirect:bulk')],
+            }
+        else:
+            for src_path, src, dst in redirects:
                 yield utils.apply_filters({
                     'basename': self.name,
                     'name': src_path,
                     'targets': [src_path],
                     'actions': [(utils.create_redirect, (src_path, dst))],
                     'clean': True,
-                    'uptodate': [utils.config_changed(kw, 'nikola.plugins.task.redirect')],
+                    'uptodate': [utils.config_changed(dict(shared_kw, redirection=(src, dst)), 'nikola.plugins.task.redirect')],
                 }, kw["filters"])
+
+        for server, path in sorted(kw['redirections_server_maps'].items()):
+            if server not in SERVER_MAP_LINES:
+                utils.LOGGER.error("Unknown server for REDIRECTIONS_SERVER_MAPS: {0}".format(server))
+                continue
+            yield {
+                'basename': self.name,
+                'name': path,
+                'targets': [path],
+                'actions': [(self.create_server_map, (path, server, redirects, kw))],
+                'clean': True,
+                'uptodate': [utils.config_changed({
+                    'redirections': kw['redirections'],
+                    'base_url': kw['base_url'],
+                    'index_file': kw['index_file'],
+                }, 'nikola.plugins.task.redirect:' + server)],
+            }
+
+    @staticmethod
+    def _src_path(src, kw):
+        """Return the path of the redirect page for src."""
+        src_path = os.path.join(kw["output_folder"], src.lstrip('/'))
+        if src_path.endswith("/"):
+            src_path += kw['index_file']
+        return src_path
+
+    def create_redirects(self, redirects, kw):
+        """Create the redirect pages that changed since the last build, apply filters to them, and remove stale ones."""
+        state = Persistor(os.path.join(kw['cache_folder'], 'redirects.json'))
+        filters = json.dumps(kw['filters'], cls=utils.CustomEncoder, sort_keys=True)
+        previous = state.get('written') or {}
+        written = {}
+        if previous.get('filters') == filters:
+            written = previous.get('redirects', {})
+        hashes = previous.get('hashes', {})
+
+        self._remove_stale_redirects(redirects, previous.get('redirects', {}), hashes)
+
+        new_hashes = {}
+        for src_path, dst in redirects:
+            if written.get(src_path) == dst and os.path.exists(src_path):
+                new_hashes[src_path] = hashes.get(src_path)
+                continue
+            utils.create_redirect(src_path, dst)
+            filter_task = utils.apply_filters({'targets': [src_path], 'actions': []}, kw['filters'])
+            for action, args in filter_task['actions']:
+                action(*args)
+            new_hashes[src_path] = self._file_hash(src_path)
+
+        utils.makedirs(kw['cache_folder'])
+        state.set('written', {'filters': filters, 'redirects': dict(redirects), 'hashes': new_hashes})
+
+    def _remove_stale_redirects(self, redirects, previous, hashes):
+        """Remove the pages of redirections which are gone from REDIRECTIONS.
+
+        Often a real page replaces a removed redirection, and it may have
+        been rendered already. So only pages which no other task creates,
+        and which still contain the redirect written by the last build, are
+        removed.
+        """
+        current = set(src_path for src_path, _ in redirects)
+        stored = self.site.target_list.read()
+        targets = set(os.path.normpath(path) for path in stored[0]) if stored else set()
+        for src_path in previous:
+            if src_path in current or os.path.normpath(src_path) in targets:
+                continue
+            if hashes.get(src_path) is None or self._file_hash(src_path) != hashes[src_path]:
+                continue
+            os.unlink(src_path)
+            gz_path = src_path + '.gz'
+            if os.path.normpath(gz_path) not in targets and os.path.exists(gz_path):
+                os.unlink(gz_path)
+
+    @staticmethod
+    def _file_hash(path):
+        """Return the SHA-256 digest of the file in path, or None if it does not exist."""
+        try:
+            with open(path, 'rb') as inf:
+                return hashlib.sha256(inf.read()).hexdigest()
+        except FileNotFoundError:
+            return None
+
+    def create_server_map(self, path, server, redirects, kw):
+        """Create a redirect map for a web server."""
+        base_path = urlparse(kw['base_url']).path or '/'
+        line = SERVER_MAP_LINES[server] + '\n'
+        utils.makedirs(os.path.dirname(path))
+        with io.open(path, 'w', encoding='utf-8') as outf:
+            for _, src, dst in redirects:
+                src_url = urljoin(base_path, src.lstrip('/'))
+                # Relative destinations are relative to the redirect page
+                dst_url = urljoin(src_url, dst)
+                src_urls = [src_url]
+                if src_url.endswith('/'):
+                    src_urls.append(src_url + kw['index_file'])
+                for url in src_urls:
+                    outf.write(line.format(src=url, src_re=re.escape(url), dst=dst_url))
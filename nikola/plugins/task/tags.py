@@ -77,6 +77,8 @@ link://tag_rss/cats => /tags/cats.xml""",
         super().set_site(site)
         self.show_list_as_index = self.site.config['TAG_PAGES_ARE_INDEXES']
         self.template_for_single_list = "tagindex.tmpl" if self.show_list_as_index else "tag.tmpl"
+        # tag.tmpl only shows the titles of posts
+        self.post_list_detail = "text" if self.show_list_as_index else "title"
         self.minimum_post_count_per_classification_in_overview = self.site.config['TAGLIST_MINIMUM_POSTS']
         self.translation_manager = utils.ClassificationTranslationManager()
 
@@ -95,7 +97,9 @@ link://tag_rss/cats => /tags/cats.xml""",
     def slugify_tag_name(self, name, lang):
         """Slugify a tag name."""
         if self.site.config['SLUG_TAG_PATH']:
-            name = utils.slugify(name, lang)
+            # Tags of posts were slugified while scanning them
+            slug = self.site.tag_slugs[lang].get(name)
+            name = utils.slugify(name, lang) if slug is None else slug
         return name
 
     def get_overview_path(self, lang, dest_type='page'):
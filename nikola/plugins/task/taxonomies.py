@@ -257,7 +257,7 @@ class RenderTaxonomies(Task):
             context["posts"] = filtered_posts
         if "pagekind" not in context:
             context["pagekind"] = ["list", "tag_page"]
-        task = self.site.generic_post_list_renderer(lang, filtered_posts, output_name, template_name, kw['filters'], context)
+        task = self.site.generic_post_list_renderer(lang, filtered_posts, output_name, template_name, kw['filters'], context, post_detail=taxonomy.post_list_detail)
         task['uptodate'] = task['uptodate'] + [utils.config_changed(kw, 'nikola.plugins.task.taxonomies:list')]
         task['basename'] = str(self.name)
         yield task
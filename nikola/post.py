@@ -28,6 +28,7 @@
 
 import io
 import datetime
+import functools
 import hashlib
 import json
 import os
@@ -701,6 +702,29 @@ class Post(object):
         deps.append(utils.config_changed({1: sorted(self.compiler.config_dependencies)}, 'nikola.post.Post.deps_uptodate:compiler:' + self.source_path))
         return deps
 
+    def summary_deps_dict(self, lang):
+        """Return a JSON-style dict of what post lists show about this post (everything but its text).
+
+        Use it in the uptodate dependencies of pages which list this post
+        without showing its text.
+        """
+        return {
+            'title': self.title(lang),
+            'permalink': self.permalink(lang),
+            'date': self.date.isoformat(),
+            'updated': self.updated.isoformat(),
+            # Reading missing metadata adds empty values, leave those out
+            'meta': {key: value for key, value in self.meta[lang].items() if value != ''},
+        }
+
+    def teaser_deps_uptodate(self, lang):
+        """Return an uptodate dependency on this post's teaser.
+
+        The compiled post is read when the dependency is checked, so the
+        task using it must run after ``render_posts``.
+        """
+        return _teaser_changed(self, lang)
+
     def compile(self, lang):
         """Generate the cache/ file with the compiled post."""
         dest = self.translated_base_path(lang)
@@ -851,6 +875,35 @@ class Post(object):
             source_data = self.compiler.split_metadata(data, self, lang)[1]
         return source_data
 
+    @staticmethod
+    def _hyphenated_text_key(compiled_data, base_url, lang):
+        """Return a key identifying the hyphenated version of a compiled post."""
+        key = hashlib.md5(compiled_data.encode('utf-8'))
+        key.update('\0{0}\0{1}\0{2}'.format(base_url, lang, getattr(pyphen, '__version__', '')).encode('utf-8'))
+        return key.hexdigest()
+
+    def _read_hyphenated_text(self, file_name, compiled_data, base_url, lang):
+        """Return the hyphenated text stored next to the compiled post file_name, if it is up to date."""
+        try:
+            with io.open(file_name + '.hyphenated', 'r', encoding='utf-8', newline='') as inf:
+                key = inf.readline().rstrip('\n')
+                if key == self._hyphenated_text_key(compiled_data, base_url, lang):
+                    return inf.read()
+        except OSError:
+            pass
+        return None
+
+    def _write_hyphenated_text(self, file_name, compiled_data, base_url, lang, data):
+        """Store the hyphenated text of the compiled post file_name next to it.
+
+        Hyphenating is slow, and the text of a post is used on many pages
+        (the post itself, indexes, feeds).
+        """
+        temp_name = '{0}.hyphenated.{1}'.format(file_name, os.getpid())
+        with io.open(temp_name, 'w', encoding='utf-8', newline='') as outf:
+            outf.write(self._hyphenated_text_key(compiled_data, base_url, lang) + '\n' + data)
+        os.replace(temp_name, file_name + '.hyphenated')
+
     def text(self, lang=None, teaser_only=False, strip_html=False, show_read_more_link=True,
              feed_read_more_link=False, feed_links_append_query=None):
         """Read the post file for that language and return its compiled contents.
@@ -879,24 +932,32 @@ class Post(object):
 
         if self.compiler.extension() == '.php':
             return data
-        try:
-            document = lxml.html.fragment_fromstring(data, "body")
-        except lxml.etree.ParserError as e:
-            # if we don't catch this, it breaks later (Issue #374)
-            if str(e) == "Document is empty":
-                return ""
-            # let other errors raise
-            raise
         base_url = self.permalink(lang=lang)
-        document.make_links_absolute(base_url)
+        hyphenated_data = self._read_hyphenated_text(file_name, data, base_url, real_lang) if self.hyphenate else None
+        if hyphenated_data is not None:
+            data = hyphenated_data
+        else:
+            compiled_data = data
+            try:
+                document = lxml.html.fragment_fromstring(data, "body")
+            except lxml.etree.ParserError as e:
+                # if we don't catch this, it breaks later (Issue #374)
+                if str(e) == "Document is empty":
+                    return ""
+                # let other errors raise
+                raise
+            document.make_links_absolute(base_url)
 
-        if self.hyphenate:
-            hyphenate(document, real_lang)
+            if self.hyphenate:
+                hyphenate(document, real_lang)
 
-        try:
-            data = lxml.html.tostring(document.body, encoding='unicode')
-        except Exception:
-            data = lxml.html.tostring(document, encoding='unicode')
+            try:
+                data = lxml.html.tostring(document.body, encoding='unicode')
+            except Exception:
+                data = lxml.html.tostring(document, encoding='unicode')
+
+            if self.hyphenate:
+                self._write_hyphenated_text(file_name, compiled_data, base_url, real_lang, data)
 
         if teaser_only:
             teaser_regexp = self.config.get('TEASER_REGEXP', TEASER_REGEXP)
@@ -1100,6 +1161,32 @@ class Post(object):
         return not self.should_hide_title()
 
 
+class _teaser_changed(utils.config_changed):
+    """Check if the teaser of a compiled post changed."""
+
+    def __init__(self, post, lang):
+        """Initialize _teaser_changed."""
+        super().__init__({}, 'nikola.post.Post.teaser_deps_uptodate:{0}:{1}'.format(post.source_path, lang))
+        self.post = post
+        self.lang = lang
+
+    def _calc_digest(self):
+        """Calculate a digest of the teaser, and of whether the post has more text."""
+        file_name, _ = self.post._translated_file_path(self.lang)
+        try:
+            with io.open(file_name, "r", encoding="utf-8-sig") as post_file:
+                data = post_file.read().strip()
+        except OSError:
+            return None
+        teaser_regexp = self.post.config.get('TEASER_REGEXP', TEASER_REGEXP)
+        match = teaser_regexp.search(data)
+        if match:
+            teaser = [data[:match.start()], match.groups()[-1]]
+        else:
+            teaser = [data]
+        return hashlib.md5(json.dumps(teaser).encode('utf-8')).hexdigest()
+
+
 def get_metadata_from_file(source_path, post, config, lang, metadata_extractors_by):
     """Extract metadata from the file itself, by parsing contents."""
     try:
@@ -1118,24 +1205,16 @@ def get_metadata_from_file(source_path, post, config, lang, metadata_extractors_
 
     meta = {}
     used_extractor = None
-    for priority in metadata_extractors.MetaPriority:
-        found_in_priority = False
-        for extractor in metadata_extractors_by['priority'].get(priority, []):
-            if not metadata_extractors.check_conditions(post, source_path, extractor.conditions, config, source_text):
-                continue
-            extractor.check_requirements()
-            new_meta = extractor.extract_text(source_text)
-            if new_meta:
-                found_in_priority = True
-                used_extractor = extractor
-                # Map metadata from other platforms to names Nikola expects (Issue #2817)
-                # Map metadata values (Issue #3025)
-                map_metadata(new_meta, extractor.map_from, config)
-
-                meta.update(new_meta)
-                break
-
-        if found_in_priority:
+    dispatcher = metadata_extractors.get_dispatcher(metadata_extractors_by, config)
+    for extractor in dispatcher.candidates(post, source_path, source_text):
+        new_meta = extractor.extract_text(source_text)
+        if new_meta:
+            used_extractor = extractor
+            # Map metadata from other platforms to names Nikola expects (Issue #2817)
+            # Map metadata values (Issue #3025)
+            map_metadata(new_meta, extractor.map_from, config)
+
+            meta.update(new_meta)
             break
     return meta, used_extractor
 
@@ -1217,38 +1296,64 @@ def get_meta(post, lang):
     return meta, used_extractor
 
 
-def hyphenate(dom, _lang):
-    """Hyphenate a post."""
+_HYPHENATED_TAGS = frozenset(('p', 'li', 'span'))
+_UNHYPHENATED_CHILD_TAGS = frozenset(('kbd', 'pre', 'code', 'samp', 'mark', 'math', 'data', 'ruby', 'svg'))
+
+
+class _CachedHyphenator(object):
+    """A pyphen.Pyphen which remembers the words it hyphenated."""
+
+    def __init__(self, hyphenator, maxsize=100000):
+        """Wrap hyphenator, remembering up to maxsize words."""
+        self.inserted = functools.lru_cache(maxsize=maxsize)(hyphenator.inserted)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_hyphenator(_lang):
+    """Return a (cached) hyphenator for _lang, or None if there is none."""
     # circular import prevention
     from .nikola import LEGAL_VALUES
-    lang = None
-    if pyphen is not None:
-        lang = LEGAL_VALUES['PYPHEN_LOCALES'].get(_lang, pyphen.language_fallback(_lang))
-    else:
+    if pyphen is None:
         utils.req_missing(['pyphen'], 'hyphenate texts', optional=True)
-    hyphenator = None
-    if pyphen is not None and lang is not None:
-        # If pyphen does exist, we tell the user when configuring the site.
-        # If it does not support a language, we ignore it quietly.
-        try:
-            hyphenator = pyphen.Pyphen(lang=lang)
-        except KeyError:
-            LOGGER.error("Cannot find hyphenation dictoniaries for {0} (from {1}).".format(lang, _lang))
-            LOGGER.error("Pyphen cannot be installed to ~/.local (pip install --user).")
+        return None
+    lang = LEGAL_VALUES['PYPHEN_LOCALES'].get(_lang, pyphen.language_fallback(_lang))
+    if lang is None:
+        return None
+    # If pyphen does exist, we tell the user when configuring the site.
+    # If it does not support a language, we ignore it quietly.
+    try:
+        return _CachedHyphenator(pyphen.Pyphen(lang=lang))
+    except KeyError:
+        LOGGER.error("Cannot find hyphenation dictoniaries for {0} (from {1}).".format(lang, _lang))
+        LOGGER.error("Pyphen cannot be installed to ~/.local (pip install --user).")
+        return None
+
+
+def _skip_hyphenation(node):
+    """Check if a p, li or span node should not be hyphenated."""
+    children = node.getchildren()
+    if children:
+        return any(child.tag in _UNHYPHENATED_CHILD_TAGS or (child.tag == 'span' and 'math' in child.get('class', []))
+                   for child in children)
+    return 'math' in node.get('class', [])
+
+
+def _hyphenate_tree(node, hyphenator, parent_tag):
+    """Hyphenate the p, li and span nodes (not in a pre) in the tree starting at node."""
+    if node.tag in _HYPHENATED_TAGS and parent_tag != 'pre' and not _skip_hyphenation(node):
+        # This hyphenates all of the node's descendants too
+        insert_hyphens(node, hyphenator)
+    else:
+        for child in node.iterchildren():
+            _hyphenate_tree(child, hyphenator, node.tag)
+
+
+def hyphenate(dom, _lang):
+    """Hyphenate a post."""
+    hyphenator = _get_hyphenator(_lang)
     if hyphenator is not None:
-        for tag in ('p', 'li', 'span'):
-            for node in dom.xpath("//%s[not(parent::pre)]" % tag):
-                skip_node = False
-                skippable_nodes = ['kbd', 'pre', 'code', 'samp', 'mark', 'math', 'data', 'ruby', 'svg']
-                if node.getchildren():
-                    for child in node.getchildren():
-                        if child.tag in skippable_nodes or (child.tag == 'span' and 'math'
-                                                            in child.get('class', [])):
-                            skip_node = True
-                elif 'math' in node.get('class', []):
-                    skip_node = True
-                if not skip_node:
-                    insert_hyphens(node, hyphenator)
+        parent = dom.getparent()
+        _hyphenate_tree(dom, hyphenator, None if parent is None else parent.tag)
     return dom
 
 
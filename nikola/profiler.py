@@ -0,0 +1,309 @@
+# -*- coding: utf-8 -*-
+
+# Copyright © 2012-2020 Roberto Alsina and others.
+
+# Permission is hereby granted, free of charge, to any
+# person obtaining a copy of this software and associated
+# documentation files (the "Software"), to deal in the
+# Software without restriction, including without limitation
+# the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the
+# Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice
+# shall be included in all copies or substantial portions of
+# the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY
+# KIND, EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE
+# WARRANTIES OF MERCHANTABILITY, FITNESS FOR A PARTICULAR
+# PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS
+# OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR
+# OTHER LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR
+# OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION WITH THE
+# SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Build profiler, enabled with `nikola build --profile`."""
+
+import html
+import io
+import json
+import os
+import time
+from collections import defaultdict
+
+__all__ = ('BuildProfiler', 'NullProfiler', 'get_profiler', 'set_profiler')
+
+
+class _Span():
+    """Context manager adding the time spent in it to a profiler."""
+
+    __slots__ = ('_profiler', '_name', '_wall', '_cpu')
+
+    def __init__(self, profiler, name):
+        self._profiler = profiler
+        self._name = name
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._profiler.add(self._name, time.perf_counter() - self._wall, time.process_time() - self._cpu)
+        return False
+
+
+class _NullSpan():
+    """Context manager which does nothing."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullProfiler():
+    """A profiler which does not record anything, used unless profiling."""
+
+    enabled = False
+
+    def span(self, name):
+        """Time the code in a with block as name (does nothing)."""
+        return _NULL_SPAN
+
+    def add(self, name, wall, cpu=0.0):
+        """Add time spent in name (does nothing)."""
+
+    def timed_iter(self, name, iterable):
+        """Time the production of each item of iterable as name (does nothing)."""
+        return iterable
+
+    def tasks_generated(self, tasks):
+        """Count the generated tasks (does nothing)."""
+
+
+class BuildProfiler(NullProfiler):
+    """Record the time spent in build phases and tasks.
+
+    Phases are named spans, which may nest (the time of a nested span is
+    also counted in the enclosing one). Plugins can add their own:
+
+        with self.site.profiler.span('my_plugin:resize'):
+            ...
+
+    Tasks are timed by the doit reporter returned by ``reporter_class``.
+    """
+
+    enabled = True
+
+    def __init__(self):
+        """Start profiling."""
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        # name -> [calls, wall, cpu]
+        self.spans = defaultdict(lambda: [0, 0.0, 0.0])
+        # basename -> counters and times
+        self.tasks = defaultdict(lambda: {
+            'generated': 0, 'executed': 0, 'up_to_date': 0,
+            'check_wall': 0.0, 'wall': 0.0, 'cpu': 0.0})
+        self._running = {}
+
+    def span(self, name):
+        """Time the code in a with block as name."""
+        return _Span(self, name)
+
+    def add(self, name, wall, cpu=0.0):
+        """Add time spent in name."""
+        span = self.spans[name]
+        span[0] += 1
+        span[1] += wall
+        span[2] += cpu
+
+    def timed_iter(self, name, iterable):
+        """Time the production of each item of iterable as name."""
+        iterator = iter(iterable)
+        while True:
+            with self.span(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    @staticmethod
+    def _basename(task):
+        return task.name.split(':', 1)[0]
+
+    def tasks_generated(self, tasks):
+        """Count the generated tasks (doit Task objects) per basename."""
+        for task in tasks:
+            if task.actions:
+                self.tasks[self._basename(task)]['generated'] += 1
+
+    def task_event(self, event, task):
+        """Record a doit reporter event for task."""
+        if not task.actions:
+            return
+        now = (time.perf_counter(), time.process_time())
+        stats = self.tasks[self._basename(task)]
+        if event == 'get_status':
+            self._running[task.name] = now
+            return
+        started = self._running.pop(task.name, None)
+        if started is None:
+            return
+        if event == 'execute_task':
+            stats['check_wall'] += now[0] - started[0]
+            stats['executed'] += 1
+            self._running[task.name] = now
+        elif event in ('skip_uptodate', 'skip_ignore'):
+            stats['check_wall'] += now[0] - started[0]
+            stats['up_to_date'] += 1
+        elif event in ('add_success', 'add_failure'):
+            stats['wall'] += now[0] - started[0]
+            stats['cpu'] += now[1] - started[1]
+
+    def reporter_class(self, base):
+        """Return a doit reporter class based on base, which also reports task events to this profiler."""
+        profiler = self
+
+        class ProfilingReporter(base):
+            def get_status(self, task):
+                profiler.task_event('get_status', task)
+                super().get_status(task)
+
+            def execute_task(self, task):
+                profiler.task_event('execute_task', task)
+                super().execute_task(task)
+
+            def skip_uptodate(self, task):
+                profiler.task_event('skip_uptodate', task)
+                super().skip_uptodate(task)
+
+            def skip_ignore(self, task):
+                profiler.task_event('skip_ignore', task)
+                super().skip_ignore(task)
+
+            def add_success(self, task):
+                profiler.task_event('add_success', task)
+                super().add_success(task)
+
+            def add_failure(self, task, exception):
+                profiler.task_event('add_failure', task)
+                super().add_failure(task, exception)
+
+        return ProfilingReporter
+
+    def report(self):
+        """Return the profile as a JSON-style dict, sorted by wall time."""
+        spans = [{'name': name, 'calls': calls, 'wall': wall, 'cpu': cpu}
+                 for name, (calls, wall, cpu) in self.spans.items()]
+        tasks = [dict(stats, basename=basename) for basename, stats in self.tasks.items()]
+        return {
+            'wall': time.perf_counter() - self.start_wall,
+            'cpu': time.process_time() - self.start_cpu,
+            'generated': sum(task['generated'] for task in tasks),
+            'executed': sum(task['executed'] for task in tasks),
+            'spans': sorted(spans, key=lambda span: -span['wall']),
+            'tasks': sorted(tasks, key=lambda task: -task['wall']),
+        }
+
+    def write_report(self, folder):
+        """Write the profile as build_profile.json and build_profile.html into folder, return their paths."""
+        report = self.report()
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        json_path = os.path.join(folder, 'build_profile.json')
+        with io.open(json_path, 'w', encoding='utf-8') as outf:
+            json.dump(report, outf, indent=2, sort_keys=True)
+        html_path = os.path.join(folder, 'build_profile.html')
+        with io.open(html_path, 'w', encoding='utf-8') as outf:
+            outf.write(_render_html(report))
+        return json_path, html_path
+
+
+def _html_table(columns, rows):
+    """Render a table of rows (dicts) with (key, title) columns."""
+    head = ''.join('<th>{0}</th>'.format(html.escape(title)) for _, title in columns)
+    body = []
+    for row in rows:
+        cells = []
+        for key, _ in columns:
+            value = row[key]
+            if isinstance(value, float):
+                cells.append('<td data-sort="{0}">{0:.3f}</td>'.format(value))
+            elif isinstance(value, int):
+                cells.append('<td data-sort="{0}">{0}</td>'.format(value))
+            else:
+                cells.append('<td>{0}</td>'.format(html.escape(value)))
+        body.append('<tr>{0}</tr>'.format(''.join(cells)))
+    return '<table><thead><tr>{0}</tr></thead><tbody>{1}</tbody></table>'.format(head, '\n'.join(body))
+
+
+_HTML_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Nikola build profile</title>
+<style>
+body {{ font-family: sans-serif; }}
+table {{ border-collapse: collapse; margin-bottom: 2em; }}
+th, td {{ border: 1px solid #ccc; padding: 0.2em 0.6em; text-align: right; }}
+td:first-child {{ text-align: left; }}
+th {{ cursor: pointer; background: #eee; }}
+</style></head><body>
+<h1>Nikola build profile</h1>
+<p>Wall time: {wall:.3f}s, CPU time: {cpu:.3f}s, tasks generated: {generated}, tasks executed: {executed}.
+Click on a column header to sort.</p>
+<h2>Tasks</h2>
+{tasks}
+<h2>Phases</h2>
+<p>Phases can nest, so their times can add up to more than the build time.</p>
+{spans}
+<script>
+document.querySelectorAll('th').forEach(function (th) {{
+  th.addEventListener('click', function () {{
+    var table = th.closest('table'), tbody = table.tBodies[0], index = th.cellIndex;
+    var rows = Array.prototype.slice.call(tbody.rows);
+    var desc = th.dataset.desc !== 'true';
+    th.dataset.desc = desc;
+    rows.sort(function (a, b) {{
+      var x = a.cells[index], y = b.cells[index];
+      var c = x.dataset.sort !== undefined ? x.dataset.sort - y.dataset.sort : x.textContent.localeCompare(y.textContent);
+      return desc ? -c : c;
+    }});
+    rows.forEach(function (row) {{ tbody.appendChild(row); }});
+  }});
+}});
+</script>
+</body></html>
+"""
+
+
+def _render_html(report):
+    """Render a profile report as a HTML page with sortable tables."""
+    tasks = _html_table((
+        ('basename', 'Task'), ('generated', 'Generated'), ('executed', 'Executed'),
+        ('up_to_date', 'Up to date'), ('check_wall', 'Up-to-date checks (s)'),
+        ('wall', 'Wall (s)'), ('cpu', 'CPU (s)')), report['tasks'])
+    spans = _html_table((
+        ('name', 'Phase'), ('calls', 'Calls'), ('wall', 'Wall (s)'), ('cpu', 'CPU (s)')), report['spans'])
+    return _HTML_TEMPLATE.format(tasks=tasks, spans=spans, wall=report['wall'], cpu=report['cpu'],
+                                 generated=report['generated'], executed=report['executed'])
+
+
+_profiler = NullProfiler()
+
+
+def get_profiler():
+    """Return the current profiler (a NullProfiler unless profiling)."""
+    return _profiler
+
+
+def set_profiler(profiler):
+    """Set the current profiler."""
+    global _profiler
+    _profiler = profiler
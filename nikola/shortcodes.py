@@ -26,11 +26,18 @@
 
 """Support for Hugo-style shortcodes."""
 
+import functools
+import json
+import os
+import re
 import sys
 import uuid
 
 from .utils import LOGGER
 
+# Keyword arguments of shortcodes which are not part of their cache keys
+_UNCACHED_KWARGS = ('site', 'post', 'data', 'lang')
+
 
 class ParsingError(Exception):
     """Used for forwarding parsing error messages to apply_shortcodes."""
@@ -77,10 +84,11 @@ def _skip_whitespace(data, pos, must_be_nontrivial=False):
 
 
 def _skip_nonwhitespace(data, pos):
-    """Return first position not before pos which contains a non-whitespace character."""
-    for i, x in enumerate(data[pos:]):
-        if x.isspace():
-            return pos + i
+    """Return first position not before pos which contains a whitespace character."""
+    while pos < len(data):
+        if data[pos].isspace():
+            return pos
+        pos += 1
     return len(data)
 
 
@@ -203,6 +211,9 @@ def _parse_shortcode_args(data, start, shortcode_name, start_pos):
     raise ParsingError("Shortcode '{0}' starting at {1} is not terminated correctly with '%}}}}'!".format(shortcode_name, _format_position(data, start_pos)))
 
 
+SHORTCODE_ID_RE = re.compile('SHORTCODE[0-9a-f]{32}REPLACEMENT')
+
+
 def _new_sc_id():
     return str('SHORTCODE{0}REPLACEMENT'.format(str(uuid.uuid4()).replace('-', '')))
 
@@ -217,44 +228,21 @@ def extract_shortcodes(data):
     are the shortcodes themselves ready to process.
     """
     shortcodes = {}
-    splitted = _split_shortcodes(data)
+    nodes = _parse_shortcodes(data)
 
     if not data:  # Empty
         return '', {}
 
-    def extract_data_chunk(data):
-        """Take a list of splitted shortcodes and return a string and a tail.
-
-        The string is data, the tail is ready for a new run of this same function.
-        """
-        text = []
-        for i, token in enumerate(data):
-            if token[0] == 'SHORTCODE_START':
-                name = token[3]
-                sc_id = _new_sc_id()
-                text.append(sc_id)
-                # See if this shortcode closes
-                for j in range(i, len(data)):
-                    if data[j][0] == 'SHORTCODE_END' and data[j][3] == name:
-                        # Extract this chunk
-                        shortcodes[sc_id] = ''.join(t[1] for t in data[i:j + 1])
-                        return ''.join(text), data[j + 1:]
-                # Doesn't close
-                shortcodes[sc_id] = token[1]
-                return ''.join(text), data[i + 1:]
-            elif token[0] == 'TEXT':
-                text.append(token[1])
-                return ''.join(text), data[1:]
-            elif token[0] == 'SHORTCODE_END':  # This is malformed
-                raise Exception('Closing unopened shortcode {}'.format(token[3]))
-
     text = []
-    tail = splitted
-    while True:
-        new_text, tail = extract_data_chunk(tail)
-        text.append(new_text)
-        if not tail:
-            break
+    for node in nodes:
+        if node[0] == 'TEXT':
+            text.append(node[1])
+        elif node[0] == 'SHORTCODE':
+            sc_id = _new_sc_id()
+            text.append(sc_id)
+            shortcodes[sc_id] = node[1]
+        elif node[0] == 'SHORTCODE_END':  # This is malformed
+            raise Exception('Closing unopened shortcode {}'.format(node[3]))
     return ''.join(text), shortcodes
 
 
@@ -305,7 +293,110 @@ def _split_shortcodes(data):
     return result
 
 
-def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=False, lang=None, extra_context=None):
+@functools.lru_cache(maxsize=1024)
+def _parse_shortcodes(data):
+    """Parse input data into a flat shortcode AST.
+
+    Returns a tuple of nodes of the following forms:
+
+        1. ("TEXT", text)
+        2. ("SHORTCODE", text, start, name, args, data)
+        3. ("SHORTCODE_END", text, start, name)
+
+    Here, text is the raw text represented by the node (for shortcodes
+    with a closing tag, this includes the data and the closing tag); data
+    is the text between the opening and closing tag, or None if the
+    shortcode is not closed. Nodes of the third form are closing tags that
+    do not belong to any shortcode, and are reported as errors by the callers.
+
+    A shortcode is closed by the first following closing tag with the same
+    name.  Those are found with a single backwards pass over the tokens, so
+    parsing is linear in the number of shortcodes.  Results are cached per
+    input text and shared between callers, so they must not be modified.
+    """
+    tokens = _split_shortcodes(data)
+
+    # For every token, the index of the first closing tag for each name after it
+    closed_by = [None] * len(tokens)
+    next_end = {}
+    for i in range(len(tokens) - 1, -1, -1):
+        token = tokens[i]
+        if token[0] == "SHORTCODE_END":
+            next_end[token[3]] = i
+        elif token[0] == "SHORTCODE_START":
+            closed_by[i] = next_end.get(token[3])
+
+    nodes = []
+    pos = 0
+    while pos < len(tokens):
+        token = tokens[pos]
+        if token[0] == "SHORTCODE_START":
+            args, kw = token[4]
+            start = token[2]
+            end = closed_by[pos]
+            if end is None:
+                nodes.append(("SHORTCODE", token[1], start, token[3], (tuple(args), kw), None))
+                pos += 1
+            else:
+                end_token = tokens[end]
+                data_arg = data[start + len(token[1]):end_token[2]]
+                text = data[start:end_token[2] + len(end_token[1])]
+                nodes.append(("SHORTCODE", text, start, token[3], (tuple(args), kw), data_arg))
+                pos = end + 1
+        else:
+            nodes.append(token)
+            pos += 1
+    return tuple(nodes)
+
+
+def mark_pure(f):
+    """Return the shortcode handler f marked as pure.
+
+    The output of pure shortcodes only depends on their arguments, data,
+    language and the files returned as dependencies, so it can be cached.
+    """
+    @functools.wraps(f)
+    def pure_handler(*args, **kw):
+        return f(*args, **kw)
+    pure_handler.nikola_shortcode_pure = True
+    return pure_handler
+
+
+def _dependency_mtime(path):
+    """Return the modification time of path, or None if it does not exist."""
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _shortcode_cache_key(name, args, kw):
+    """Return the cache key for a shortcode call, or None if it cannot be cached."""
+    key_kw = {k: v for k, v in kw.items() if k not in _UNCACHED_KWARGS}
+    try:
+        return json.dumps([name, args, key_kw, kw['data'], kw['lang']], sort_keys=True)
+    except TypeError:  # not serializable, so we cannot tell if it changed
+        return None
+
+
+def _call_shortcode(f, name, args, kw, cache):
+    """Call the shortcode handler f, reusing cached output of pure shortcodes."""
+    key = None
+    if cache is not None and getattr(f, 'nikola_shortcode_pure', False):
+        key = _shortcode_cache_key(name, args, kw)
+    if key is not None:
+        entry = cache.get(key)
+        if entry is not None and all(_dependency_mtime(dep) == mtime for dep, mtime in entry['deps']):
+            return entry['output'], [dep for dep, _ in entry['deps']]
+    res = f(*args, **kw)
+    if not isinstance(res, tuple):  # For backards compatibility
+        res = (res, [])
+    if key is not None:
+        cache.set(key, {'output': res[0], 'deps': [(dep, _dependency_mtime(dep)) for dep in res[1]]})
+    return res
+
+
+def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=False, lang=None, extra_context=None, cache=None):
     """Apply Hugo-style shortcodes on data.
 
     {{% name parameters %}} will end up calling the registered "name" function with the given parameters.
@@ -317,6 +408,9 @@ def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=
 
     The site parameter is passed with the same name to the shortcodes so they can access Nikola state.
 
+    If cache (a nikola.state.DiskCache) is given, the output of pure shortcodes (see mark_pure)
+    is stored in it, and reused as long as the arguments and dependencies don't change.
+
     >>> print(apply_shortcodes('==> {{% foo bar=baz %}} <==', {'foo': lambda *a, **k: k['bar']}))
     ==> baz <==
     >>> print(apply_shortcodes('==> {{% foo bar=baz %}}some data{{% /foo %}} <==', {'foo': lambda *a, **k: k['bar']+k['data']}))
@@ -326,50 +420,30 @@ def apply_shortcodes(data, registry, site=None, filename=None, raise_exceptions=
         extra_context = {}
     empty_string = ''
     try:
-        # Split input data into text, shortcodes and shortcode endings
-        sc_data = _split_shortcodes(data)
+        # Parse input data into text, shortcodes and stray shortcode endings
+        sc_data = _parse_shortcodes(data)
         # Now process data
         result = []
         dependencies = []
-        pos = 0
-        while pos < len(sc_data):
-            current = sc_data[pos]
+        for current in sc_data:
             if current[0] == "TEXT":
                 result.append(current[1])
-                pos += 1
             elif current[0] == "SHORTCODE_END":
                 raise ParsingError("Found shortcode ending '{{{{% /{0} %}}}}' which isn't closing a started shortcode ({1})!".format(current[3], _format_position(data, current[2])))
-            elif current[0] == "SHORTCODE_START":
+            elif current[0] == "SHORTCODE":
                 name = current[3]
-                # Check if we can find corresponding ending
-                found = None
-                for p in range(pos + 1, len(sc_data)):
-                    if sc_data[p][0] == "SHORTCODE_END" and sc_data[p][3] == name:
-                        found = p
-                        break
-                if found:
-                    # Found ending. Extract data argument:
-                    data_arg = []
-                    for p in range(pos + 1, found):
-                        data_arg.append(sc_data[p][1])
-                    data_arg = empty_string.join(data_arg)
-                    pos = found + 1
-                else:
-                    # Single shortcode
-                    pos += 1
-                    data_arg = ''
                 args, kw = current[4]
+                # The parsed shortcodes are cached, so work on a copy
+                kw = dict(kw)
                 kw['site'] = site
-                kw['data'] = data_arg
+                kw['data'] = current[5] or empty_string
                 kw['lang'] = lang
                 kw.update(extra_context)
                 if name in registry:
                     f = registry[name]
                     if getattr(f, 'nikola_shortcode_pass_filename', None):
                         kw['filename'] = filename
-                    res = f(*args, **kw)
-                    if not isinstance(res, tuple):  # For backards compatibility
-                        res = (res, [])
+                    res = _call_shortcode(f, name, args, kw, cache)
                 else:
                     LOGGER.error('Unknown shortcode %s (started at %s)', name, _format_position(data, current[2]))
                     res = ('', [])
@@ -26,13 +26,20 @@
 
 """Persistent state implementation."""
 
+import functools
+import hashlib
+import inspect
 import json
+import marshal
 import os
 import shutil
+import subprocess
 import tempfile
 import threading
+import time
 
-from . import utils
+from . import __version__, utils
+from .profiler import get_profiler
 
 
 class Persistor():
@@ -85,3 +92,337 @@ class Persistor():
             tname = outf.name
             json.dump(self._local.data, outf, sort_keys=True, indent=2)
         shutil.move(tname, self._path)
+
+
+class DiskCache():
+    """Cache JSON-serializable values in files, one file per key.
+
+    Unlike Persistor, reading or writing an entry does not touch any other
+    entries, so this is suitable for many small values (like rendered
+    fragments) that are looked up during the build.  Keys are strings and
+    are hashed to get file names.  If max_size (in bytes) is given, prune()
+    removes the least recently used entries once the cache grows over it.
+    The number of entries stored by this process is counted in writes.
+    """
+
+    def __init__(self, path, max_size=None):
+        """Where do you want the entries stored, and how many bytes to keep after pruning."""
+        self._path = path
+        self.max_size = max_size
+        self.writes = 0
+
+    def _entry_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self._path, digest[:2], digest + '.json')
+
+    def get(self, key):
+        """Get data stored in key, or None if there is no such entry."""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as inf:
+                entry = json.load(inf)
+            if self.max_size is not None:
+                # Mark as recently used
+                os.utime(path)
+        except (OSError, ValueError):
+            return None
+        # Guard against hash collisions
+        if entry.get('key') != key:
+            return None
+        return entry.get('value')
+
+    def set(self, key, value):
+        """Store value in key."""
+        path = self._entry_path(key)
+        dname = os.path.dirname(path)
+        utils.makedirs(dname)
+        with tempfile.NamedTemporaryFile(dir=dname, delete=False, mode='w+', encoding='utf-8') as outf:
+            tname = outf.name
+            json.dump({'key': key, 'value': value}, outf)
+        os.replace(tname, path)
+        self.writes += 1
+
+    def delete(self, key):
+        """Delete key and the value it contains."""
+        try:
+            os.unlink(self._entry_path(key))
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        """Remove the least recently used entries until the cache fits in max_size, return their number."""
+        if self.max_size is None:
+            return 0
+        return _prune_lru(self._path, self.max_size)
+
+
+def _prune_lru(path, max_size):
+    """Remove the oldest files in the subdirectories of path until they fit in max_size bytes.
+
+    Return the number of removed files.
+    """
+    entries = []
+    total = 0
+    if not os.path.isdir(path):
+        return 0
+    for subdir in os.scandir(path):
+        if not subdir.is_dir():
+            continue
+        for entry in os.scandir(subdir.path):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    removed = 0
+    entries.sort()
+    for _, size, entry_path in entries:
+        if total <= max_size:
+            break
+        try:
+            os.unlink(entry_path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def _filter_identity(f):
+    """Return a string identifying filter f and its arguments.
+
+    Functions are identified by their name and code, so editing a filter
+    (for example, one defined in conf.py) invalidates its cached output.
+    """
+    if isinstance(f, str):
+        return f
+    if isinstance(f, functools.partial):
+        return json.dumps([_filter_identity(f.func), f.args, f.keywords], default=_identity_default, sort_keys=True)
+    f = inspect.unwrap(f)
+    code = getattr(f, '__code__', None)
+    name = '{0}.{1}'.format(getattr(f, '__module__', None), getattr(f, '__qualname__', type(f).__qualname__))
+    if code is None:
+        return name
+    return '{0}:{1}'.format(name, hashlib.sha256(marshal.dumps(code)).hexdigest())
+
+
+def _identity_default(obj):
+    """Serialize filter arguments which are not JSON-serializable."""
+    if callable(obj):
+        return _filter_identity(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj)
+    return repr(obj)
+
+
+class FilterCache():
+    """Cache the output of filters, keyed by the filter and the input file contents.
+
+    Entries are files named after the key, so identical inputs share one
+    entry. Once the cache grows over max_size bytes, prune() removes the
+    least recently used entries.
+    """
+
+    def __init__(self, path, max_size):
+        """Store entries in path, keep at most max_size bytes after pruning."""
+        self._path = path
+        self.max_size = max_size
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _entry_path(self, key):
+        return os.path.join(self._path, key[:2], key)
+
+    def key(self, identity, data):
+        """Return the key for the output of the filter identified by identity on data."""
+        digest = hashlib.sha256(identity.encode('utf-8'))
+        digest.update(b'\0' + __version__.encode('utf-8') + b'\0')
+        digest.update(hashlib.sha256(data).digest())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Get the output stored in key, or None if there is no such entry."""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as inf:
+                data = inf.read()
+            # Mark as recently used
+            os.utime(path)
+        except OSError:
+            return None
+        return data
+
+    def set(self, key, data):
+        """Store output data in key."""
+        path = self._entry_path(key)
+        dname = os.path.dirname(path)
+        utils.makedirs(dname)
+        with tempfile.NamedTemporaryFile(dir=dname, delete=False) as outf:
+            tname = outf.name
+            outf.write(data)
+        os.replace(tname, path)
+
+    def prune(self):
+        """Remove the least recently used entries until the cache fits in max_size, return their number."""
+        return _prune_lru(self._path, self.max_size)
+
+    def wrap(self, f):
+        """Return a filter which runs filter f (a callable or a command) through this cache."""
+        return CachedFilter(f, self)
+
+
+class CachedFilter():
+    """A filter whose output is stored in a FilterCache.
+
+    Only filters whose output depends on nothing but the contents of the
+    file (and their arguments) can be cached.
+    """
+
+    def __init__(self, f, cache):
+        """Wrap filter f (a callable or a command), caching in cache."""
+        self.filter = f
+        self.cache = cache
+        self.identity = _filter_identity(f)
+        if isinstance(f, str):
+            self.__name__ = f.split()[0]
+        else:
+            self.__name__ = getattr(f, '__name__', None) or getattr(getattr(f, 'func', None), '__name__', type(f).__name__)
+
+    def __repr__(self):
+        """Return the representation of the filter, so tasks stay up to date when caching is turned on or off."""
+        return self.filter if isinstance(self.filter, str) else repr(self.filter)
+
+    def __call__(self, fname):
+        """Apply the filter to fname, in place."""
+        start = time.perf_counter()
+        with open(fname, 'rb') as inf:
+            data = inf.read()
+        key = self.cache.key(self.identity, data)
+        output = self.cache.get(key)
+        if output is not None:
+            self.cache.hits += 1
+            if output != data:
+                with open(fname, 'wb') as outf:
+                    outf.write(output)
+            get_profiler().add('filter_cache:hit', time.perf_counter() - start)
+            return
+        self.cache.misses += 1
+        if isinstance(self.filter, str):
+            subprocess.check_call(self.filter % fname, shell=True)
+        else:
+            self.filter(fname)
+        with open(fname, 'rb') as inf:
+            self.cache.set(key, inf.read())
+        get_profiler().add('filter_cache:miss', time.perf_counter() - start)
+
+
+class TargetList():
+    """The targets of all tasks of the last build, and their file dependencies.
+
+    It is written when tasks are loaded for a build, so commands which
+    compare the output folder with the targets (like ``nikola check -f``
+    and ``nikola orphans``) do not have to generate all tasks again.
+    """
+
+    def __init__(self, path):
+        """Where do you want the list stored."""
+        self._path = path
+
+    def write(self, tasks):
+        """Store the targets and file dependencies of doit tasks."""
+        files = []
+        deps = {}
+        for task in tasks:
+            files.extend(task.targets)
+            for target in task.targets:
+                deps.setdefault(target, []).extend(task.file_dep)
+        dname = os.path.dirname(self._path)
+        utils.makedirs(dname)
+        with tempfile.NamedTemporaryFile(dir=dname, delete=False, mode='w+', encoding='utf-8') as outf:
+            tname = outf.name
+            json.dump({'version': __version__, 'files': files, 'deps': deps}, outf)
+        os.replace(tname, self._path)
+
+    def read(self, newer_than=()):
+        """Return the stored (files, deps), or None.
+
+        None is returned if there is no list, if it was written by another
+        version of Nikola, or if any of the newer_than files (like conf.py)
+        was modified after it.
+        """
+        try:
+            mtime = os.stat(self._path).st_mtime
+            if any(os.stat(path).st_mtime > mtime for path in newer_than if os.path.exists(path)):
+                return None
+            with open(self._path, 'r', encoding='utf-8') as inf:
+                data = json.load(inf)
+        except (OSError, ValueError):
+            return None
+        if data.get('version') != __version__:
+            return None
+        return data['files'], data['deps']
+
+
+class DirectoryListingCache():
+    """List the files of a tree, reusing the listings of unchanged directories.
+
+    Adding, removing or renaming an entry changes the modification time of
+    its directory, so only directories whose modification time changed
+    since the last walk are listed again; the others cost one stat call.
+    """
+
+    # Directories modified this recently (in seconds) are not cached, as
+    # they could still change without their modification time changing.
+    racy_interval = 2
+
+    def __init__(self, path):
+        """Where do you want the listings stored."""
+        self._path = path
+        try:
+            with open(self._path, 'r', encoding='utf-8') as inf:
+                self._listings = json.load(inf)
+        except (OSError, ValueError):
+            self._listings = {}
+
+    def files(self, top):
+        """Return the paths of all files below top, following symlinks like os.walk(top, followlinks=True)."""
+        now = time.time()
+        listings = {}
+        result = []
+        stack = [top]
+        while stack:
+            root = stack.pop()
+            try:
+                st = os.stat(root)
+            except OSError:
+                continue
+            cached = self._listings.get(root)
+            if cached is not None and cached[0] == st.st_mtime_ns:
+                files, dirs = cached[1], cached[2]
+            else:
+                files = []
+                dirs = []
+                try:
+                    with os.scandir(root) as entries:
+                        for entry in entries:
+                            try:
+                                is_dir = entry.is_dir()
+                            except OSError:
+                                is_dir = False
+                            (dirs if is_dir else files).append(entry.name)
+                except OSError:
+                    continue
+            if st.st_mtime < now - self.racy_interval:
+                listings[root] = [st.st_mtime_ns, files, dirs]
+            result.extend(os.path.join(root, name) for name in files)
+            stack.extend(os.path.join(root, name) for name in dirs)
+        self._listings = listings
+        self._save()
+        return result
+
+    def _save(self):
+        dname = os.path.dirname(self._path)
+        utils.makedirs(dname)
+        with tempfile.NamedTemporaryFile(dir=dname, delete=False, mode='w+', encoding='utf-8') as outf:
+            tname = outf.name
+            json.dump(self._listings, outf)
+        os.replace(tname, self._path)
@@ -26,8 +26,13 @@
 
 """Utility functions."""
 
+import calendar
 import configparser
+import contextlib
 import datetime
+import email.utils
+import fnmatch
+import functools
 import hashlib
 import io
 import operator
@@ -48,13 +53,18 @@ from unicodedata import normalize as unicodenormalize
 from urllib.parse import quote as urlquote
 from urllib.parse import unquote as urlunquote
 from urllib.parse import urlparse, urlunparse
+from xml.sax.saxutils import XMLGenerator
 from zipfile import ZipFile as zipf
 
 import babel.dates
 import dateutil.parser
 import dateutil.tz
+import pygments
 import pygments.formatters
 import pygments.formatters._mapping
+import pygments.lexers
+import pygments.lexers._mapping
+import pygments.util
 import PyRSS2Gen as rss
 from blinker import signal
 from doit import tools
@@ -64,8 +74,9 @@ from nikola.packages.pygments_better_html import BetterHtmlFormatter
 from unidecode import unidecode
 
 # Renames
-from nikola import DEBUG  # NOQA
+from nikola import DEBUG, __version__  # NOQA
 from .log import LOGGER, get_logger  # NOQA
+from .profiler import get_profiler
 from .hierarchy_utils import TreeNode, clone_treenode, flatten_tree_structure, sort_classifications
 from .hierarchy_utils import join_hierarchical_category_path, parse_escaped_hierarchical_category_name
 
@@ -87,7 +98,7 @@ except ImportError:
 __all__ = ('CustomEncoder', 'get_theme_path', 'get_theme_path_real',
            'get_theme_chain', 'load_messages', 'copy_tree', 'copy_file',
            'slugify', 'unslugify', 'to_datetime', 'apply_filters',
-           'config_changed', 'get_crumbs', 'get_tzname', 'get_asset_path',
+           'config_changed', 'changed_config_keys', 'get_crumbs', 'get_tzname', 'get_asset_path',
            '_reload', 'Functionary', 'TranslatableSetting',
            'TemplateHookRegistry', 'LocaleBorg',
            'sys_encode', 'sys_decode', 'makedirs', 'get_parent_theme_name',
@@ -95,9 +106,11 @@ __all__ = ('CustomEncoder', 'get_theme_path', 'get_theme_path_real',
            'ask', 'ask_yesno', 'options2docstring', 'os_path_split',
            'get_displayed_page_number', 'adjust_name_for_index_path_list',
            'adjust_name_for_index_path', 'adjust_name_for_index_link',
-           'NikolaPygmentsHTML', 'create_redirect', 'clean_before_deployment',
+           'NikolaPygmentsHTML', 'highlight_code', 'get_lexer_for_file', 'guess_lexer',
+           'set_highlight_cache', 'create_redirect', 'clean_before_deployment', 'undeployed_post_files',
            'sort_posts', 'smartjoin', 'indent', 'load_data', 'html_unescape',
-           'rss_writer', 'map_metadata', 'req_missing',
+           'rss_writer', 'rss_stream_writer', 'atom_stream_writer',
+           'map_metadata', 'req_missing',
            # Deprecated, moved to hierarchy_utils:
            'TreeNode', 'clone_treenode', 'flatten_tree_structure',
            'sort_classifications', 'join_hierarchical_category_path',
@@ -240,12 +253,13 @@ class TranslatableSetting(object):
     # Note that this setting is global.  DO NOT set on a per-instance basis!
     default_lang = 'en'
 
-    def __getattribute__(self, attr):
-        """Return attributes, falling back to string attributes."""
-        try:
-            return super().__getattribute__(attr)
-        except AttributeError:
-            return self().__getattribute__(attr)
+    def __getattr__(self, attr):
+        """Return attributes of the string value (only called if the setting has no such attribute)."""
+        if attr.startswith('__') or 'values' not in self.__dict__:
+            # Special methods (like __deepcopy__) are not taken from the
+            # value, and the value is not known before __init__.
+            raise AttributeError(attr)
+        return getattr(self(), attr)
 
     def __dir__(self):
         """Return the available methods of TranslatableSettings and strings."""
@@ -502,6 +516,11 @@ class CustomEncoder(json.JSONEncoder):
 class config_changed(tools.config_changed):
     """A copy of doit's config_changed, using pickle instead of serializing manually."""
 
+    # Where to record the inputs behind every digest (for explain-rebuild).
+    # An object with get/set methods, like nikola.state.DiskCache.
+    recorder = None
+    _recorded = set()
+
     def __init__(self, config, identifier=None):
         """Initialize config_changed."""
         super().__init__(config)
@@ -509,6 +528,12 @@ class config_changed(tools.config_changed):
         if identifier is not None:
             self.identifier += ':' + identifier
 
+    @classmethod
+    def set_recorder(cls, recorder) -> None:
+        """Record the inputs behind every digest calculated from now on into recorder (or stop if None)."""
+        cls.recorder = recorder
+        cls._recorded = set()
+
     # DEBUG (for unexpected rebuilds)
     @classmethod
     def _write_into_debug_db(cls, digest: str, data: str) -> None:  # pragma: no cover
@@ -544,6 +569,10 @@ class config_changed(tools.config_changed):
                 byte_data = data
             digest = hashlib.md5(byte_data).hexdigest()
 
+            if self.recorder is not None and digest not in self._recorded:
+                self.recorder.set(digest, data)
+                self._recorded.add(digest)
+
             # DEBUG (for unexpected rebuilds)
             # self._write_into_debug_db(digest, data)
             # Alternative (without database):
@@ -575,6 +604,32 @@ class config_changed(tools.config_changed):
                                                            sort_keys=True))
 
 
+def changed_config_keys(old, new, _prefix=''):
+    """Return the paths of the keys which differ between two config_changed inputs.
+
+    Paths look like ``global_context.blog_title`` or ``posts[3]``. Lists of
+    different length are reported as a whole.
+    """
+    if isinstance(old, dict) and isinstance(new, dict):
+        paths = []
+        for key in sorted(set(old) | set(new), key=str):
+            path = '{0}.{1}'.format(_prefix, key) if _prefix else str(key)
+            if key not in old or key not in new:
+                paths.append(path)
+            elif old[key] != new[key]:
+                paths.extend(changed_config_keys(old[key], new[key], path))
+        return paths
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        paths = []
+        for i, (old_item, new_item) in enumerate(zip(old, new)):
+            if old_item != new_item:
+                paths.extend(changed_config_keys(old_item, new_item, '{0}[{1}]'.format(_prefix, i)))
+        return paths
+    elif old != new:
+        return [_prefix or '(all)']
+    return []
+
+
 def get_theme_path_real(theme, themes_dirs):
     """Return the path where the given theme's files are located.
 
@@ -814,7 +869,17 @@ def slugify(value, lang=None, force=False):
     """
     if not isinstance(value, str):
         raise ValueError("Not a unicode object: {0}".format(value))
-    if USE_SLUGIFY or force:
+    return _slugify(value, bool(USE_SLUGIFY or force))
+
+
+@functools.lru_cache(maxsize=65536)
+def _slugify(value, use_slugify):
+    """Slugify value, or only replace URL-unsafe characters if not use_slugify.
+
+    The same tags and categories are slugified many times during a build,
+    and unidecode is slow, so the results are cached.
+    """
+    if use_slugify:
         # This is the standard state of slugify, which actually does some work.
         # It is the preferred style, especially for Western languages.
         value = str(unidecode(value))
@@ -945,6 +1010,9 @@ def apply_filters(task, filters, skip_ext=None):
     If any of the targets of the given task has a filter that matches,
     adds the filter commands to the commands of the task,
     and the filter itself to the uptodate of the task.
+
+    Targets of batched filters (see BATCH_FILTERS) are added to their batch
+    instead, unless the filter_batches task has already been generated.
     """
     if '.php' in filters.keys():
         if task_filters.php_template_injection not in filters['.php']:
@@ -970,12 +1038,18 @@ def apply_filters(task, filters, skip_ext=None):
         filter_ = filter_matches(ext)
         if filter_:
             for action in filter_:
+                if isinstance(action, task_filters.BatchedFilter) and action.add(target):
+                    # Filtered later, together with other files, by the filter_batches task
+                    continue
+
                 def unlessLink(action, target):
                     if not os.path.islink(target):
                         if isinstance(action, Callable):
-                            action(target)
+                            with get_profiler().span('filter:' + getattr(action, '__name__', type(action).__name__)):
+                                action(target)
                         else:
-                            subprocess.check_call(action % target, shell=True)
+                            with get_profiler().span('filter:' + action.split()[0]):
+                                subprocess.check_call(action % target, shell=True)
 
                 task['actions'].append((unlessLink, (action, target)))
     return task
@@ -1101,32 +1175,71 @@ class LocaleBorgUninitializedException(Exception):
 def format_datetime(datetime=None, format='medium',
                     locale=babel.dates.LC_TIME):
     """Format a datetime object."""
-    locale = babel.dates.Locale.parse(locale)
-    if format in ('full', 'long', 'medium', 'short'):
-        return babel.dates.get_datetime_format(format, locale=locale) \
-            .replace("'", "") \
-            .replace('{0}', format_time(datetime, format, locale=locale)) \
-            .replace('{1}', babel.dates.format_date(datetime, format, locale=locale))
-    else:
-        return babel.dates.parse_pattern(format).apply(datetime, locale)
+    return _date_formatter('datetime', format, locale)(datetime)
 
 
 def format_time(time=None, format='medium', locale=babel.dates.LC_TIME):
     """Format time. Input can be datetime.time or datetime.datetime."""
-    locale = babel.dates.Locale.parse(locale)
-    if format in ('full', 'long', 'medium', 'short'):
-        format = babel.dates.get_time_format(format, locale=locale)
-    return babel.dates.parse_pattern(format).apply(time, locale)
+    return _date_formatter('time', format, locale)(time)
 
 
 def format_skeleton(skeleton, datetime=None, fo=None, fuzzy=True,
                     locale=babel.dates.LC_TIME):
     """Format a datetime based on a skeleton."""
+    if fuzzy:
+        return _date_formatter('skeleton', skeleton, locale)(datetime)
     locale = babel.dates.Locale.parse(locale)
-    if fuzzy and skeleton not in locale.datetime_skeletons:
-        skeleton = babel.dates.match_skeleton(skeleton, locale.datetime_skeletons)
-    format = locale.datetime_skeletons[skeleton]
-    return format_datetime(datetime, format, locale)
+    return format_datetime(datetime, locale.datetime_skeletons[skeleton], locale)
+
+
+@functools.lru_cache(maxsize=None)
+def _date_formatter(kind, format, locale):
+    """Return a function formatting dates with format in locale.
+
+    kind is 'datetime', 'date' (which ignores the time of datetimes), 'time'
+    or 'skeleton' (a fuzzy-matched skeleton). The locale and the patterns are
+    parsed once, instead of on every call.
+    """
+    locale = babel.dates.Locale.parse(locale)
+    if kind == 'skeleton':
+        if format not in locale.datetime_skeletons:
+            format = babel.dates.match_skeleton(format, locale.datetime_skeletons)
+        kind, format = 'datetime', locale.datetime_skeletons[format]
+
+    if kind == 'datetime' and format in ('full', 'long', 'medium', 'short'):
+        template = babel.dates.get_datetime_format(format, locale=locale).replace("'", "")
+        format_time = _date_formatter('time', format, locale)
+        format_date = _date_formatter('date', format, locale)
+        return lambda date: template.replace('{0}', format_time(date)).replace('{1}', format_date(date))
+
+    if format in ('full', 'long', 'medium', 'short'):
+        if kind == 'date':
+            format = babel.dates.get_date_format(format, locale=locale)
+        else:
+            format = babel.dates.get_time_format(format, locale=locale)
+    pattern = babel.dates.parse_pattern(format)
+    if kind != 'date':
+        return lambda date: pattern.apply(date, locale)
+
+    def formatter(date):
+        if date is None:
+            date = datetime.date.today()
+        elif isinstance(date, datetime.datetime):
+            date = date.date()
+        return pattern.apply(date, locale)
+    return formatter
+
+
+def _date_cache_key(date):
+    """Return a key for caching formatted versions of date, or None if they should not be cached."""
+    if date is None:
+        # Babel uses the current time
+        return None
+    # Aware datetimes compare equal if they are the same instant, even if
+    # their timezones (and thus their formatted versions) differ. dateutil
+    # timezones are not hashable, but the key keeps them alive, so their ids
+    # are not reused.
+    return date, id(getattr(date, 'tzinfo', None)), getattr(date, 'fold', 0)
 
 
 class LocaleBorg(object):
@@ -1197,6 +1310,7 @@ class LocaleBorg(object):
         cls.thread_local = None
         cls.datetime_formatter = None
         cls.in_string_formatter = None
+        cls.__formatted_dates = {}
 
     def __init__(self):
         """Initialize."""
@@ -1232,8 +1346,17 @@ class LocaleBorg(object):
             return date.replace(microsecond=0).isoformat().replace('+00:00', 'Z')
         elif LocaleBorg.datetime_formatter is not None:
             return LocaleBorg.datetime_formatter(date, date_format, lang, locale)
-        else:
+
+        # The same dates are formatted on many pages (post lists, archives, indexes)
+        date_key = _date_cache_key(date)
+        if date_key is None:
             return format_datetime(date, date_format, locale=locale)
+        key = (date_format, locale, date_key)
+        try:
+            return self.__formatted_dates[key]
+        except KeyError:
+            formatted = self.__formatted_dates[key] = format_datetime(date, date_format, locale=locale)
+            return formatted
 
     def format_date_in_string(self, message: str, date: datetime.date, lang: 'typing.Optional[str]' = None) -> str:
         """Format date inside a string (message).
@@ -1251,21 +1374,28 @@ class LocaleBorg(object):
             lang = self.current_lang
         locale = self.locales.get(lang, lang)
 
+        date_key = None if LocaleBorg.in_string_formatter is not None else _date_cache_key(date)
+        if date_key is not None:
+            key = ('in_string', message, locale, date_key)
+            try:
+                return self.__formatted_dates[key]
+            except KeyError:
+                pass
+
         def date_formatter(match: typing.Match) -> str:
             """Format a date as requested."""
             mode, custom_format = match.groups()
             if LocaleBorg.in_string_formatter is not None:
                 return LocaleBorg.in_string_formatter(date, mode, custom_format, lang, locale)
             elif custom_format:
-                return babel.dates.format_date(date, custom_format, locale)
+                return _date_formatter('date', custom_format, locale)(date)
             else:
-                function, fmt = modes[mode]
-                if function == 'skeleton':
-                    return format_skeleton(fmt, date, locale=locale)
-                else:
-                    return babel.dates.format_date(date, fmt, locale)
+                return _date_formatter(*modes[mode], locale)(date)
 
-        return re.sub(r'{(.*?)(?::(.*?))?}', date_formatter, message)
+        formatted = re.sub(r'{(.*?)(?::(.*?))?}', date_formatter, message)
+        if date_key is not None:
+            self.__formatted_dates[key] = formatted
+        return formatted
 
 
 class ExtendedRSS2(rss.RSS2):
@@ -1668,6 +1798,133 @@ class NikolaPygmentsHTML(BetterHtmlFormatter):
 # For consistency, override the default formatter.
 pygments.formatters._formatter_cache['HTML'] = NikolaPygmentsHTML
 
+# Cache for highlight_code (see set_highlight_cache)
+_highlight_cache = None
+# Lexer classes for file extensions, and for code guessed by guess_lexer
+_lexers_by_extension = {}
+_guessed_lexers = {}
+# Placeholder for the line anchors of the formatter in cached output
+_HIGHLIGHT_ANCHOR_PLACEHOLDER = 'nikolahighlightanchorplaceholder'
+_special_lexer_filenames_re = None
+
+
+def set_highlight_cache(cache):
+    """Set the cache used by highlight_code and guess_lexer.
+
+    The cache is an object with get and set methods (like
+    nikola.state.DiskCache), or None to disable caching.
+    """
+    global _highlight_cache
+    _highlight_cache = cache
+
+
+def _lexer_identity(lexer):
+    cls = type(lexer)
+    return ['{0}.{1}'.format(cls.__module__, cls.__qualname__), lexer.options]
+
+
+def highlight_code(code, lexer, formatter):
+    """Highlight code with Pygments, reusing cached output for the same input.
+
+    Cached output is keyed by the lexer, the formatter options and a hash
+    of the code. Line anchors (which reST code blocks make unique) are
+    replaced in cached output, so they do not prevent reuse.
+    """
+    cache = _highlight_cache
+    if cache is None:
+        return pygments.highlight(code, lexer, formatter)
+    anchors = getattr(formatter, 'lineanchors', '')
+    if anchors and _HIGHLIGHT_ANCHOR_PLACEHOLDER in code:
+        return pygments.highlight(code, lexer, formatter)
+    options = {k: v for k, v in formatter.options.items() if k != 'lineanchors'}
+    cls = type(formatter)
+    key = json.dumps([
+        'highlight', __version__, pygments.__version__, _lexer_identity(lexer),
+        '{0}.{1}'.format(cls.__module__, cls.__qualname__), options,
+        getattr(formatter, 'nclasses', None), bool(anchors),
+        hashlib.sha256(code.encode('utf-8')).hexdigest()], cls=CustomEncoder, sort_keys=True)
+    output = cache.get(key)
+    if output is None:
+        get_profiler().add('highlight_cache:miss', 0.0)
+        if anchors:
+            formatter.lineanchors = _HIGHLIGHT_ANCHOR_PLACEHOLDER
+            try:
+                output = pygments.highlight(code, lexer, formatter)
+            finally:
+                formatter.lineanchors = anchors
+        else:
+            output = pygments.highlight(code, lexer, formatter)
+        cache.set(key, output)
+    else:
+        get_profiler().add('highlight_cache:hit', 0.0)
+    if anchors:
+        output = output.replace(_HIGHLIGHT_ANCHOR_PLACEHOLDER, anchors)
+    return output
+
+
+def guess_lexer(code, **options):
+    """Guess the lexer for code with Pygments, reusing cached guesses.
+
+    Guessing tries every lexer on the code, so the name of the guessed
+    lexer is kept in the highlight cache. The options are passed to the
+    lexer. Raises ClassNotFound like pygments.lexers.guess_lexer.
+    """
+    cache = _highlight_cache
+    key = json.dumps(['guess_lexer', pygments.__version__, hashlib.sha256(code.encode('utf-8')).hexdigest()])
+    name = _guessed_lexers.get(key) or (cache.get(key) if cache is not None else None)
+    if name is None:
+        lexer = pygments.lexers.guess_lexer(code, **options)
+        name = lexer.aliases[0] if lexer.aliases else None
+        if name is None:
+            return lexer
+        _guessed_lexers[key] = name
+        if cache is not None:
+            cache.set(key, name)
+    return pygments.lexers.get_lexer_by_name(name, **options)
+
+
+def _lexer_extension(filename):
+    """Return the extension which identifies the lexer of filename, or None.
+
+    None is returned for files without an extension and for file names
+    which Pygments lexers recognize by more than the extension (like
+    CMakeLists.txt).
+    """
+    global _special_lexer_filenames_re
+    if _special_lexer_filenames_re is None:
+        patterns = set()
+        for _, _, _, filenames, _ in pygments.lexers._mapping.LEXERS.values():
+            for pattern in filenames:
+                if not (pattern.startswith('*.') and re.match(r'^[\w.+-]*$', pattern[2:])):
+                    patterns.add(fnmatch.translate(pattern))
+        _special_lexer_filenames_re = re.compile('|'.join(sorted(patterns)) or '(?!)')
+    basename = os.path.basename(filename)
+    if _special_lexer_filenames_re.match(basename):
+        return None
+    return os.path.splitext(basename)[1] or None
+
+
+def get_lexer_for_file(filename, code):
+    """Return a Pygments lexer for the file, falling back to guessing from code.
+
+    Lexers found by file name are memoized by file extension, so they are
+    looked up once per file type. Files with unknown extensions are guessed
+    one by one (guesses are cached by content).
+    """
+    extension = _lexer_extension(filename)
+    if extension in _lexers_by_extension:
+        return _lexers_by_extension[extension]()
+    try:
+        lexer = pygments.lexers.get_lexer_for_filename(filename)
+    except Exception:
+        try:
+            return guess_lexer(code)
+        except Exception:
+            return pygments.lexers.TextLexer()
+    if extension is not None and not lexer.options:
+        _lexers_by_extension[extension] = type(lexer)
+    return lexer
+
 
 def get_displayed_page_number(i, num_pages, site):
     """Get page number to be displayed for entry `i`."""
@@ -1822,21 +2079,33 @@ def dns_sd(port, inet6):
         return None
 
 
-def clean_before_deployment(site):
-    """Clean drafts and future posts before deployment."""
+def undeployed_post_files(site, post):
+    """Return the paths of the output files of post (a draft or future post) which are not deployed."""
+    out_dir = site.config['OUTPUT_FOLDER']
+    paths = []
+    for lang in post.translated_to:
+        paths.append(os.path.join(out_dir, post.destination_path(lang)))
+        source_path = post.destination_path(lang, post.source_ext(True))
+        paths.append(os.path.join(out_dir, source_path))
+    return paths
+
+
+def clean_before_deployment(site, dry_run=False):
+    """Clean drafts and future posts before deployment.
+
+    With dry_run, the files of these posts are not removed.
+    """
     undeployed_posts = []
     deploy_drafts = site.config.get('DEPLOY_DRAFTS', True)
     deploy_future = site.config.get('DEPLOY_FUTURE', False)
     if not (deploy_drafts and deploy_future):  # == !drafts || !future
         # Remove drafts and future posts
-        out_dir = site.config['OUTPUT_FOLDER']
         site.scan_posts()
         for post in site.timeline:
             if (not deploy_drafts and post.is_draft) or (not deploy_future and post.publish_later):
-                for lang in post.translated_to:
-                    remove_file(os.path.join(out_dir, post.destination_path(lang)))
-                    source_path = post.destination_path(lang, post.source_ext(True))
-                    remove_file(os.path.join(out_dir, source_path))
+                if not dry_run:
+                    for path in undeployed_post_files(site, post):
+                        remove_file(path)
                 undeployed_posts.append(post)
     return undeployed_posts
 
@@ -1953,6 +2222,165 @@ def rss_writer(rss_obj, output_path):
         rss_file.write(data)
 
 
+def _feed_element(handler, name, text=None, attrs=None):
+    """Write a simple XML element with the SAX handler."""
+    handler.startElement(name, attrs or {})
+    if text is not None:
+        handler.characters(text)
+    handler.endElement(name)
+
+
+def rfc822_date(dt):
+    """Format a datetime for RSS feeds. Naive datetimes are assumed to be in UTC."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(dateutil.tz.tzutc())
+    return email.utils.formatdate(calendar.timegm(dt.utctimetuple()), usegmt=True)
+
+
+@contextlib.contextmanager
+def _open_replacing(output_path):
+    """Open a temporary text file next to output_path, and move it there if the block succeeds.
+
+    This way an error while writing leaves the previous file in place,
+    instead of a truncated one. The temporary file is created like any
+    output file (not with NamedTemporaryFile), so it gets the usual
+    permissions.
+    """
+    makedirs(os.path.dirname(output_path))
+    temp_path = '{0}.{1}.tmp'.format(output_path, os.getpid())
+    try:
+        with io.open(temp_path, "w", encoding="utf-8") as outf:
+            yield outf
+        os.replace(temp_path, output_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def rss_stream_writer(output_path, channel, items, xsl_stylesheet_href=None, self_url=None):
+    """Write an RSS 2.0 feed to an xml file, one item at a time.
+
+    channel is a dict with the feed's title, link and description, and
+    optionally its language, copyright, lastBuildDate and generator.
+
+    items is an iterable of dicts, which may contain the keys title, link,
+    creator, description, categories (a list of strings), enclosure (a
+    tuple of url, length and mimetype), guid (a string, or a tuple of a
+    string and a isPermaLink flag) and pubDate (a datetime). Items are
+    written as they are produced, so the feed is never held in memory.
+    The file is only replaced once all items were written.
+    """
+    with _open_replacing(output_path) as rss_file:
+        handler = XMLGenerator(rss_file, "utf-8")
+        handler.startDocument()
+        if xsl_stylesheet_href:
+            handler.processingInstruction("xml-stylesheet", 'type="text/xsl" href="{0}" media="all"'.format(xsl_stylesheet_href))
+        handler.startElement("rss", {
+            "version": "2.0",
+            "xmlns:atom": "http://www.w3.org/2005/Atom",
+            "xmlns:dc": "http://purl.org/dc/elements/1.1/",
+        })
+        handler.startElement("channel", {})
+        _feed_element(handler, "title", channel["title"])
+        _feed_element(handler, "link", channel["link"])
+        _feed_element(handler, "description", channel["description"])
+        if self_url:
+            _feed_element(handler, "atom:link", attrs={
+                "href": self_url,
+                "rel": "self",
+                "type": "application/rss+xml",
+            })
+        for key in ("language", "copyright"):
+            if channel.get(key):
+                _feed_element(handler, key, channel[key])
+        if channel.get("lastBuildDate"):
+            _feed_element(handler, "lastBuildDate", rfc822_date(channel["lastBuildDate"]))
+        if channel.get("generator"):
+            _feed_element(handler, "generator", channel["generator"])
+        _feed_element(handler, "docs", "http://blogs.law.harvard.edu/tech/rss")
+
+        for item in items:
+            handler.startElement("item", {})
+            for key in ("title", "link"):
+                if item.get(key) is not None:
+                    _feed_element(handler, key, item[key])
+            if item.get("creator"):
+                _feed_element(handler, "dc:creator", item["creator"])
+            if item.get("description") is not None:
+                _feed_element(handler, "description", item["description"])
+            for category in item.get("categories", []):
+                _feed_element(handler, "category", category)
+            if item.get("enclosure"):
+                url, length, mimetype = item["enclosure"]
+                _feed_element(handler, "enclosure", attrs={"url": url, "length": str(length), "type": mimetype})
+            guid = item.get("guid")
+            if isinstance(guid, tuple):
+                _feed_element(handler, "guid", guid[0], {"isPermaLink": "true" if guid[1] else "false"})
+            elif guid is not None:
+                _feed_element(handler, "guid", guid)
+            if item.get("pubDate"):
+                _feed_element(handler, "pubDate", rfc822_date(item["pubDate"]))
+            handler.endElement("item")
+
+        handler.endElement("channel")
+        handler.endElement("rss")
+        handler.endDocument()
+
+
+def atom_stream_writer(output_path, feed, entries, xsl_stylesheet_href=None):
+    """Write an Atom feed to an xml file, one entry at a time.
+
+    feed is a dict with the feed's lang, title, id, updated, author, links
+    (a list of (rel, type, href) tuples) and generator (a (uri, name) tuple).
+
+    entries is an iterable of dicts with the keys title, id, updated,
+    published, author, links (as above), summary, content (optional),
+    type ("html" or "text", for summary and content) and categories (a
+    list of (term, label) tuples). The file is only replaced once all
+    entries were written.
+    """
+    with _open_replacing(output_path) as atom_file:
+        handler = XMLGenerator(atom_file, "utf-8")
+        handler.startDocument()
+        if xsl_stylesheet_href:
+            handler.processingInstruction("xml-stylesheet", 'href="{0}" type="text/xsl" media="all"'.format(xsl_stylesheet_href))
+        handler.startElement("feed", {"xml:lang": feed["lang"], "xmlns": "http://www.w3.org/2005/Atom"})
+        handler.ignorableWhitespace("\n")
+        for key in ("title", "id", "updated"):
+            _feed_element(handler, key, feed[key])
+        handler.startElement("author", {})
+        _feed_element(handler, "name", feed["author"])
+        handler.endElement("author")
+        for rel, type_, href in feed["links"]:
+            _feed_element(handler, "link", attrs={"rel": rel, "type": type_, "href": encodelink(href)})
+        uri, name = feed["generator"]
+        _feed_element(handler, "generator", name, {"uri": uri})
+        handler.ignorableWhitespace("\n")
+
+        for entry in entries:
+            handler.startElement("entry", {})
+            for key in ("title", "id", "updated", "published"):
+                _feed_element(handler, key, entry[key])
+            handler.startElement("author", {})
+            _feed_element(handler, "name", entry["author"])
+            handler.endElement("author")
+            for rel, type_, href in entry["links"]:
+                _feed_element(handler, "link", attrs={"rel": rel, "type": type_, "href": encodelink(href)})
+            _feed_element(handler, "summary", entry["summary"], {"type": entry["type"]})
+            if entry.get("content"):
+                _feed_element(handler, "content", entry["content"], {"type": entry["type"]})
+            for term, label in entry.get("categories", []):
+                _feed_element(handler, "category", attrs={"term": term, "label": label})
+            handler.endElement("entry")
+            handler.ignorableWhitespace("\n")
+
+        handler.endElement("feed")
+        handler.endDocument()
+
+
 def map_metadata(meta, key, config):
     """Map metadata from other platforms to Nikola names.
 
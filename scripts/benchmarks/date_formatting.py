@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+"""Benchmark formatting post dates, as done by templates and archives."""
+
+import datetime
+import sys
+import time
+
+import babel.dates
+import dateutil.tz
+
+from nikola.utils import LocaleBorg
+
+SIZES = [100000]
+LOCALES = ['en', 'de', 'pl', 'ja', 'pt_BR']
+FORMATS = ['yyyy-MM-dd HH:mm', 'long']
+
+
+def uncached_format_datetime(date, format, locale):
+    """Format a date like nikola.utils.format_datetime did before caching."""
+    locale = babel.dates.Locale.parse(locale)
+    if format in ('full', 'long', 'medium', 'short'):
+        time_format = babel.dates.get_time_format(format, locale=locale)
+        return babel.dates.get_datetime_format(format, locale=locale) \
+            .replace("'", "") \
+            .replace('{0}', babel.dates.parse_pattern(time_format).apply(date, locale)) \
+            .replace('{1}', babel.dates.format_date(date, format, locale=locale))
+    return babel.dates.parse_pattern(format).apply(date, locale)
+
+
+def run(size, posts=1000):
+    """Print the time needed to render size post dates in every locale."""
+    tz = dateutil.tz.gettz('Europe/Warsaw')
+    start_date = datetime.datetime(2019, 1, 1, tzinfo=tz)
+    # Templates render the dates of the same posts on many pages
+    dates = [start_date + datetime.timedelta(hours=7 * (i % posts)) for i in range(size)]
+    LocaleBorg.initialize({}, 'en')
+    borg = LocaleBorg()
+
+    for date_format in FORMATS:
+        name = date_format.split()[0]
+        start = time.perf_counter()
+        for lang in LOCALES:
+            for date in dates:
+                uncached_format_datetime(date, date_format, lang)
+        print('uncached_{0}\t{1}\t{2:.6f}'.format(name, size, time.perf_counter() - start))
+
+        start = time.perf_counter()
+        for lang in LOCALES:
+            for date in dates:
+                borg.formatted_date(date_format, date, lang)
+        print('formatted_date_{0}\t{1}\t{2:.6f}'.format(name, size, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for lang in LOCALES:
+        for date in dates:
+            borg.format_date_in_string('{month_year}', date.date(), lang)
+    print('format_date_in_string\t{0}\t{1:.6f}'.format(size, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    for size in sizes:
+        run(size)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+"""Benchmark filtering files through the filter cache.
+
+Simulates rewriting the pages of a site with mostly identical bodies, like
+after a theme change or ``nikola clean``: the first pass fills the cache,
+the second one hits it.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from nikola import filters
+from nikola.state import FilterCache
+
+SIZES = [2000]
+PAGE = '<html><body><div class="post">{0}</div></body></html>'
+BODY = '<p>Lorem ipsum "dolor" sit amet -- consectetur &amp; adipiscing elit...</p>' * 50
+
+
+def write_pages(directory, size):
+    """Write size pages (with 10 different bodies) into directory, return their paths."""
+    paths = []
+    for i in range(size):
+        path = os.path.join(directory, '{0}.html'.format(i))
+        with open(path, 'w', encoding='utf-8') as outf:
+            outf.write(PAGE.format(BODY + str(i % 10)))
+        paths.append(path)
+    return paths
+
+
+def run(size, directory):
+    """Print the time needed to filter size pages without and with the cache."""
+    f = filters.typogrify if filters.typo is not None else filters.normalize_html
+    cache = FilterCache(os.path.join(directory, 'cache'), 256 * 1024 * 1024)
+    cached = cache.wrap(f)
+    for name, function in (('uncached', f), ('cold_cache', cached), ('warm_cache', cached)):
+        paths = write_pages(directory, size)
+        start = time.perf_counter()
+        for path in paths:
+            function(path)
+        print('{0}\t{1}\t{2:.6f}'.format(name, size, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    for size in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            run(size, directory)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+"""Benchmark HTML minification of rendered pages.
+
+Compares what render_template does without minification (parse and
+serialize with lxml), with HTML_MINIFY (parse, minify the tree and
+serialize), and the html5lib_minify filter (which parses the output
+again with html5lib), on a synthetic blog post page.
+"""
+
+import sys
+import time
+
+import lxml.html
+
+from nikola import minifiers
+
+SIZES = [200]
+
+PARAGRAPH = """
+        <p>
+            Lorem ipsum dolor sit amet, <a href="/posts/{0}/" class="reference external">consectetur</a>
+            adipiscing elit, sed do <em>eiusmod</em> tempor incididunt ut labore et dolore magna aliqua.
+            <!-- a comment -->
+        </p>
+        <pre class="code python"><span class="k">def</span> <span class="nf">f</span><span class="p">():</span>
+    <span class="k">return</span> <span class="mi">{0}</span></pre>
+"""
+
+PAGE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <title>A post</title>
+    <link href="/assets/css/all.css" rel="stylesheet" type="text/css">
+    <script>
+        var moment_locale = "en";  // used by the theme
+    </script>
+</head>
+<body>
+    <nav class="navbar">
+        <ul class="nav">
+            <li class="nav-item"><a href="/archive.html" class="nav-link">Archive</a></li>
+            <li class="nav-item"><a href="/categories/" class="nav-link">Tags</a></li>
+        </ul>
+    </nav>
+    <article class="post-text h-entry" itemscope="itemscope" itemtype="http://schema.org/Article">
+{0}
+    </article>
+</body>
+</html>
+"""
+
+
+def parse(page):
+    """Parse a page like render_template does."""
+    return lxml.html.document_fromstring(page.strip(), lxml.html.HTMLParser(remove_blank_text=True))
+
+
+def lxml_only(page):
+    """Parse and serialize a page without minifying it."""
+    return lxml.html.tostring(parse(page), encoding='utf8', method='html', pretty_print=True, doctype='<!DOCTYPE html>')
+
+
+def html_minify(page):
+    """Parse, minify and serialize a page, like render_template with HTML_MINIFY."""
+    return minifiers.minify_html_tree(parse(page), '<!DOCTYPE html>').encode('utf-8')
+
+
+def html5lib_minify(page):
+    """Parse and serialize a page, then minify the output with html5lib."""
+    import html5lib
+    import html5lib.serializer
+    data = lxml_only(page).decode('utf-8')
+    return html5lib.serializer.serialize(html5lib.parse(data, treebuilder='lxml'), tree='lxml',
+                                         quote_attr_values='spec', omit_optional_tags=True,
+                                         minimize_boolean_attributes=True, strip_whitespace=True,
+                                         alphabetical_attributes=True, escape_lt_in_attrs=True).encode('utf-8')
+
+
+def run(size):
+    """Print the time needed to process size pages, and the size of one page."""
+    page = PAGE.format(''.join(PARAGRAPH.format(i) for i in range(30)))
+    functions = [lxml_only, html_minify]
+    try:
+        import html5lib  # NOQA
+        functions.append(html5lib_minify)
+    except ImportError:
+        pass
+    for function in functions:
+        start = time.perf_counter()
+        for _ in range(size):
+            output = function(page)
+        seconds = time.perf_counter() - start
+        print('{0}\t{1}\t{2:.6f}\t{3} bytes, {4:.0f} pages/s'.format(
+            function.__name__, size, seconds, len(output), size / seconds))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    for size in sizes:
+        run(size)
@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+"""Benchmark hyphenating posts in several languages."""
+
+import random
+import sys
+import time
+
+import lxml.html
+import pyphen
+
+from nikola import post
+
+SIZES = [100]
+LANGUAGES = ['en', 'de', 'fr', 'es', 'it', 'pl', 'pt', 'nl']
+WORDS = ('international communication documentation representation responsibility characteristically '
+         'unbelievable extraordinary hyphenation accommodation organization establishment').split()
+
+
+def make_document(rng, paragraphs=30):
+    """Return the HTML of a post with paragraphs and lists."""
+    chunks = []
+    for i in range(paragraphs):
+        text = ' '.join(rng.choice(WORDS) for _ in range(80))
+        chunks.append('<p>{0}</p>'.format(text) if i % 3 else '<ul><li><p>{0}</p></li></ul>'.format(text))
+    return ''.join(chunks)
+
+
+def uncached_hyphenate(dom, lang):
+    """Hyphenate like post.hyphenate did before caching: a new Pyphen per call, one query per tag."""
+    hyphenator = pyphen.Pyphen(lang=pyphen.language_fallback(lang))
+    for tag in ('p', 'li', 'span'):
+        for node in dom.xpath("//%s[not(parent::pre)]" % tag):
+            post.insert_hyphens(node, hyphenator)
+
+
+def run(size):
+    """Print the time needed to hyphenate size posts in every language."""
+    rng = random.Random(0)
+    documents = [make_document(rng) for _ in range(size)]
+    for name, function in (('uncached', uncached_hyphenate), ('hyphenate', post.hyphenate)):
+        start = time.perf_counter()
+        for lang in LANGUAGES:
+            for html in documents:
+                function(lxml.html.fragment_fromstring(html, 'body'), lang)
+        print('{0}\t{1}\t{2:.6f}'.format(name, size, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    for size in sizes:
+        run(size)
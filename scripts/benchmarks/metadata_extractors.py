@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Benchmark metadata extraction from many source files."""
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from nikola.metadata_extractors import (MetaPriority, check_conditions, default_metadata_extractors_by,
+                                        get_dispatcher, load_defaults)
+from nikola.post import get_meta
+
+SIZES = [10000]
+FORMATS = {
+    'nikola': '.. title: Post {0}\n.. slug: post-{0}\n.. date: 2017-07-01 00:00:00 UTC\n.. tags: foo, bar\n\nText {0}\n',
+    'yaml': '---\ntitle: Post {0}\nslug: post-{0}\ndate: 2017-07-01 00:00:00 UTC\ntags: foo, bar\n---\n\nText {0}\n',
+    'toml': '+++\ntitle = "Post {0}"\nslug = "post-{0}"\ndate = "2017-07-01 00:00:00 UTC"\ntags = "foo, bar"\n+++\n\nText {0}\n',
+}
+
+
+class FakeCompiler:
+    name = 'rest'
+    supports_metadata = False
+
+
+class FakePost:
+    """A post with just enough attributes for get_meta."""
+
+    compiler = FakeCompiler()
+    default_lang = 'en'
+
+    def __init__(self, source_path, config, metadata_extractors_by):
+        self.source_path = source_path
+        self.metadata_path = os.path.splitext(source_path)[0] + '.meta'
+        self.config = config
+        self.metadata_extractors_by = metadata_extractors_by
+
+
+def run(size, directory):
+    """Print the time needed to extract metadata from size files."""
+    metadata_extractors_by = default_metadata_extractors_by()
+    load_defaults(None, metadata_extractors_by)
+    config = {'TRANSLATIONS': {'en': './'}, 'DEFAULT_LANG': 'en'}
+    posts = []
+    formats = sorted(FORMATS.items())
+    for i in range(size):
+        name, template = formats[i % len(formats)]
+        path = os.path.join(directory, 'post-{0}-{1}.rst'.format(i, name))
+        with open(path, 'w', encoding='utf-8') as outf:
+            outf.write(template.format(i))
+        posts.append(FakePost(path, config, metadata_extractors_by))
+
+    texts = []
+    for post in posts:
+        with open(post.source_path, encoding='utf-8') as inf:
+            texts.append(inf.read())
+
+    # Extractor selection as done before the dispatch table existed
+    start = time.perf_counter()
+    for post, text in zip(posts, texts):
+        for priority in MetaPriority:
+            for extractor in metadata_extractors_by['priority'].get(priority, []):
+                if check_conditions(post, post.source_path, extractor.conditions, config, text):
+                    extractor.check_requirements()
+    print('check_conditions\t{0}\t{1:.6f}'.format(size, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for post, text in zip(posts, texts):
+        get_dispatcher(metadata_extractors_by, config).candidates(post, post.source_path, text)
+    print('dispatcher\t{0}\t{1:.6f}'.format(size, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    for post in posts:
+        get_meta(post, None)
+    print('get_meta\t{0}\t{1:.6f}'.format(size, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    for size in sizes:
+        directory = tempfile.mkdtemp()
+        try:
+            run(size, directory)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""Benchmark the CSS and JavaScript minifiers on the assets of the bundled themes."""
+
+import glob
+import os
+import sys
+import time
+
+from nikola.minifiers import minify_css, minify_js
+
+SIZES = [100]
+THEMES = os.path.join(os.path.dirname(__file__), '..', '..', 'nikola', 'data', 'themes')
+
+
+def load_assets(extension):
+    """Return the contents of the (non-symlinked) theme assets with extension."""
+    assets = []
+    for path in sorted(glob.glob(os.path.join(THEMES, '*', 'assets', '*', '*' + extension))):
+        if not os.path.islink(path):
+            with open(path, encoding='utf-8') as inf:
+                assets.append(inf.read())
+    return assets
+
+
+def run(size):
+    """Print the time needed to minify all theme assets size times, and the resulting sizes."""
+    for name, extension, function in (('minify_css', '.css', minify_css), ('minify_js', '.js', minify_js)):
+        assets = load_assets(extension)
+        start = time.perf_counter()
+        for _ in range(size):
+            minified = [function(asset) for asset in assets]
+        seconds = time.perf_counter() - start
+        before, after = sum(map(len, assets)), sum(map(len, minified))
+        print('{0}\t{1}\t{2:.6f}\t{3} -> {4} bytes, {5:.0f} KiB/s'.format(
+            name, size, seconds, before, after, before * size / 1024 / seconds))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    for size in sizes:
+        run(size)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Benchmark Nikola.render_template on the demo site with the default theme.
+
+Renders post lists (like tag and archive pages) of the demo site without
+writing files, and an empty template, which shows the per-page overhead of
+building the template context.
+"""
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import nikola.plugins.command.init
+from nikola import utils
+from nikola.nikola import Nikola
+
+SIZES = [2000]
+
+
+def load_site(target):
+    """Create the demo site in target and return a Nikola object for it."""
+    init_command = nikola.plugins.command.init.CommandInit()
+    init_command.copy_sample_site(target)
+    init_command.create_configuration(target)
+    with io.open(os.path.join(target, 'templates', 'empty.tmpl'), 'w', encoding='utf-8') as outf:
+        outf.write('')
+    os.chdir(target)
+    sys.path.insert(0, target)
+    import conf
+    config = conf.__dict__.copy()
+    del config['__builtins__']
+    site = Nikola(**config)
+    site.init_plugins()
+    site.scan_posts()
+    return site
+
+
+def run(size, site):
+    """Print the pages rendered per second for size pages."""
+    lang = site.config['DEFAULT_LANG']
+    utils.LocaleBorg().set_locale(lang)
+    contexts = []
+    for i in range(size):
+        contexts.append({'lang': lang, 'posts': site.timeline, 'title': 'Page {0}'.format(i),
+                         'permalink': '/page-{0}/'.format(i), 'pagekind': ['list', 'tag_page'],
+                         'description': 'Page {0}'.format(i)})
+
+    for template in ('empty.tmpl', 'list_post.tmpl'):
+        start = time.perf_counter()
+        for context in contexts:
+            site.render_template(template, None, context)
+        seconds = time.perf_counter() - start
+        print('{0}\t{1}\t{2:.6f}\t{3:.0f} pages/s'.format(template, size, seconds, size / seconds))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    directory = tempfile.mkdtemp()
+    try:
+        site = load_site(os.path.join(directory, 'site'))
+        for size in sizes:
+            run(size, site)
+    finally:
+        shutil.rmtree(directory)
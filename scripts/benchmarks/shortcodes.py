@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+"""Benchmark shortcode extraction and application on large documents."""
+
+import sys
+import timeit
+
+from nikola import shortcodes
+
+SIZES = [10, 1000, 10000]
+REGISTRY = {
+    'single': lambda *a, **kw: 'single',
+    'paired': lambda *a, **kw: kw['data'],
+}
+
+
+def make_document(count):
+    """Return a document containing count shortcodes."""
+    chunks = []
+    for i in range(count):
+        if i % 2:
+            chunks.append('<p>Text {0} {{{{% single arg{0} key="value {0}" %}}}}</p>\n'.format(i))
+        else:
+            chunks.append('<p>{{{{% paired %}}}}Body {0}{{{{% /paired %}}}}</p>\n'.format(i))
+    return ''.join(chunks)
+
+
+def run(size, number=3):
+    """Print the timings for a document with size shortcodes."""
+    data = make_document(size)
+
+    def extract():
+        shortcodes._parse_shortcodes.cache_clear()
+        shortcodes.extract_shortcodes(data)
+
+    def apply():
+        shortcodes._parse_shortcodes.cache_clear()
+        shortcodes.apply_shortcodes(data, REGISTRY)
+
+    def apply_cached():
+        shortcodes.apply_shortcodes(data, REGISTRY)
+
+    for name, func in (('extract', extract), ('apply', apply), ('apply_cached', apply_cached)):
+        seconds = min(timeit.repeat(func, number=1, repeat=number))
+        print('{0}\t{1}\t{2:.6f}'.format(name, size, seconds))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    for size in sizes:
+        run(size)
@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+"""Benchmark full builds of a synthetic site.
+
+Generate a site based on the demo site (``nikola init --demo``), with a
+configurable number of posts, languages, tags, galleries and shortcodes, and
+time a cold build, a no-op rebuild and a rebuild after editing a single post.
+Every build runs in its own process, so its peak memory use can be measured.
+
+Usage::
+
+    python scripts/benchmarks/site_build.py --posts 500 --languages 2 --output before.json
+    # change something...
+    python scripts/benchmarks/site_build.py --posts 500 --languages 2 --output after.json
+    python scripts/benchmarks/site_build.py --compare before.json after.json
+
+The generated site only depends on the options (and the demo site), so runs
+with the same options on different commits build the same site.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, ROOT)
+
+from mako.template import Template  # NOQA
+from pkg_resources import resource_filename  # NOQA
+
+from nikola.plugins.command.init import (CommandInit, SAMPLE_CONF,  # NOQA
+                                         format_default_translations_config, prepare_config)
+
+LANGUAGES = ['de', 'es', 'fr', 'it', 'pl', 'pt', 'ru', 'zh_cn']
+COMPILERS = {
+    'rest': ('rst', '.. {0}: {1}\n', '{0}\n\n', '.. TEASER_END\n\n'),
+    'markdown': ('md', '.. {0}: {1}\n', '{0}\n\n', '<!-- TEASER_END -->\n\n'),
+    'html': ('html', '.. {0}: {1}\n', '<p>{0}</p>\n\n', '<!-- TEASER_END -->\n\n'),
+}
+WORDS = ('lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor incididunt ut labore '
+         'et dolore magna aliqua enim ad minim veniam quis nostrud exercitation ullamco laboris nisi aliquip '
+         'ex ea commodo consequat duis aute irure in reprehenderit voluptate velit esse cillum').split()
+SCENARIOS = ('cold', 'noop', 'edit')
+
+
+def paragraph(rng, words=60):
+    """Return a paragraph of random words."""
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def write_post(path, compiler, meta, paragraphs, shortcodes):
+    """Write a post with metadata, paragraphs of text and shortcodes."""
+    _, meta_line, para, teaser = COMPILERS[compiler]
+    if compiler == 'rest':
+        header = ''.join(meta_line.format(key, value) for key, value in meta) + '\n'
+    else:
+        header = '<!--\n' + ''.join(meta_line.format(key, value) for key, value in meta) + '-->\n\n'
+    body = [para.format(paragraphs[0]), teaser]
+    body.extend(para.format(text) for text in paragraphs[1:])
+    for i in range(shortcodes):
+        body.append(para.format('{{{{% raw %}}}}<b>raw {0}</b>{{{{% /raw %}}}} {{{{% emoji slightly_smiling_face %}}}}'.format(i)))
+    with io.open(path, 'w', encoding='utf-8') as outf:
+        outf.write(header + ''.join(body))
+
+
+def generate_site(target, posts=100, languages=1, tags=20, galleries=1, shortcodes=2,
+                  compilers=('rest', 'markdown', 'html'), seed=0):
+    """Generate a synthetic site in target (which must not exist)."""
+    rng = random.Random(seed)
+    init_command = CommandInit()
+    init_command.copy_sample_site(target)
+
+    config = SAMPLE_CONF.copy()
+    additional_languages = LANGUAGES[:languages - 1]
+    config['TRANSLATIONS'] = format_default_translations_config(additional_languages)
+    config['COMMENT_SYSTEM'] = ''
+    config['COMMENT_SYSTEM_ID'] = ''
+    with io.open(os.path.join(target, 'conf.py'), 'w', encoding='utf-8') as outf:
+        outf.write(Template(filename=resource_filename('nikola', 'conf.py.in')).render(**prepare_config(config)))
+
+    tag_names = ['tag-{0}'.format(i) for i in range(tags)]
+    for i in range(posts):
+        compiler = compilers[i % len(compilers)]
+        extension = COMPILERS[compiler][0]
+        for lang in [None] + additional_languages:
+            meta = [
+                ('title', 'Post {0}{1}'.format(i, ' ({0})'.format(lang) if lang else '')),
+                ('slug', 'post-{0}'.format(i)),
+                ('date', '2019-{0:02d}-{1:02d} {2:02d}:00:00 UTC'.format(i % 12 + 1, i % 28 + 1, i % 24)),
+                ('tags', ', '.join(rng.sample(tag_names, min(3, tags)))),
+                ('category', 'category-{0}'.format(i % 5)),
+            ]
+            paragraphs = [paragraph(rng) for _ in range(5)]
+            name = 'post-{0}.{1}.{2}'.format(i, lang, extension) if lang else 'post-{0}.{1}'.format(i, extension)
+            write_post(os.path.join(target, 'posts', name), compiler, meta, paragraphs, shortcodes)
+
+    demo_gallery = os.path.join(target, 'galleries', 'demo')
+    if galleries == 0:
+        # The demo post links to the demo gallery
+        shutil.rmtree(demo_gallery)
+        os.unlink(os.path.join(target, 'posts', '1.rst'))
+    for i in range(1, galleries):
+        shutil.copytree(demo_gallery, os.path.join(target, 'galleries', 'demo-{0}'.format(i)))
+
+
+def build(site, env):
+    """Build site in a new process, return (seconds, peak memory in KiB, return code)."""
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-m', 'nikola', 'build'], cwd=site, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _, status, rusage = os.wait4(proc.pid, 0)
+    seconds = time.perf_counter() - start
+    proc.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+    # ru_maxrss is in bytes on macOS, in KiB elsewhere
+    max_rss = rusage.ru_maxrss // 1024 if sys.platform == 'darwin' else rusage.ru_maxrss
+    return seconds, max_rss, proc.returncode
+
+
+def edit_post(site):
+    """Change the text of a single post (the first generated one, if any)."""
+    names = sorted(os.listdir(os.path.join(site, 'posts')), key=lambda name: not name.startswith('post-0.'))
+    with io.open(os.path.join(site, 'posts', names[0]), 'a', encoding='utf-8') as outf:
+        outf.write('\n\nEdited.\n')
+
+
+def run(site, repeat):
+    """Run the build scenarios repeat times, return a list of results."""
+    env = dict(os.environ, PYTHONHASHSEED='0', PYTHONPATH=os.pathsep.join([ROOT, os.environ.get('PYTHONPATH', '')]))
+    results = []
+    for _ in range(repeat):
+        for name in ('output', 'cache'):
+            shutil.rmtree(os.path.join(site, name), ignore_errors=True)
+        for name in os.listdir(site):
+            if name.startswith('.doit.db'):
+                os.unlink(os.path.join(site, name))
+        for scenario in SCENARIOS:
+            if scenario == 'edit':
+                edit_post(site)
+            seconds, max_rss, returncode = build(site, env)
+            results.append({'scenario': scenario, 'seconds': seconds, 'max_rss_kib': max_rss,
+                            'returncode': returncode})
+    return results
+
+
+def git_commit():
+    """Return the current commit of the Nikola checkout, if any."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=ROOT,
+                                       stderr=subprocess.DEVNULL).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summarize(results):
+    """Return the median time and memory per scenario."""
+    summary = {}
+    for scenario in SCENARIOS:
+        runs = [result for result in results if result['scenario'] == scenario]
+        if runs:
+            summary[scenario] = {
+                'seconds': statistics.median(result['seconds'] for result in runs),
+                'max_rss_kib': statistics.median(result['max_rss_kib'] for result in runs),
+            }
+    return summary
+
+
+def compare(old_path, new_path):
+    """Print the median timings and memory of two result files side by side."""
+    with io.open(old_path, encoding='utf-8') as inf:
+        old = summarize(json.load(inf)['results'])
+    with io.open(new_path, encoding='utf-8') as inf:
+        new = summarize(json.load(inf)['results'])
+    print('scenario\told_s\tnew_s\tratio\told_kib\tnew_kib')
+    for scenario in SCENARIOS:
+        if scenario in old and scenario in new:
+            o, n = old[scenario], new[scenario]
+            print('{0}\t{1:.3f}\t{2:.3f}\t{3:.2f}\t{4:.0f}\t{5:.0f}'.format(
+                scenario, o['seconds'], n['seconds'], n['seconds'] / o['seconds'],
+                o['max_rss_kib'], n['max_rss_kib']))
+
+
+def main():
+    """Parse the arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--posts', type=int, default=100, help='number of posts (per language)')
+    parser.add_argument('--languages', type=int, default=1, help='number of languages, up to {0}'.format(
+        len(LANGUAGES) + 1))
+    parser.add_argument('--tags', type=int, default=20, help='number of distinct tags (3 per post)')
+    parser.add_argument('--galleries', type=int, default=1, help='number of copies of the demo gallery (0 also removes the demo post)')
+    parser.add_argument('--shortcodes', type=int, default=2, help='number of shortcode pairs per post')
+    parser.add_argument('--compilers', default='rest,markdown,html',
+                        help='comma-separated compilers to use in turn ({0})'.format(', '.join(sorted(COMPILERS))))
+    parser.add_argument('--seed', type=int, default=0, help='seed for the random text')
+    parser.add_argument('--repeat', type=int, default=1, help='number of times to run every scenario')
+    parser.add_argument('--site', help='generate the site into this folder and keep it (default: a temporary one)')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    params = {key: getattr(args, key) for key in ('posts', 'languages', 'tags', 'galleries', 'shortcodes', 'seed')}
+    params['compilers'] = args.compilers.split(',')
+    site = args.site or os.path.join(tempfile.mkdtemp(), 'site')
+    try:
+        generate_site(site, **params)
+        results = run(site, args.repeat)
+    finally:
+        if not args.site:
+            shutil.rmtree(os.path.dirname(site))
+
+    for result in results:
+        print('{0}\t{1}\t{2:.6f}'.format(result['scenario'], args.posts, result['seconds']))
+    if args.output:
+        with io.open(args.output, 'w', encoding='utf-8') as outf:
+            json.dump({
+                'commit': git_commit(),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'params': params,
+                'results': results,
+                'summary': summarize(results),
+            }, outf, indent=2, sort_keys=True)
+    if any(result['returncode'] for result in results):
+        sys.exit('Some builds failed.')
+
+
+if __name__ == '__main__':
+    main()
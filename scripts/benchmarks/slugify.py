@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+"""Benchmark slugifying tags, as done when scanning posts and building paths."""
+
+import random
+import sys
+import time
+
+from nikola import utils
+
+SIZES = [200000]
+WORDS = ['Zażółć', 'gęślą', 'jaźń', 'Python', 'Nikola', 'Ünïcödé', 'static', 'Sites', 'Привет', 'мир']
+
+
+def run(size, tags=2000):
+    """Print the time needed to slugify size tag occurrences of tags distinct tags."""
+    rng = random.Random(0)
+    names = [' '.join(rng.sample(WORDS, 3)) + ' {0}'.format(i) for i in range(tags)]
+    occurrences = [rng.choice(names) for _ in range(size)]
+
+    start = time.perf_counter()
+    for tag in occurrences:
+        utils._slugify.__wrapped__(tag, True)
+    print('uncached\t{0}\t{1:.6f}'.format(size, time.perf_counter() - start))
+
+    utils._slugify.cache_clear()
+    start = time.perf_counter()
+    for tag in occurrences:
+        utils.slugify(tag, 'en')
+    print('slugify\t{0}\t{1:.6f}'.format(size, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    for size in sizes:
+        run(size)
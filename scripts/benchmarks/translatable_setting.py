@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+"""Benchmark TranslatableSetting lookups, as done for every rendered page."""
+
+import sys
+import timeit
+
+from nikola.utils import LocaleBorg, TranslatableSetting
+
+SIZES = [100000]
+
+
+def run(size):
+    """Print the time needed for size lookups of each kind."""
+    LocaleBorg.initialize({}, 'en')
+    translations = {'en': '', 'de': './de', 'pl': './pl'}
+    translated = TranslatableSetting('BLOG_TITLE', {'en': 'Title', 'de': 'Titel'}, translations)
+    plain = TranslatableSetting('BLOG_EMAIL', 'joe@example.com', translations)
+
+    for name, stmt in [
+        ('call_lang', lambda: translated('de')),
+        ('call_current_lang', lambda: translated()),
+        ('call_untranslated', lambda: plain()),
+        ('string_method', lambda: translated.upper()),
+    ]:
+        print('{0}\t{1}\t{2:.6f}'.format(name, size, timeit.timeit(stmt, number=size)))
+
+
+if __name__ == '__main__':
+    sizes = [int(s) for s in sys.argv[1:]] or SIZES
+    for size in sizes:
+        run(size)
@@ -1,6 +1,8 @@
 import os
 import pytest
 
+from nikola.utils import set_highlight_cache
+
 
 @pytest.fixture(autouse=True)
 def ensure_chdir():
@@ -11,6 +13,13 @@ def ensure_chdir():
         os.chdir(old_dir)
 
 
+@pytest.fixture(autouse=True)
+def reset_highlight_cache():
+    """Do not leak the (global) highlight cache of a site into other tests."""
+    yield
+    set_highlight_cache(None)
+
+
 @pytest.fixture(scope="module")
 def test_dir():
     """
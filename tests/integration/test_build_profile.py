@@ -0,0 +1,40 @@
+"""Check that `nikola build --profile` writes a build profile."""
+
+import io
+import json
+import os
+
+import pytest
+
+from nikola import __main__
+
+from .helper import cd
+from .test_demo_build import prepare_demo_site
+
+
+def test_profile_report(build, target_dir):
+    profile_folder = os.path.join(target_dir, "cache", "profile")
+    with io.open(os.path.join(profile_folder, "build_profile.json"), encoding="utf-8") as inf:
+        report = json.load(inf)
+
+    assert report["executed"] > 0
+    assert report["generated"] >= report["executed"]
+
+    tasks = {task["basename"]: task for task in report["tasks"]}
+    assert tasks["render_posts"]["executed"] > 0
+    assert tasks["render_posts"]["wall"] > 0
+
+    spans = {span["name"] for span in report["spans"]}
+    assert {"scan_posts", "gen_tasks", "gen_tasks:render_posts", "render_template"} <= spans
+
+    with io.open(os.path.join(profile_folder, "build_profile.html"), encoding="utf-8") as inf:
+        assert "render_posts" in inf.read()
+
+
+@pytest.fixture(scope="module")
+def build(target_dir):
+    """Build the demo site with the profiler enabled."""
+    prepare_demo_site(target_dir)
+
+    with cd(target_dir):
+        __main__.main(["build", "--profile"])
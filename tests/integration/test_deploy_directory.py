@@ -0,0 +1,57 @@
+"""Check `nikola deploy` to DEPLOY_DIRECTORIES."""
+
+import io
+import os
+
+import pytest
+
+from nikola import __main__
+
+from .helper import append_config, cd
+from .test_demo_build import prepare_demo_site
+
+
+def tree(path):
+    files = {}
+    for root, dirs, names in os.walk(path):
+        for name in names:
+            with io.open(os.path.join(root, name), "rb") as inf:
+                files[os.path.relpath(os.path.join(root, name), path)] = inf.read()
+    return files
+
+
+def test_deploy_copies_output(deployed, output_dir, deploy_dir):
+    assert tree(deploy_dir) == tree(output_dir)
+
+
+def test_deploy_copies_changes_only(deployed, target_dir, output_dir, deploy_dir, capsys):
+    # A file changed on the server is not noticed, since the server is not read
+    with io.open(os.path.join(deploy_dir, "robots.txt"), "a", encoding="utf8") as outf:
+        outf.write("# changed on the server")
+    os.unlink(os.path.join(output_dir, "archive.html"))
+
+    with cd(target_dir):
+        capsys.readouterr()
+        assert __main__.main(["deploy", "--dry-run"]) is None
+        assert capsys.readouterr().out == "delete archive.html\n"
+        assert os.path.exists(os.path.join(deploy_dir, "archive.html"))
+
+        assert __main__.main(["deploy"]) is None
+    assert not os.path.exists(os.path.join(deploy_dir, "archive.html"))
+    assert "# changed on the server" in io.open(os.path.join(deploy_dir, "robots.txt"), encoding="utf8").read()
+
+
+@pytest.fixture(scope="module")
+def deploy_dir(target_dir):
+    return os.path.join(os.path.dirname(target_dir), "deployed")
+
+
+@pytest.fixture(scope="module")
+def deployed(target_dir, deploy_dir):
+    """Build the demo site and deploy it to a directory."""
+    prepare_demo_site(target_dir)
+    append_config(target_dir, "\nDEPLOY_DIRECTORIES = {{'default': {0!r}}}\n".format(deploy_dir))
+
+    with cd(target_dir):
+        __main__.main(["build"])
+        assert __main__.main(["deploy"]) is None
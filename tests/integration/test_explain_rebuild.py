@@ -0,0 +1,39 @@
+"""Check that `nikola explain-rebuild` names the setting which changed."""
+
+import pytest
+
+from nikola import __main__
+
+from .helper import append_config, cd, patch_config
+from .test_demo_build import prepare_demo_site
+
+
+def test_explain_rebuild_names_changed_setting(build, target_dir, capsys):
+    patch_config(target_dir, ('BLOG_TITLE = "Demo Site"', 'BLOG_TITLE = "Changed Site"'))
+    capsys.readouterr()
+    with cd(target_dir):
+        assert __main__.main(["explain-rebuild"]) == 0
+    output = capsys.readouterr().out
+
+    assert "_config_changed:nikola.nikola.Nikola.generic_renderer: blog_title" in output
+    assert "tasks out of date." in output
+    assert "Top invalidators:" in output
+
+
+def test_explain_rebuild_selected_tasks(build, target_dir, capsys):
+    capsys.readouterr()
+    with cd(target_dir):
+        assert __main__.main(["explain-rebuild", "render_posts"]) == 0
+    output = capsys.readouterr().out
+
+    assert output.strip().endswith("0 tasks out of date.")
+
+
+@pytest.fixture(scope="module")
+def build(target_dir):
+    """Build the demo site, recording the inputs of all tasks."""
+    prepare_demo_site(target_dir)
+    append_config(target_dir, "\nRECORD_REBUILD_CAUSES = True\n")
+
+    with cd(target_dir):
+        __main__.main(["build"])
@@ -0,0 +1,74 @@
+"""Check content-hashed bundles (HASH_BUNDLES) and their source maps."""
+
+import io
+import json
+import os
+
+import pytest
+
+from nikola import __main__
+
+from .helper import append_config, cd
+from .test_demo_build import prepare_demo_site
+from .test_empty_build import (  # NOQA
+    test_archive_exists,
+    test_avoid_double_slash_in_rss,
+    test_check_files,
+    test_check_links,
+    test_index_in_sitemap,
+)
+
+
+def read_manifest(output_dir):
+    with io.open(os.path.join(output_dir, "assets", "bundles.json"), encoding="utf8") as inf:
+        return json.load(inf)
+
+
+def test_hashed_bundles(build, output_dir):
+    manifest = read_manifest(output_dir)
+    hashed = manifest["assets/css/all-nocdn.css"]
+    assert hashed.startswith("assets/css/all-nocdn.") and hashed != "assets/css/all-nocdn.css"
+    for name, hashed in manifest.items():
+        assert os.path.isfile(os.path.join(output_dir, hashed))
+        assert not os.path.exists(os.path.join(output_dir, name))
+
+
+def test_pages_link_to_hashed_bundles(build, output_dir):
+    manifest = read_manifest(output_dir)
+    with io.open(os.path.join(output_dir, "index.html"), encoding="utf8") as inf:
+        index = inf.read()
+    assert 'href="{0}"'.format(manifest["assets/css/all-nocdn.css"]) in index
+    assert 'src="{0}"'.format(manifest["assets/js/all-nocdn.js"]) in index
+
+
+def test_source_maps(build, output_dir):
+    hashed = read_manifest(output_dir)["assets/css/all-nocdn.css"]
+    with io.open(os.path.join(output_dir, hashed), encoding="utf8") as inf:
+        assert inf.read().endswith("/*# sourceMappingURL={0}.map */\n".format(os.path.basename(hashed)))
+    with io.open(os.path.join(output_dir, hashed + ".map"), encoding="utf8") as inf:
+        source_map = json.load(inf)
+    assert "bootstrap.min.css" in source_map["sources"]
+
+
+def test_unchanged_bundles_keep_their_names(build, output_dir, target_dir):
+    manifest = read_manifest(output_dir)
+    with cd(target_dir):
+        __main__.main(["build"])
+    assert read_manifest(output_dir) == manifest
+
+
+@pytest.fixture(scope="module")
+def build(target_dir):
+    """Fill the site with demo content and build it."""
+    prepare_demo_site(target_dir)
+
+    append_config(
+        target_dir,
+        """
+HASH_BUNDLES = True
+BUNDLE_SOURCE_MAPS = True
+""",
+    )
+
+    with cd(target_dir):
+        __main__.main(["build"])
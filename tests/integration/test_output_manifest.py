@@ -0,0 +1,65 @@
+"""Check the output manifest written by `nikola build`."""
+
+import io
+import os
+
+import pytest
+
+from nikola import __main__
+from nikola.manifest import OutputManifest, file_hash
+
+from .helper import cd
+from .test_demo_build import prepare_demo_site
+
+
+@pytest.fixture
+def manifest(build, target_dir, output_dir):
+    return OutputManifest(output_dir, os.path.join(target_dir, "cache", "output_manifest.json"))
+
+
+def test_manifest_lists_output_files(manifest, output_dir):
+    files = set()
+    for root, dirs, names in os.walk(output_dir):
+        for name in names:
+            files.add(os.path.relpath(os.path.join(root, name), output_dir).replace(os.sep, "/"))
+    assert set(manifest) == files
+
+    entry = manifest.get("index.html")
+    assert entry["hash"] == file_hash(os.path.join(output_dir, "index.html"))
+    assert entry["size"] == os.path.getsize(os.path.join(output_dir, "index.html"))
+    assert entry["task"].startswith("render_")
+
+
+def test_rebuild_keeps_manifest(manifest, target_dir):
+    hashes = manifest.hashes()
+    with cd(target_dir):
+        __main__.main(["build"])
+    rebuilt = OutputManifest(manifest.output_folder, manifest._path)
+    changed, removed = rebuilt.diff(hashes)
+    assert removed == []
+    # Only feeds (which contain the build date) may change
+    assert all(path.endswith((".xml", ".atom")) for path in changed)
+
+
+def test_manifest_verify(build, target_dir, output_dir):
+    path = os.path.join(output_dir, "archive.html")
+    with io.open(path, encoding="utf8") as inf:
+        original = inf.read()
+    with cd(target_dir):
+        assert __main__.main(["manifest", "--verify"]) is None
+        try:
+            with io.open(path, "a", encoding="utf8") as outf:
+                outf.write("tampered")
+            assert __main__.main(["manifest", "--verify"]) == 1
+        finally:
+            with io.open(path, "w", encoding="utf8") as outf:
+                outf.write(original)
+
+
+@pytest.fixture(scope="module")
+def build(target_dir):
+    """Fill the site with demo content and build it."""
+    prepare_demo_site(target_dir)
+
+    with cd(target_dir):
+        __main__.main(["build"])
@@ -0,0 +1,75 @@
+"""Check that post lists are only rebuilt when what they show about a post changes."""
+
+import io
+import os
+
+import pytest
+
+from nikola import __main__
+
+from .helper import append_config, cd
+from .test_demo_build import prepare_demo_site
+
+OLD_MTIME = 1000000000
+
+
+def test_text_change_keeps_post_lists(build, target_dir, output_dir):
+    tag_page = os.path.join(output_dir, "categories", "python", "index.html")
+    archive = os.path.join(output_dir, "archive.html")
+    index = os.path.join(output_dir, "index.html")
+    for path in (tag_page, archive, index):
+        os.utime(path, (OLD_MTIME, OLD_MTIME))
+
+    with io.open(os.path.join(target_dir, "posts", "1.rst"), "a", encoding="utf8") as outf:
+        outf.write("\nSome more text.\n")
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    assert os.stat(tag_page).st_mtime == OLD_MTIME
+    assert os.stat(archive).st_mtime == OLD_MTIME
+    # The index shows the full text of posts
+    assert os.stat(index).st_mtime != OLD_MTIME
+
+
+def test_title_change_rebuilds_post_lists(build, target_dir, output_dir):
+    tag_page = os.path.join(output_dir, "categories", "python", "index.html")
+    os.utime(tag_page, (OLD_MTIME, OLD_MTIME))
+
+    post_path = os.path.join(target_dir, "posts", "1.rst")
+    with io.open(post_path, "r", encoding="utf8") as inf:
+        data = inf.read()
+    with io.open(post_path, "w", encoding="utf8") as outf:
+        outf.write(data.replace(".. title: Welcome to Nikola", ".. title: Welcome Back"))
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    assert os.stat(tag_page).st_mtime != OLD_MTIME
+    with io.open(tag_page, "r", encoding="utf8") as inf:
+        assert "Welcome Back" in inf.read()
+
+
+def test_teaser_index_keeps_when_rest_of_post_changes(build, target_dir, output_dir):
+    append_config(target_dir, "\nINDEX_TEASERS = True\n")
+    post_path = os.path.join(target_dir, "posts", "1.rst")
+    with io.open(post_path, "a", encoding="utf8") as outf:
+        outf.write("\nThe teaser.\n\n.. TEASER_END\n\nThe rest.\n")
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    index = os.path.join(output_dir, "index.html")
+    os.utime(index, (OLD_MTIME, OLD_MTIME))
+    with io.open(post_path, "a", encoding="utf8") as outf:
+        outf.write("\nMore of the rest.\n")
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    assert os.stat(index).st_mtime == OLD_MTIME
+
+
+@pytest.fixture(scope="module")
+def build(target_dir):
+    """Fill the site with demo content and build it."""
+    prepare_demo_site(target_dir)
+
+    with cd(target_dir):
+        __main__.main(["build"])
@@ -72,6 +72,24 @@ def test_relative_redirection(build, output_dir):
     assert rel_source_content == "relative"
 
 
+def test_adding_redirection_keeps_others(build, target_dir, output_dir):
+    """Adding a redirection must not rewrite the other redirect pages."""
+    ext_link = os.path.join(output_dir, "external.html")
+    os.utime(ext_link, (1000000000, 1000000000))
+
+    append_config(
+        target_dir,
+        """
+REDIRECTIONS.append(("new.html", "/posts/absolute.html"))
+""",
+    )
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    assert os.path.exists(os.path.join(output_dir, "new.html"))
+    assert os.stat(ext_link).st_mtime == 1000000000
+
+
 @pytest.fixture(scope="module")
 def build(target_dir):
     """Fill the site with demo content and build it."""
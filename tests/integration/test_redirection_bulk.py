@@ -0,0 +1,142 @@
+"""Check REDIRECTIONS written in bulk, and server-side redirect maps."""
+
+import io
+import os
+
+import pytest
+
+from nikola import __main__
+
+from .helper import append_config, cd
+from .test_demo_build import prepare_demo_site
+from .test_empty_build import (  # NOQA
+    test_archive_exists,
+    test_avoid_double_slash_in_rss,
+    test_check_files,
+    test_check_links,
+    test_index_in_sitemap,
+)
+
+
+def test_redirect_pages(build, output_dir):
+    with io.open(os.path.join(output_dir, "external.html"), encoding="utf8") as inf:
+        assert '<meta http-equiv="refresh" content="0; url=http://www.example.com/">' in inf.read()
+    with io.open(os.path.join(output_dir, "old", "index.html"), encoding="utf8") as inf:
+        assert '<meta http-equiv="refresh" content="0; url=/posts/">' in inf.read()
+
+
+def test_nginx_map(build, target_dir):
+    with io.open(os.path.join(target_dir, "redirects.map"), encoding="utf8") as inf:
+        lines = inf.read().splitlines()
+
+    assert lines == [
+        "/foo/relative.html /posts/;",
+        "/external.html http://www.example.com/;",
+        "/old/ /posts/;",
+        "/old/index.html /posts/;",
+    ]
+
+
+def test_htaccess(build, output_dir):
+    with io.open(os.path.join(output_dir, ".htaccess"), encoding="utf8") as inf:
+        lines = inf.read().splitlines()
+
+    assert lines[0] == "RedirectMatch 301 ^/foo/relative\\.html$ /posts/"
+    assert lines[1] == "RedirectMatch 301 ^/external\\.html$ http://www.example.com/"
+
+
+def test_bulk_only_writes_changed_pages(build, target_dir, output_dir):
+    ext_link = os.path.join(output_dir, "external.html")
+    os.utime(ext_link, (1000000000, 1000000000))
+
+    append_config(
+        target_dir,
+        """
+REDIRECTIONS.append(("new.html", "/posts/"))
+REDIRECTIONS[0] = ("foo/relative.html", "../index.html")
+""",
+    )
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    assert os.path.exists(os.path.join(output_dir, "new.html"))
+    assert os.stat(ext_link).st_mtime == 1000000000
+    with io.open(os.path.join(output_dir, "foo", "relative.html"), encoding="utf8") as inf:
+        assert "url=../index.html" in inf.read()
+    with io.open(os.path.join(target_dir, "redirects.map"), encoding="utf8") as inf:
+        assert "/new.html /posts/;\n" in inf.read()
+
+
+def test_bulk_removes_deleted_pages(build, target_dir, output_dir):
+    append_config(
+        target_dir,
+        """
+REDIRECTIONS = [r for r in REDIRECTIONS if r[0] != "external.html"]
+""",
+    )
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    assert not os.path.exists(os.path.join(output_dir, "external.html"))
+    assert os.path.exists(os.path.join(output_dir, "old", "index.html"))
+    with io.open(os.path.join(target_dir, "redirects.map"), encoding="utf8") as inf:
+        assert "/external.html" not in inf.read()
+
+
+def test_bulk_keeps_pages_replacing_redirects(build, target_dir, output_dir):
+    os.makedirs(os.path.join(target_dir, "files"), exist_ok=True)
+    with io.open(os.path.join(target_dir, "files", "new.html"), "w", encoding="utf8") as outf:
+        outf.write("A real page")
+    append_config(
+        target_dir,
+        """
+REDIRECTIONS = [r for r in REDIRECTIONS if r[0] != "new.html"]
+""",
+    )
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    with io.open(os.path.join(output_dir, "new.html"), encoding="utf8") as inf:
+        assert inf.read() == "A real page"
+
+
+def test_bulk_keeps_modified_pages(build, target_dir, output_dir):
+    page = os.path.join(output_dir, "old", "index.html")
+    with io.open(page, "w", encoding="utf8") as outf:
+        outf.write("Not a redirect anymore")
+    append_config(
+        target_dir,
+        """
+REDIRECTIONS = [r for r in REDIRECTIONS if r[0] != "old/"]
+""",
+    )
+    with cd(target_dir):
+        __main__.main(["build"])
+
+    with io.open(page, encoding="utf8") as inf:
+        assert inf.read() == "Not a redirect anymore"
+
+
+@pytest.fixture(scope="module")
+def build(target_dir):
+    """Fill the site with demo content and build it."""
+    prepare_demo_site(target_dir)
+
+    append_config(
+        target_dir,
+        """
+REDIRECTIONS = [
+    ("foo/relative.html", "../posts/"),
+    ("external.html", "http://www.example.com/"),
+    ("old/", "/posts/"),
+]
+REDIRECTIONS_BULK = True
+REDIRECTIONS_SERVER_MAPS = {
+    'nginx': 'redirects.map',
+    'htaccess': 'output/.htaccess',
+}
+""",
+    )
+
+    with cd(target_dir):
+        __main__.main(["build"])
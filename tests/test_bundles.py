@@ -0,0 +1,78 @@
+"""Test building bundles."""
+
+import json
+import os
+
+import pytest
+
+from nikola.plugins.task import bundles
+
+B64 = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/"
+
+
+def decode_vlq(segment):
+    values, value, shift = [], 0, 0
+    for char in segment:
+        digit = B64.index(char)
+        value += (digit & 31) << shift
+        if digit & 32:
+            shift += 5
+        else:
+            values.append(-(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    return values
+
+
+def write(tmpdir, name, content):
+    path = tmpdir.join(name)
+    path.write_binary(content)
+    return str(path)
+
+
+@pytest.mark.parametrize("value, expected", [(0, "A"), (1, "C"), (-1, "D"), (15, "e"), (16, "gB"), (-6, "N"), (1000, "w+B")])
+def test_vlq(value, expected):
+    assert bundles._vlq(value) == expected
+    assert decode_vlq(expected) == [value]
+
+
+def test_hashed_name():
+    assert bundles.hashed_name(os.path.join("assets", "css", "all.css"), "0123456789ab") == "assets/css/all.0123456789ab.css"
+
+
+def test_build_bundle(tmpdir):
+    inputs = [write(tmpdir, "a.css", b"a {}\nb {}"), write(tmpdir, "b.css", b"c {}\n")]
+    output = str(tmpdir.join("all.css"))
+
+    bundles.build_bundle(output, inputs + [str(tmpdir.join("missing.css"))])
+
+    assert tmpdir.join("all.css").read_binary() == b"a {}\nb {}\nc {}\n\n"
+    assert not tmpdir.join("all.css.map").exists()
+
+
+def test_build_bundle_source_map(tmpdir):
+    inputs = [write(tmpdir, "a.js", b"var a;\nvar b;"), write(tmpdir, "b.js", b"var c;\n"), write(tmpdir, "c.js", b"var d;")]
+    output = str(tmpdir.join("all.js"))
+
+    bundles.build_bundle(output, inputs, True)
+
+    lines = tmpdir.join("all.js").read_text("utf-8").split("\n")
+    assert lines[-2] == "//# sourceMappingURL=all.js.map"
+    source_map = json.loads(tmpdir.join("all.js.map").read_text("utf-8"))
+    assert source_map["file"] == "all.js"
+    assert source_map["sources"] == ["a.js", "b.js", "c.js"]
+    sources = [open(path).read().split("\n") for path in inputs]
+    source = line = 0
+    mapped = 0
+    for generated, segment in enumerate(source_map["mappings"].split(";")):
+        if segment:
+            column, source_delta, line_delta, source_column = decode_vlq(segment)
+            source += source_delta
+            line += line_delta
+            assert sources[source][line] == lines[generated]
+            mapped += 1
+    assert mapped == 4
+
+
+def test_get_filters():
+    assert bundles.get_filters({(".css", ".js"): ["filters.jsminify"]}, ".js") == ["filters.jsminify"]
+    assert bundles.get_filters({".css": ["filters.cssminify"]}, ".js") == []
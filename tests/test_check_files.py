@@ -0,0 +1,102 @@
+"""Test the target list and output listing used by `nikola check -f` and `nikola orphans`."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from nikola.plugins.command.check import real_scan_files
+from nikola.state import DirectoryListingCache, TargetList
+
+
+def task(targets, file_dep=()):
+    return SimpleNamespace(targets=list(targets), file_dep=list(file_dep))
+
+
+def write(path, content="x"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as outf:
+        outf.write(content)
+
+
+def make_old(*paths):
+    for path in paths:
+        os.utime(path, (0, 0))
+
+
+def test_target_list_roundtrip(tmpdir):
+    targets = TargetList(str(tmpdir.join("cache", "targets.json")))
+    assert targets.read() is None
+
+    targets.write([task(["output/a.html"], ["posts/a.rst"]), task(["output/b.css", "output/c.css"], ["b.css"])])
+
+    files, deps = targets.read()
+    assert files == ["output/a.html", "output/b.css", "output/c.css"]
+    assert deps == {"output/a.html": ["posts/a.rst"], "output/b.css": ["b.css"], "output/c.css": ["b.css"]}
+
+
+def test_target_list_is_stale_after_configuration_changes(tmpdir):
+    conf = tmpdir.join("conf.py")
+    conf.write("")
+    targets = TargetList(str(tmpdir.join("targets.json")))
+    targets.write([task(["output/a.html"])])
+    make_old(str(tmpdir.join("targets.json")))
+
+    assert targets.read() is not None
+    assert targets.read(newer_than=[str(conf)]) is None
+
+
+def test_listing_cache_reuses_unchanged_directories(tmpdir, monkeypatch):
+    top = str(tmpdir.join("output"))
+    write(os.path.join(top, "a.html"))
+    write(os.path.join(top, "sub", "b.html"))
+    make_old(top, os.path.join(top, "sub"))
+    cache_path = str(tmpdir.join("listing.json"))
+
+    expected = sorted([os.path.join(top, "a.html"), os.path.join(top, "sub", "b.html")])
+    assert sorted(DirectoryListingCache(cache_path).files(top)) == expected
+
+    listed = []
+    scandir = os.scandir
+
+    def counting_scandir(path):
+        listed.append(path)
+        return scandir(path)
+
+    monkeypatch.setattr(os, "scandir", counting_scandir)
+    assert sorted(DirectoryListingCache(cache_path).files(top)) == expected
+    assert listed == []
+
+    # Adding a file changes the modification time of its directory
+    write(os.path.join(top, "sub", "c.html"))
+    assert sorted(DirectoryListingCache(cache_path).files(top)) == expected + [os.path.join(top, "sub", "c.html")]
+    assert listed == [os.path.join(top, "sub")]
+
+
+def test_recently_modified_directories_are_not_cached(tmpdir):
+    top = str(tmpdir.join("output"))
+    write(os.path.join(top, "a.html"))
+    cache = DirectoryListingCache(str(tmpdir.join("listing.json")))
+    cache.files(top)
+    assert DirectoryListingCache(str(tmpdir.join("listing.json")))._listings == {}
+
+
+@pytest.fixture
+def site(tmpdir):
+    tmpdir.chdir()
+    write("output/a.html")
+    write("output/orphan.html")
+    targets = TargetList(str(tmpdir.join("cache", "targets.json")))
+    targets.write([task(["output/a.html", "output/missing.html"], ["posts/a.rst"])])
+    return SimpleNamespace(
+        config={"OUTPUT_FOLDER": "output", "CACHE_FOLDER": "cache"},
+        configuration_filename="conf.py",
+        target_list=targets,
+        gen_tasks=pytest.fail,
+    )
+
+
+def test_scan_files_uses_target_list(site):
+    only_on_output, only_on_input = real_scan_files(site)
+    assert only_on_output == [os.path.join("output", "orphan.html")]
+    assert only_on_input == ["output/missing.html"]
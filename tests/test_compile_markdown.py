@@ -46,6 +46,12 @@ def test_compiling_markdown(
     assert output.strip() == expected_output.strip()
 
 
+def test_compiling_markdown_unlabelled_code(compiler, input_path, output_path):
+    # The language of code blocks without one is guessed
+    output = markdown_compile(compiler, input_path, output_path, "Code:\n\n    #!/bin/bash\n    echo hello\n")
+    assert '<span class="nb">echo</span>' in output
+
+
 @pytest.fixture(scope="module")
 def site():
     return FakeSite()
@@ -0,0 +1,49 @@
+"""Test the delta deployment to DEPLOY_DIRECTORIES."""
+
+import os
+import stat
+
+from nikola.plugins.command.deploy import copy_atomic, directory_hashes, plan_deploy, remove_deployed
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as outf:
+        outf.write(content)
+
+
+def test_plan_deploy():
+    hashes = {"index.html": "1", "a.css": "2", "b/index.html": "3", "c.png": "4"}
+    deployed = {"index.html": "0", "a.css": "2", "b/index.html": "0", "old.html": "5"}
+
+    upload, delete = plan_deploy(hashes, deployed)
+
+    assert upload == ["c.png", "b/index.html", "index.html"]
+    assert delete == ["old.html"]
+
+
+def test_copy_atomic(tmpdir):
+    source = str(tmpdir.join("output", "a.html"))
+    write(source, "new")
+    os.chmod(source, 0o644)
+    destination = str(tmpdir.join("deployed", "sub", "a.html"))
+
+    copy_atomic(source, destination)
+    write(source, "newer")
+    copy_atomic(source, destination)
+
+    with open(destination, encoding="utf-8") as inf:
+        assert inf.read() == "newer"
+    assert stat.S_IMODE(os.stat(destination).st_mode) == 0o644
+    assert os.listdir(os.path.dirname(destination)) == ["a.html"]
+
+
+def test_remove_deployed(tmpdir):
+    target = str(tmpdir.join("deployed"))
+    write(os.path.join(target, "a", "b", "c.html"), "c")
+    write(os.path.join(target, "a", "d.html"), "d")
+
+    remove_deployed(target, "a/b/c.html")
+    assert directory_hashes(target).keys() == {"a/d.html"}
+    remove_deployed(target, "a/d.html")
+    assert os.listdir(target) == []
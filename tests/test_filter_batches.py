@@ -0,0 +1,197 @@
+"""Test batched filters."""
+
+import gzip
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from nikola import filters, utils
+from nikola.plugins.task.filter_batches import FilterBatches
+from nikola.plugins.task.gzip import GzipFiles
+from nikola.state import FilterCache
+
+# Uppercases the files given as arguments, fails on files containing "fail"
+TOOL = """
+import sys
+status = 0
+for name in sys.argv[1:]:
+    with open(name) as inf:
+        data = inf.read()
+    if "fail" in data:
+        print("cannot process", name)
+        status = 2
+        continue
+    with open(name, "w") as outf:
+        outf.write(data.upper())
+    with open(name + ".calls", "a") as outf:
+        outf.write(str(len(sys.argv) - 1) + "\\n")
+sys.exit(status)
+"""
+
+
+@pytest.fixture
+def tool(tmpdir):
+    path = tmpdir.join("tool.py")
+    path.write_text(TOOL, "utf-8")
+    return '"{0}" "{1}"'.format(sys.executable, path)
+
+
+@pytest.fixture
+def upper(tool):
+    @filters._batchable("")
+    def upper(infile, executable=tool):
+        return filters.runinplace(executable + " %1", infile)
+
+    return upper
+
+
+def write_files(tmpdir, contents):
+    paths = []
+    for i, content in enumerate(contents):
+        path = tmpdir.join("{0}.txt".format(i))
+        path.write_text(content, "utf-8")
+        paths.append(str(path))
+    return paths
+
+
+def read(path):
+    with open(path, encoding="utf-8") as inf:
+        return inf.read()
+
+
+def test_runbatch_runs_tool_once_per_chunk(tmpdir, tool):
+    paths = write_files(tmpdir, ["a", "b", "c", "d", "e"])
+
+    assert filters.runbatch(tool, paths, chunk_size=2) == []
+
+    assert [read(path) for path in paths] == ["A", "B", "C", "D", "E"]
+    assert [read(path + ".calls") for path in paths] == ["2\n", "2\n", "2\n", "2\n", "1\n"]
+
+
+def test_runbatch_reports_failed_files(tmpdir, tool):
+    paths = write_files(tmpdir, ["a", "fail", "c"])
+
+    failed = filters.runbatch(tool, paths, chunk_size=3)
+
+    assert [(path, output.strip()) for path, output in failed] == [(paths[1], "cannot process " + paths[1])]
+    assert read(paths[0]) == "A"
+    assert read(paths[2]) == "C"
+
+
+def test_batched_filter_uses_cache(tmpdir, upper):
+    cache = FilterCache(str(tmpdir.join("cache")), 1024 * 1024)
+    batch = filters.BatchedFilter(upper, cache=cache)
+    first = write_files(tmpdir.mkdir("first"), ["a", "b"])
+    second = write_files(tmpdir.mkdir("second"), ["a", "b", "fail"])
+
+    assert batch.run(first) == []
+    assert batch.run(second) == [second[2]]
+
+    assert [read(path) for path in second] == ["A", "B", "fail"]
+    assert (cache.hits, cache.misses) == (2, 3)
+
+
+def test_apply_filters_adds_targets_to_batch(upper):
+    batch = filters.BatchedFilter(upper)
+    task = utils.apply_filters({"targets": ["output/a.txt"], "actions": []}, {".txt": [batch]})
+    assert task["actions"] == []
+    assert batch.targets == {"output/a.txt"}
+
+    # Once the batch task is generated, files are filtered one by one
+    batch.closed = True
+    task = utils.apply_filters({"targets": ["output/b.txt"], "actions": []}, {".txt": [batch]})
+    assert len(task["actions"]) == 1
+    assert batch.targets == {"output/a.txt"}
+
+
+def test_batched_filter_repr_matches_filter(upper):
+    assert repr(filters.BatchedFilter(upper)) == repr(upper)
+
+
+def test_configured_filters_are_batched(tmpdir):
+    from nikola.nikola import Nikola
+
+    site = Nikola(
+        CACHE_FOLDER=str(tmpdir.join("cache")),
+        FILTERS={
+            ".png": ["filters.optipng"],
+            ".PNG": ["filters.optipng"],
+            ".html": ["filters.typogrify"],
+        },
+        BATCH_FILTERS=True,
+        OPTIPNG_EXECUTABLE="/opt/optipng",
+    )
+    site.init_plugins()
+
+    batch = site.config["FILTERS"][".png"][0]
+    assert isinstance(batch, filters.BatchedFilter)
+    assert site.config["FILTERS"][".PNG"][0] is batch
+    assert batch.command == ["/opt/optipng", "-preserve", "-o2", "-quiet"]
+    assert not isinstance(site.config["FILTERS"][".html"][0], filters.BatchedFilter)
+
+
+def test_batched_targets_are_gzipped_after_filtering(tmpdir, upper):
+    batch = filters.BatchedFilter(upper)
+    paths = write_files(tmpdir.mkdir("output"), ["a", "b"])
+    batch.add(paths[0])
+    site = SimpleNamespace(
+        config={
+            "GZIP_FILES": True,
+            "GZIP_EXTENSIONS": (".txt",),
+            "GZIP_COMMAND": None,
+            "OUTPUT_FOLDER": str(tmpdir.join("output")),
+            "CACHE_FOLDER": str(tmpdir.join("cache")),
+        },
+        batched_filters={"upper": batch},
+    )
+
+    # The gzip task skips the batched target
+    gzip_files = GzipFiles()
+    gzip_files.site = site
+    (task,) = gzip_files.process({"name": "render:a", "targets": paths}, "render")
+    assert task["targets"] == [paths[1] + ".gz"]
+
+    # The filter_batches task gzips it once filtered
+    filter_batches = FilterBatches()
+    filter_batches.site = site
+    batch_task = list(filter_batches.gen_tasks())[1]
+    assert batch_task["targets"] == [paths[0] + ".gz"]
+    function, args = batch_task["actions"][0]
+    assert function(*args, changed=[])
+    with gzip.open(paths[0] + ".gz", "rt") as inf:
+        assert inf.read() == "A"
+
+
+def test_changed_command_refilters_all_targets(tmpdir, tool):
+    paths = write_files(tmpdir.mkdir("output"), ["a", "b"])
+    site = SimpleNamespace(
+        config={"GZIP_FILES": False, "GZIP_COMMAND": None, "CACHE_FOLDER": str(tmpdir.join("cache"))},
+        batched_filters={},
+    )
+    filter_batches = FilterBatches()
+    filter_batches.site = site
+
+    def run(executable, changed):
+        @filters._batchable("")
+        def upper(infile, executable=executable):
+            return filters.runinplace(executable + " %1", infile)
+
+        batch = filters.BatchedFilter(upper)
+        for path in paths:
+            batch.add(path)
+        site.batched_filters = {"upper": batch}
+        batch_task = list(filter_batches.gen_tasks())[1]
+        function, args = batch_task["actions"][0]
+        assert function(*args, changed=changed)
+
+    run(tool, [])
+    assert [read(path + ".calls") for path in paths] == ["2\n", "2\n"]
+    run(tool, [paths[0]])
+    assert [read(path + ".calls") for path in paths] == ["2\n1\n", "2\n"]
+
+    # A new command runs on all files, even if only some of them changed
+    new_tool = tmpdir.join("new_tool.py")
+    tmpdir.join("tool.py").copy(new_tool)
+    run('"{0}" "{1}"'.format(sys.executable, new_tool), [paths[0]])
+    assert [read(path + ".calls") for path in paths] == ["2\n1\n2\n", "2\n2\n"]
@@ -0,0 +1,136 @@
+"""Test the filter cache."""
+
+import functools
+import os
+import sys
+
+import pytest
+
+from nikola import filters
+from nikola.state import CachedFilter, FilterCache
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return FilterCache(str(tmpdir.join("cache")), 1024 * 1024)
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def upper(calls):
+    @filters.apply_to_text_file
+    def upper(data, suffix=""):
+        calls.append(data)
+        return data.upper() + suffix
+
+    return upper
+
+
+def write(tmpdir, name, content):
+    path = tmpdir.join(name)
+    path.write_text(content, "utf-8")
+    return str(path)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as inf:
+        return inf.read()
+
+
+def test_identical_input_is_filtered_once(tmpdir, cache, calls, upper):
+    cached = cache.wrap(upper)
+    first = write(tmpdir, "first.html", "hello")
+    second = write(tmpdir, "second.html", "hello")
+
+    cached(first)
+    cached(second)
+
+    assert calls == ["hello"]
+    assert read(first) == read(second) == "HELLO"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_different_input_is_filtered(tmpdir, cache, calls, upper):
+    cached = cache.wrap(upper)
+    cached(write(tmpdir, "first.html", "hello"))
+    cached(write(tmpdir, "second.html", "world"))
+
+    assert calls == ["hello", "world"]
+
+
+def test_arguments_are_part_of_the_key(tmpdir, cache, calls, upper):
+    cache.wrap(functools.partial(upper, suffix="!"))(write(tmpdir, "first.html", "hello"))
+    path = write(tmpdir, "second.html", "hello")
+    cache.wrap(functools.partial(upper, suffix="?"))(path)
+
+    assert len(calls) == 2
+    assert read(path) == "HELLO?"
+
+
+def test_command_filter(tmpdir, cache):
+    command = '"{0}" -c "import sys; f = open(sys.argv[1], \'a\'); f.write(\'!\')" %s'.format(sys.executable)
+    cached = cache.wrap(command)
+    first = write(tmpdir, "first.txt", "hello")
+    second = write(tmpdir, "second.txt", "hello")
+
+    cached(first)
+    cached(second)
+
+    assert read(first) == read(second) == "hello!"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_repr_matches_filter(cache, upper):
+    # Tasks depend on the repr of their filters
+    assert repr(cache.wrap("optipng %s")) == "optipng %s"
+    assert repr(cache.wrap(upper)) == repr(upper)
+
+
+def test_prune_removes_least_recently_used(tmpdir, calls, upper):
+    cache = FilterCache(str(tmpdir.join("cache")), 10)
+    cached = cache.wrap(upper)
+    for i, content in enumerate(("aaaaaa", "bbbbbb", "cccccc")):
+        cached(write(tmpdir, "{0}.html".format(i), content))
+        # Make sure the entries have different modification times
+        entry = cache._entry_path(cache.key(cached.identity, content.encode("utf-8")))
+        os.utime(entry, (i, i))
+
+    assert cache.prune() == 2
+
+    del calls[:]
+    cached(write(tmpdir, "again.html", "cccccc"))
+    cached(write(tmpdir, "again.html", "aaaaaa"))
+    assert calls == ["aaaaaa"]
+
+
+def test_builtin_filters_are_cacheable():
+    assert filters.optipng.nikola_filter_cacheable
+    assert filters.typogrify.nikola_filter_cacheable
+    assert not hasattr(filters.add_header_permalinks, "nikola_filter_cacheable")
+    assert not hasattr(filters.html_tidy_withconfig, "nikola_filter_cacheable")
+
+
+def test_configured_filters_are_wrapped(tmpdir):
+    from nikola.nikola import Nikola
+
+    site = Nikola(
+        CACHE_FOLDER=str(tmpdir.join("cache")),
+        FILTERS={
+            ".png": ["filters.optipng", "pngcrush %s"],
+            ".html": ["filters.add_header_permalinks", "sed -i s/a/b/ %s"],
+        },
+        CACHEABLE_FILTERS=["sed -i s/a/b/ %s"],
+    )
+    site.init_plugins()
+
+    png, crush = site.config["FILTERS"][".png"]
+    assert isinstance(png, CachedFilter)
+    assert png.filter is filters.optipng
+    assert crush == "pngcrush %s"
+    permalinks, sed = site.config["FILTERS"][".html"]
+    assert not isinstance(permalinks, CachedFilter)
+    assert isinstance(sed, CachedFilter)
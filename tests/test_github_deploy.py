@@ -0,0 +1,104 @@
+"""Test the incremental github_deploy, against a local bare repository."""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from nikola.manifest import OutputManifest
+from nikola.plugins.command.github_deploy import incremental_commit
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+def git(*args):
+    return subprocess.check_output(("git",) + args).decode("utf-8")
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as outf:
+        outf.write(content)
+
+
+def tree(commit):
+    return {
+        path: git("cat-file", "blob", "{0}:{1}".format(commit, path))
+        for path in git("ls-tree", "-r", "--name-only", commit).splitlines()
+    }
+
+
+@pytest.fixture
+def site(tmpdir, monkeypatch):
+    for name in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv("GIT_{0}_NAME".format(name), "Nikola")
+        monkeypatch.setenv("GIT_{0}_EMAIL".format(name), "nikola@example.com")
+    tmpdir.join("site").mkdir().chdir()
+    git("init", "-q")
+    git("init", "-q", "--bare", str(tmpdir.join("remote.git")))
+    git("remote", "add", "origin", str(tmpdir.join("remote.git")))
+    return tmpdir.join("site")
+
+
+@pytest.fixture
+def manifest(site):
+    return OutputManifest("output", os.path.join("cache", "output_manifest.json"))
+
+
+def build(manifest, files):
+    for path, content in files.items():
+        write(os.path.join("output", path), content)
+        manifest.record(os.path.join("output", path), "render")
+    for path in list(manifest):
+        if path not in files:
+            os.unlink(os.path.join("output", path))
+    manifest.refresh()
+
+
+def deploy(manifest, message="deploy"):
+    return incremental_commit(manifest, "gh-pages", message, os.path.join("cache", "github_deploy.json"))
+
+
+def test_incremental_commits(site, manifest):
+    build(manifest, {"index.html": "index", "a/b.css": "css", "c.png": "png"})
+    first = deploy(manifest)
+    assert tree(first) == {".nojekyll": "", "index.html": "index", "a/b.css": "css", "c.png": "png"}
+    assert git("rev-parse", "gh-pages").strip() == first
+    # The working tree and index of the source repository are not touched
+    assert git("status", "--porcelain", "--untracked-files=no") == ""
+
+    build(manifest, {"index.html": "new index", "a/b.css": "css", "d.js": "js"})
+    second = deploy(manifest, "second")
+    assert tree(second) == {".nojekyll": "", "index.html": "new index", "a/b.css": "css", "d.js": "js"}
+    assert git("rev-parse", second + "^").strip() == first
+    assert git("log", "-1", "--format=%s", second).strip() == "second"
+    # The unchanged directory is reused
+    assert git("rev-parse", first + ":a") == git("rev-parse", second + ":a")
+
+    assert deploy(manifest) is None
+    assert git("rev-parse", "gh-pages").strip() == second
+
+    git("push", "-q", "origin", "gh-pages")
+    assert git("--git-dir", str(site.dirpath("remote.git")), "rev-parse", "gh-pages").strip() == second
+
+
+def test_unchanged_files_are_not_read(site, manifest):
+    build(manifest, {"index.html": "index", "other.html": "other"})
+    deploy(manifest)
+
+    # The manifest says other.html did not change, so its blob is reused
+    write(os.path.join("output", "other.html"), "not read")
+    write(os.path.join("output", "index.html"), "changed")
+    manifest.record(os.path.join("output", "index.html"), "render")
+    commit = deploy(manifest)
+
+    assert tree(commit)["other.html"] == "other"
+    assert tree(commit)["index.html"] == "changed"
+
+
+def test_executable_files(site, manifest):
+    build(manifest, {"run.sh": "#!/bin/sh"})
+    os.chmod(os.path.join("output", "run.sh"), 0o755)
+    commit = deploy(manifest)
+    assert git("ls-tree", commit, "run.sh").split()[0] == "100755"
@@ -0,0 +1,33 @@
+"""Test the caching of the global context."""
+
+import pytest
+
+from nikola import Nikola
+from nikola.utils import TranslatableSetting
+
+
+def test_translated_global_context(site):
+    assert site.translated_global_context("en")["blog_title"] == "Default Title"
+    assert site.translated_global_context("pl")["blog_title"] == "Domyślny tytuł"
+
+
+def test_base_template_context_follows_changes(site):
+    base = site._get_base_template_context("pl")
+    assert base["blog_title"] == "Domyślny tytuł"
+    assert base["translations_feedorder"] == ["pl", "en"]
+
+    site.GLOBAL_CONTEXT["blog_title"] = TranslatableSetting(
+        "BLOG_TITLE", "Changed Title", site.config["TRANSLATIONS"]
+    )
+    site.GLOBAL_CONTEXT["extra"] = "added by a plugin"
+    base = site._get_base_template_context("pl")
+    assert base["blog_title"] == "Changed Title"
+    assert base["extra"] == "added by a plugin"
+
+
+@pytest.fixture
+def site():
+    return Nikola(
+        TRANSLATIONS={"en": "", "pl": "./pl"},
+        BLOG_TITLE={"en": "Default Title", "pl": "Domyślny tytuł"},
+    )
@@ -0,0 +1,157 @@
+"""Test the cached Pygments highlighting."""
+
+import os
+
+import pygments
+import pygments.lexers
+import pytest
+
+from nikola import utils
+from nikola.nikola import Nikola
+from nikola.state import DiskCache
+from nikola.utils import LocaleBorg
+
+CODE = "def f(x):\n    return x\n"
+
+
+@pytest.fixture(autouse=True)
+def localeborg(default_locale):
+    # Line anchors are slugified in the current language
+    LocaleBorg.reset()
+    LocaleBorg.initialize({}, default_locale)
+    yield
+    LocaleBorg.reset()
+
+
+@pytest.fixture
+def cache(tmpdir):
+    cache = DiskCache(str(tmpdir.join("highlight")))
+    utils.set_highlight_cache(cache)
+    yield cache
+    utils.set_highlight_cache(None)
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    highlight = pygments.highlight
+
+    def counting_highlight(code, lexer, formatter):
+        calls.append(code)
+        return highlight(code, lexer, formatter)
+
+    monkeypatch.setattr(pygments, "highlight", counting_highlight)
+    return calls
+
+
+def python_lexer():
+    return pygments.lexers.get_lexer_by_name("python")
+
+
+def test_highlight_matches_pygments(cache):
+    formatter = utils.NikolaPygmentsHTML("a.py", linenos="table")
+    expected = pygments.highlight(CODE, python_lexer(), utils.NikolaPygmentsHTML("a.py", linenos="table"))
+    assert utils.highlight_code(CODE, python_lexer(), formatter) == expected
+    assert utils.highlight_code(CODE, python_lexer(), formatter) == expected
+
+
+def test_identical_code_is_highlighted_once(cache, calls):
+    first = utils.highlight_code(CODE, python_lexer(), utils.NikolaPygmentsHTML(linenos=False))
+    second = utils.highlight_code(CODE, python_lexer(), utils.NikolaPygmentsHTML(linenos=False))
+    assert first == second
+    assert calls == [CODE]
+
+
+def test_options_are_part_of_the_key(cache, calls):
+    utils.highlight_code(CODE, python_lexer(), utils.NikolaPygmentsHTML(linenos=False))
+    utils.highlight_code(CODE, python_lexer(), utils.NikolaPygmentsHTML(linenos="table"))
+    utils.highlight_code(CODE, pygments.lexers.get_lexer_by_name("text"), utils.NikolaPygmentsHTML(linenos=False))
+    assert len(calls) == 3
+
+
+def test_line_anchors_are_replaced_in_cached_output(cache, calls):
+    first = utils.highlight_code(CODE, python_lexer(), utils.NikolaPygmentsHTML("rest_code_a", linenos="table"))
+    second = utils.highlight_code(CODE, python_lexer(), utils.NikolaPygmentsHTML("rest_code_b", linenos="table"))
+    assert len(calls) == 1
+    assert "rest_code_a-1" in first and "rest_code_b" not in first
+    assert second == first.replace("rest_code_a", "rest_code_b")
+
+
+def test_site_cache_does_not_depend_on_cwd(tmpdir):
+    tmpdir.chdir()
+    site = Nikola(CACHE_FOLDER="cache")
+    assert utils._highlight_cache is site.highlight_cache
+
+    os.chdir(str(tmpdir.mkdir("elsewhere")))
+    utils.highlight_code(CODE, python_lexer(), utils.NikolaPygmentsHTML(linenos=False))
+    assert tmpdir.join("cache", "highlight").check(dir=1)
+    assert not tmpdir.join("elsewhere", "cache").check()
+
+
+def test_no_cache(calls):
+    utils.highlight_code(CODE, python_lexer(), utils.NikolaPygmentsHTML(linenos=False))
+    utils.highlight_code(CODE, python_lexer(), utils.NikolaPygmentsHTML(linenos=False))
+    assert len(calls) == 2
+
+
+def test_lexer_is_memoized_by_extension(monkeypatch):
+    lookups = []
+    get_lexer_for_filename = pygments.lexers.get_lexer_for_filename
+
+    def counting_get_lexer_for_filename(filename, *args, **kwargs):
+        lookups.append(filename)
+        return get_lexer_for_filename(filename, *args, **kwargs)
+
+    monkeypatch.setattr(utils, "_lexers_by_extension", {})
+    monkeypatch.setattr(pygments.lexers, "get_lexer_for_filename", counting_get_lexer_for_filename)
+    assert utils.get_lexer_for_file("a.py", CODE).name == "Python"
+    assert utils.get_lexer_for_file("b.py", CODE).name == "Python"
+    assert lookups == ["a.py"]
+
+
+@pytest.mark.parametrize(
+    "filename, name",
+    [("CMakeLists.txt", "CMake"), ("notes.txt", "Text only"), ("Makefile", "Makefile")],
+)
+def test_special_file_names(monkeypatch, filename, name):
+    monkeypatch.setattr(utils, "_lexers_by_extension", {})
+    assert utils.get_lexer_for_file("notes.txt", "").name == "Text only"
+    assert utils.get_lexer_for_file(filename, "").name == name
+
+
+def test_unknown_extensions_are_guessed_per_file(monkeypatch):
+    guesses = []
+    guess_lexer = pygments.lexers.guess_lexer
+
+    def counting_guess_lexer(code, **options):
+        guesses.append(code)
+        return guess_lexer(code, **options)
+
+    monkeypatch.setattr(utils, "_lexers_by_extension", {})
+    monkeypatch.setattr(utils, "_guessed_lexers", {})
+    monkeypatch.setattr(pygments.lexers, "guess_lexer", counting_guess_lexer)
+    bash = "#!/bin/bash\necho hello\n"
+    python = "#!/usr/bin/env python\nprint('hello')\n"
+    assert utils.get_lexer_for_file("a.nikolaunknown", bash).name == "Bash"
+    assert utils.get_lexer_for_file("b.nikolaunknown", python).name == "Python"
+    # Guesses are cached by content
+    assert utils.get_lexer_for_file("c.nikolaunknown", bash).name == "Bash"
+    assert guesses == [bash, python]
+
+
+def test_guess_lexer_passes_options(monkeypatch):
+    monkeypatch.setattr(utils, "_guessed_lexers", {})
+    code = "#!/bin/bash\necho options\n"
+    # Markdown's CodeHilite passes its options (like tab_length) to guess_lexer
+    assert utils.guess_lexer(code, tab_length=4).options["tab_length"] == 4
+    assert utils.guess_lexer(code, tab_length=8).options["tab_length"] == 8
+
+
+def test_guessed_lexer_is_cached(cache, monkeypatch):
+    monkeypatch.setattr(utils, "_guessed_lexers", {})
+    code = "#!/bin/bash\necho cached\n"
+    assert utils.guess_lexer(code).name == "Bash"
+
+    monkeypatch.setattr(utils, "_guessed_lexers", {})
+    monkeypatch.setattr(pygments.lexers, "guess_lexer", pytest.fail)
+    assert utils.guess_lexer(code).name == "Bash"
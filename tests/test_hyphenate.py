@@ -0,0 +1,36 @@
+"""Test hyphenation of posts."""
+
+import lxml.html
+import pytest
+
+from nikola.post import hyphenate
+
+pytest.importorskip("pyphen")
+
+HYPHENATED = "hy\u00adphen\u00adation"
+
+
+@pytest.mark.parametrize(
+    "html, expected",
+    [
+        ("<p>hyphenation</p>", "<p>{0}</p>".format(HYPHENATED)),
+        ("<p><em>hyphenation</em>hyphenation</p>", "<p><em>{0}</em>{0}</p>".format(HYPHENATED)),
+        # Nested nodes are only hyphenated once
+        ("<ul><li><p>hyphenation</p>hyphenation</li></ul>", "<ul><li><p>{0}</p>{0}</li></ul>".format(HYPHENATED)),
+        ("<p><span>hyphenation</span></p>", "<p><span>{0}</span></p>".format(HYPHENATED)),
+        # Nodes with code, and nodes in pre are not hyphenated
+        ("<p>hyphenation <code>hyphenation</code></p>", "<p>hyphenation <code>hyphenation</code></p>"),
+        ("<pre><span>hyphenation</span></pre>", "<pre><span>hyphenation</span></pre>"),
+        ('<p class="math">hyphenation</p>', '<p class="math">hyphenation</p>'),
+    ],
+)
+def test_hyphenate(html, expected):
+    document = lxml.html.fragment_fromstring(html, "body")
+    hyphenate(document, "en")
+    assert lxml.html.tostring(document, encoding="unicode") == "<body>{0}</body>".format(expected)
+
+
+def test_unknown_language():
+    document = lxml.html.fragment_fromstring("<p>hyphenation</p>", "body")
+    hyphenate(document, "xx")
+    assert lxml.html.tostring(document, encoding="unicode") == "<body><p>hyphenation</p></body>"
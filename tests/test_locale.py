@@ -96,6 +96,26 @@ def test_format_date_timezone(base_config):
     assert formatted_date == "January 10, 2006 at 12:34:56 PM -0500"
 
 
+def test_format_date_cache_keeps_timezones_apart(base_config):
+    new_york = datetime.datetime(
+        2006, 7, 10, 12, 34, 56, tzinfo=dateutil.tz.gettz("America/New_York")
+    )
+    # Same instant, different timezone
+    utc = new_york.astimezone(dateutil.tz.tzutc())
+    assert new_york == utc
+
+    assert LocaleBorg().formatted_date("long", new_york) == "July 10, 2006 at 12:34:56 PM -0400"
+    assert LocaleBorg().formatted_date("long", utc) == "July 10, 2006 at 4:34:56 PM UTC"
+    assert LocaleBorg().formatted_date("long", new_york) == "July 10, 2006 at 12:34:56 PM -0400"
+
+
+def test_format_date_cache_reset_on_initialize():
+    LocaleBorg.initialize({"en": "en_US"}, "en")
+    assert LocaleBorg().formatted_date("long", TESLA_BIRTHDAY_DT) == DT_EN_US
+    LocaleBorg.initialize({"en": "en_GB"}, "en")
+    assert LocaleBorg().formatted_date("long", TESLA_BIRTHDAY_DT) == "10 July 1856 at 12:34:56 UTC"
+
+
 @pytest.mark.parametrize(
     "english_variant, expected_date",
     [
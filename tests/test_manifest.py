@@ -0,0 +1,102 @@
+"""Test the output manifest."""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from nikola.manifest import OutputManifest, file_hash
+
+
+def task(name, targets):
+    return SimpleNamespace(name=name, targets=list(targets))
+
+
+def write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as outf:
+        outf.write(content)
+
+
+@pytest.fixture
+def output(tmpdir):
+    return str(tmpdir.join("output"))
+
+
+@pytest.fixture
+def manifest(tmpdir, output):
+    return OutputManifest(output, str(tmpdir.join("cache", "output_manifest.json")))
+
+
+class Reporter:
+    def __init__(self):
+        self.events = []
+
+    def skip_uptodate(self, task):
+        self.events.append(("skip_uptodate", task.name))
+
+    def add_success(self, task):
+        self.events.append(("add_success", task.name))
+
+    def complete_run(self):
+        self.events.append(("complete_run",))
+
+
+def test_record(manifest, output):
+    path = os.path.join(output, "a", "b.html")
+    write(path, "hello")
+    manifest.record(path, "render_pages:b")
+    manifest.record(os.path.join(output, "..", "outside.html"), "other")
+
+    assert list(manifest) == ["a/b.html"]
+    entry = manifest.get("a/b.html")
+    assert entry["size"] == 5
+    assert entry["hash"] == file_hash(path)
+    assert entry["task"] == "render_pages:b"
+
+
+def test_reporter_records_targets(manifest, output, tmpdir):
+    write(os.path.join(output, "a.html"), "a")
+    write(os.path.join(output, "b.html"), "b")
+    write(os.path.join(output, "stale.html"), "stale")
+    manifest.record(os.path.join(output, "stale.html"), "old")
+    tasks = [task("render:a", [os.path.join(output, "a.html")]), task("render:b", [os.path.join(output, "b.html")])]
+    manifest.start(tasks)
+
+    reporter = manifest.reporter_class(Reporter)()
+    reporter.add_success(tasks[0])
+    reporter.skip_uptodate(tasks[1])
+    reporter.complete_run()
+
+    assert reporter.events == [("add_success", "render:a"), ("skip_uptodate", "render:b"), ("complete_run",)]
+    saved = OutputManifest(output, manifest._path)
+    assert list(saved) == ["a.html", "b.html"]
+    assert saved.get("b.html")["task"] == "render:b"
+
+
+def test_refresh_hashes_changed_files(manifest, output):
+    path = os.path.join(output, "a.html")
+    write(path, "a")
+    manifest.record(path, "render:a")
+    write(path, "changed")
+    os.utime(path, (0, 0))
+    write(os.path.join(output, "gone.html"), "gone")
+    manifest.record(os.path.join(output, "gone.html"), "render:gone")
+    os.unlink(os.path.join(output, "gone.html"))
+
+    manifest.refresh()
+
+    assert list(manifest) == ["a.html"]
+    assert manifest.get("a.html")["hash"] == file_hash(path)
+
+
+def test_diff(manifest, output):
+    for name in ("same.html", "changed.html", "new.html"):
+        write(os.path.join(output, name), name)
+        manifest.record(os.path.join(output, name), "render")
+    old = manifest.hashes()
+    del old["new.html"]
+    old["changed.html"] = "0" * 64
+    old["removed.html"] = "1" * 64
+
+    assert manifest.diff(old) == (["changed.html", "new.html"], ["removed.html"])
@@ -7,8 +7,12 @@ import pytest
 
 from nikola.metadata_extractors import (
     MetaCondition,
+    MetaPriority,
+    MetaSource,
     check_conditions,
+    classify_extractor,
     default_metadata_extractors_by,
+    get_dispatcher,
     load_defaults,
 )
 from nikola.plugins.compile.rest import CompileRest
@@ -184,6 +188,48 @@ def test_check_conditions(conditions, dummy_post):
     assert check_conditions(dummy_post, filename, conditions, config, "")
 
 
+def test_extractor_dispatcher(metadata_extractors_by, dummy_post):
+    config = {"FILE_METADATA_REGEXP": None}
+    dispatcher = get_dispatcher(metadata_extractors_by, config)
+    assert get_dispatcher(metadata_extractors_by, config) is dispatcher
+
+    names = [
+        e.name for e in dispatcher.candidates(dummy_post, "foo.rst", "---\ntitle: x\n---\n")
+    ]
+    assert names == ["yaml", "nikola"]
+    names = [
+        e.name for e in dispatcher.candidates(dummy_post, "foo.rst", "+++\ntitle = 'x'\n+++\n")
+    ]
+    assert names == ["toml", "nikola"]
+    names = [e.name for e in dispatcher.candidates(dummy_post, "foo.rst", ".. title: x\n")]
+    assert names == ["nikola"]
+
+    # Configuration conditions are compiled in
+    config = {"FILE_METADATA_REGEXP": "(?P<title>.*)"}
+    names = [
+        e.name
+        for e in get_dispatcher(metadata_extractors_by, config).candidates(
+            dummy_post, "foo.rst", ".. title: x\n"
+        )
+    ]
+    assert names == ["nikola", "filename_regex"]
+
+    # New extractors invalidate the dispatch table
+    class MarkerExtractor:
+        name = "marker"
+        priority = MetaPriority.override
+        source = MetaSource.text
+        conditions = [(MetaCondition.first_line, "%%%"), (MetaCondition.extension, ".rst"), (MetaCondition.compiler, "foo")]
+
+        def check_requirements(self):
+            pass
+
+    classify_extractor(MarkerExtractor(), metadata_extractors_by)
+    dispatcher = get_dispatcher(metadata_extractors_by, config)
+    assert [e.name for e in dispatcher.candidates(dummy_post, "foo.rst", "%%%\n")][0] == "marker"
+    assert [e.name for e in dispatcher.candidates(dummy_post, "foo.md", "%%%\n")][0] == "nikola"
+
+
 class FakePost:
     def __init__(
         self, source_path, metadata_path, config, compiler, metadata_extractors_by
@@ -0,0 +1,204 @@
+"""Test the CSS, JavaScript and HTML minifiers."""
+
+import glob
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from nikola import filters, minifiers
+from nikola.minifiers import HTMLMinifyStats, minify_css, minify_html, minify_js
+
+THEMES = os.path.join(os.path.dirname(__file__), "..", "nikola", "data", "themes")
+
+
+def theme_assets(extension):
+    """Return the (non-symlinked) assets of the bundled themes with extension."""
+    paths = glob.glob(os.path.join(THEMES, "*", "assets", "*", "*" + extension))
+    return sorted(path for path in paths if not os.path.islink(path))
+
+
+def read(path):
+    with open(path, encoding="utf-8") as inf:
+        return inf.read()
+
+
+@pytest.mark.parametrize(
+    "css, expected",
+    [
+        ("a { color : red ; }", "a{color:red}"),
+        ("/* comment */ a{}", "a{}"),
+        ("/*! license */\na{}", "/*! license */ a{}"),
+        ("a, b > c ~ d + e {x: y}", "a,b>c~d + e{x:y}"),
+        # Descendant pseudo-classes and attribute selectors keep their space
+        ("a :hover, a [href] {x: y}", "a :hover,a [href]{x:y}"),
+        ("div\n\tp  span{}", "div p span{}"),
+        ("a { width: calc(100% - 2px) }", "a{width:calc(100% - 2px)}"),
+        ("a { margin: 0 auto !important; }", "a{margin:0 auto!important}"),
+        ('a:after { content: "  /* x */  "; }', 'a:after{content:"  /* x */  "}'),
+        ("a { background: url( a.png ) no-repeat }", "a{background:url( a.png ) no-repeat}"),
+        (
+            "@media screen and (max-width: 100px) { a :hover { x: y } }",
+            "@media screen and (max-width:100px){a :hover{x:y}}",
+        ),
+        ("@font-face { font-family : x; }", "@font-face{font-family:x}"),
+        (".sm\\:flex { x: y }", ".sm\\:flex{x:y}"),
+    ],
+)
+def test_minify_css(css, expected):
+    assert minify_css(css) == expected
+
+
+@pytest.mark.parametrize(
+    "css, expected",
+    [
+        ("a { color: #FFFFFF; }", "a{color:#FFF}"),
+        ("#aabbcc { color: #aabbcd; }", "#aabbcc{color:#aabbcd}"),
+        ("a { margin: 0px 0.50em 1.0px -0.5em; }", "a{margin:0 .5em 1px -.5em}"),
+        ("a { width: 0%; transition: 0s; }", "a{width:0%;transition:0s}"),
+        ("a { width: calc(0px + 1em); flex: 1 0px; }", "a{width:calc(0px + 1em);flex:1 0px}"),
+        ("a { --gap: 0px; }", "a{--gap:0px}"),
+        ("@media (min-width: 0.50em) { a { top: 0.0em } }", "@media (min-width:0.50em){a{top:0}}"),
+    ],
+)
+def test_minify_css_shorten(css, expected):
+    assert minify_css(css, shorten=True) == expected
+
+
+@pytest.mark.parametrize(
+    "js, expected",
+    [
+        ("var a = 1 ;  // comment\nvar b = 2;", "var a=1;var b=2;"),
+        ("/* comment */ f ( a , b )", "f(a,b)"),
+        ("/*! license */\nf()", "/*! license */\nf()"),
+        ("a = b\nc = d", "a=b\nc=d"),
+        # Automatic semicolon insertion after return
+        ("function f() {\n  return\n  x;\n}", "function f(){return\nx;}"),
+        ("a = b\n(c)", "a=b\n(c)"),
+        ("a = {\n  b: 1,\n  c: 2\n};", "a={b:1,c:2};"),
+        ("a + +b; a - -b; a++ + b; a + ++b", "a+ +b;a- -b;a++ +b;a+ ++b"),
+        ("a = b / c / d", "a=b/c/d"),
+        ("1 .toString()", "1 .toString()"),
+        ("x = 'a  //  b' + \"c /* d */\"", "x='a  //  b'+\"c /* d */\""),
+        ("x = /a  \\/\\/ [/]  b/g.test(y)", "x=/a  \\/\\/ [/]  b/g.test(y)"),
+        ("return /a b/.test(c)", "return/a b/.test(c)"),
+        ("x = `a  ${ {b: 1}.b }  // c`", "x=`a  ${ {b: 1}.b }  // c`"),
+        ("x = `a ${`b ${c}`} d` + e", "x=`a ${`b ${c}`} d`+e"),
+    ],
+)
+def test_minify_js(js, expected):
+    assert minify_js(js) == expected
+
+
+def significant_css_tokens(css):
+    tokens = [m.group() for m in minifiers._CSS_TOKEN_RE.finditer(css) if m.lastgroup not in ("space", "comment")]
+    # The minifier removes the semicolons ending blocks
+    return [token for token, next in zip(tokens, tokens[1:] + [None]) if not (token == ";" and next == "}")]
+
+
+def significant_js_tokens(js):
+    return [token for kind, token in minifiers._js_tokens(js) if kind not in ("space", "comment")]
+
+
+@pytest.mark.parametrize("path", theme_assets(".css"), ids=os.path.basename)
+def test_minify_theme_css(path):
+    css = read(path)
+    minified = minify_css(css)
+    assert significant_css_tokens(minified) == significant_css_tokens(css)
+    assert minify_css(minified) == minified
+    shortened = minify_css(css, shorten=True)
+    assert len(shortened) <= len(minified) <= len(css)
+    assert minify_css(shortened, shorten=True) == shortened
+
+
+@pytest.mark.parametrize("path", theme_assets(".js"), ids=os.path.basename)
+def test_minify_theme_js(path, tmpdir):
+    js = read(path)
+    minified = minify_js(js)
+    assert significant_js_tokens(minified) == significant_js_tokens(js)
+    assert minify_js(minified) == minified
+    assert len(minified) <= len(js)
+
+    node = shutil.which("node")
+    if node is None:
+        pytest.skip("node is not installed")
+    output = tmpdir.join("minified.js")
+    output.write_text(minified, "utf-8")
+    subprocess.check_call([node, "--check", str(output)])
+
+
+def test_minify_filters(tmpdir):
+    css = tmpdir.join("a.css")
+    css.write_text("a { color : #ffffff ; }", "utf-8")
+    filters.cssminify(str(css))
+    assert css.read_text("utf-8") == "a{color:#ffffff}"
+    filters.cssminify(str(css), shorten=True)
+    assert css.read_text("utf-8") == "a{color:#fff}"
+
+    js = tmpdir.join("a.js")
+    js.write_text("var a = 1 ;  // comment\n", "utf-8")
+    filters.jsminify(str(js))
+    assert js.read_text("utf-8") == "var a=1;"
+
+
+@pytest.mark.parametrize(
+    "html, expected",
+    [
+        ("<p>  a   <b>b</b>\n\n  <i>c</i>  </p>", "<p>a <b>b</b> <i>c</i></p>"),
+        ("<div>\n  <p>a</p>\n  <p>b</p>\n</div>", "<div><p>a</p><p>b</p></div>"),
+        ("<ul>\n  <li>a</li>\n  <li>b</li>\n</ul>", "<ul><li>a</li> <li>b</li></ul>"),
+        ("<p><img src=a> <img src=b></p>", "<p><img src=a> <img src=b></p>"),
+        ("<form><input>\n  <button>b</button></form>", "<form><input> <button>b</button></form>"),
+        ("<p>a <!-- comment --> b</p>", "<p>a b</p>"),
+        ("<p><!--[if IE]>ie<![endif]--></p>", "<p><!--[if IE]>ie<![endif]--></p>"),
+        ("<pre>  a\n    b  </pre>", "<pre>  a\n    b  </pre>"),
+        ("<textarea>  a  </textarea>", "<textarea>  a  </textarea>"),
+        ('<code><span class="pre">a   b</span></code>', '<code><span class="pre">a   b</span></code>'),
+        ("<p>a&nbsp;&nbsp; &lt;b&gt; &amp;</p>", "<p>a\xa0\xa0 &lt;b&gt; &amp;</p>"),
+        (
+            '<a href="/a/b.html" class="x y" title=\'say "hi"\' data-x="">a</a>',
+            '<a href=/a/b.html class="x y" title=\'say "hi"\' data-x>a</a>',
+        ),
+        ('<input type="checkbox" checked="checked" value="a=b">', '<input type=checkbox checked value="a=b">'),
+        ("<script>\n  var a = 1 ; // c\n</script>", "<script>var a=1;</script>"),
+        ('<script type="text/x-template"> <b> a </b> </script>', '<script type=text/x-template> <b> a </b> </script>'),
+        ("<style>\n  a { color : red ; }\n</style>", "<style>a{color:red}</style>"),
+    ],
+)
+def test_minify_html(html, expected):
+    assert minify_html(html) == expected
+
+
+def test_minify_html_document():
+    html = """<!DOCTYPE html>
+<html lang="en">
+  <head>
+    <meta charset="utf-8">
+    <title> A   title </title>
+  </head>
+  <body>
+    <p> Hello <em>world</em> </p>
+  </body>
+</html>
+"""
+    minified = minify_html(html)
+    assert minified == (
+        "<!DOCTYPE html><html lang=en><head><meta charset=utf-8><title>A title</title></head>"
+        "<body><p>Hello <em>world</em></p></body></html>"
+    )
+    assert minify_html(minified) == minified
+
+
+def test_html_minify_stats():
+    stats = HTMLMinifyStats()
+    stats.add(4096, 3072, 0.25)
+    stats.add(4096, 3072, 0.25)
+    assert stats.summary() == "2 pages, 2.0 kB saved (25.0% of 8.0 kB), 4 pages/s"
+
+
+def test_html_minify_filter(tmpdir):
+    html = tmpdir.join("a.html")
+    html.write_text("<!DOCTYPE html>\n<html><body>\n<p>  a  </p>\n</body></html>", "utf-8")
+    filters.html_minify(str(html))
+    assert html.read_text("utf-8") == "<!DOCTYPE html><html><body><p>a</p></body></html>"
@@ -0,0 +1,42 @@
+"""Test the build profiler."""
+
+from nikola.profiler import BuildProfiler, NullProfiler
+
+
+def test_spans_add_up():
+    profiler = BuildProfiler()
+    for _ in range(3):
+        with profiler.span("outer"):
+            with profiler.span("inner"):
+                pass
+
+    calls, wall, cpu = profiler.spans["outer"]
+    assert calls == 3
+    assert wall >= profiler.spans["inner"][1]
+
+
+def test_timed_iter():
+    profiler = BuildProfiler()
+    assert list(profiler.timed_iter("numbers", range(4))) == [0, 1, 2, 3]
+    # One span per item, plus the final StopIteration
+    assert profiler.spans["numbers"][0] == 5
+
+
+def test_null_profiler_records_nothing():
+    profiler = NullProfiler()
+    items = [1, 2]
+    assert profiler.timed_iter("items", items) is items
+    with profiler.span("nothing"):
+        pass
+    assert not profiler.enabled
+
+
+def test_write_report(tmpdir):
+    profiler = BuildProfiler()
+    with profiler.span("phase"):
+        pass
+    json_path, html_path = profiler.write_report(str(tmpdir.join("profile")))
+
+    assert tmpdir.join("profile", "build_profile.json").check()
+    with open(html_path) as inf:
+        assert "<td>phase</td>" in inf.read()
@@ -1,3 +1,4 @@
+import datetime
 import os
 import re
 from collections import defaultdict
@@ -8,6 +9,7 @@ import dateutil.tz
 import pytest
 from lxml import etree
 
+from nikola import utils
 from nikola.nikola import Nikola, Post
 from nikola.utils import LocaleBorg, TranslatableSetting
 
@@ -24,6 +26,103 @@ def test_feed_is_valid(rss_feed_content, rss_schema):
     assert rss_schema.validate(document)
 
 
+def test_feed_item_description_is_shared(default_locale):
+    post = mock.Mock()
+    post.meta = {default_locale: {}}
+    post.permalink.return_value = "/posts/post/"
+    post.text.return_value = '<p><a href="/foo/">foo</a></p>'
+    site = Nikola()
+
+    for _ in range(3):
+        description = site.feed_item_description(post, default_locale, True, False)
+        assert description == '<p><a href="https://example.com/foo/">foo</a></p>'
+    post.text.assert_called_once_with(
+        default_locale,
+        teaser_only=True,
+        strip_html=False,
+        feed_read_more_link=True,
+        feed_links_append_query=None,
+    )
+
+    site.feed_item_description(post, default_locale, False, False)
+    assert post.text.call_count == 2
+
+
+def test_streamed_feed_is_valid(rss_schema, tmpdir):
+    consumed = []
+
+    def items():
+        for i in range(100):
+            consumed.append(i)
+            yield {
+                "title": "Item {0}".format(i),
+                "link": "https://example.com/{0}/".format(i),
+                "description": "<p>Text & more {0}</p>".format(i),
+                "creator": "Nikola Tesla" if i % 2 else None,
+                "categories": ["foo", "bar"],
+                "guid": ("item-{0}".format(i), False) if i % 3 else "https://example.com/{0}/".format(i),
+                "pubDate": datetime.datetime(2020, 1, 1, tzinfo=dateutil.tz.tzoffset(None, 3600)),
+                "enclosure": ("https://example.com/{0}.mp3".format(i), 5, "audio/mpeg") if i % 5 else None,
+            }
+
+    channel = {
+        "title": "Title",
+        "link": "https://example.com/",
+        "description": "Description",
+        "language": "en",
+        "lastBuildDate": datetime.datetime(2020, 1, 2),
+        "generator": "Nikola",
+    }
+    output_path = os.path.join(str(tmpdir), "feed.xml")
+    utils.rss_stream_writer(output_path, channel, items(), self_url="https://example.com/feed.xml")
+    assert len(consumed) == 100
+
+    document = etree.parse(output_path)
+    assert rss_schema.validate(document)
+    items = document.findall("channel/item")
+    assert len(items) == 100
+    assert items[0].find("description").text == "<p>Text & more 0</p>"
+    assert items[0].find("pubDate").text == "Tue, 31 Dec 2019 23:00:00 GMT"
+    assert items[1].find("guid").get("isPermaLink") == "false"
+    assert items[1].find("{http://purl.org/dc/elements/1.1/}creator").text == "Nikola Tesla"
+    assert items[1].find("enclosure").get("length") == "5"
+    assert items[0].find("enclosure") is None
+
+
+def broken_items(first):
+    yield first
+    raise ValueError("broken post")
+
+
+def test_rss_stream_writer_keeps_old_feed_on_errors(tmpdir):
+    output_path = tmpdir.join("feed.xml")
+    output_path.write("old feed")
+    channel = {"title": "Title", "link": "https://example.com/", "description": "Description"}
+    with pytest.raises(ValueError):
+        utils.rss_stream_writer(str(output_path), channel, broken_items({"title": "First"}))
+    assert output_path.read() == "old feed"
+    assert tmpdir.listdir() == [output_path]
+
+
+def test_atom_stream_writer_keeps_old_feed_on_errors(tmpdir):
+    output_path = tmpdir.join("feed.atom")
+    output_path.write("old feed")
+    feed = {
+        "lang": "en",
+        "title": "Title",
+        "id": "https://example.com/",
+        "updated": "2020-01-01T00:00:00Z",
+        "author": "Nikola Tesla",
+        "links": [],
+        "generator": ("https://getnikola.com/", "Nikola"),
+    }
+    entry = dict(feed, published=feed["updated"], summary="Summary", type="text")
+    with pytest.raises(ValueError):
+        utils.atom_stream_writer(str(output_path), feed, broken_items(entry))
+    assert output_path.read() == "old feed"
+    assert tmpdir.listdir() == [output_path]
+
+
 @pytest.fixture
 def rss_schema(rss_schema_filename):
     with open(rss_schema_filename, "r") as rss_schema_file:
@@ -85,7 +184,7 @@ def localeborg(default_locale):
 
 
 @pytest.fixture
-def rss_feed_content(blog_url, config, default_locale):
+def rss_feed_content(blog_url, config, default_locale, tmpdir):
     default_post = {
         "title": "post title",
         "slug": "awesome_article",
@@ -117,28 +216,25 @@ def rss_feed_content(blog_url, config, default_locale):
                     FakeCompiler(),
                 )
 
-            filename = "testfeed.rss"
-            opener_mock = mock.mock_open()
-
-            with mock.patch("nikola.nikola.io.open", opener_mock, create=True):
-                Nikola().generic_rss_renderer(
-                    default_locale,
-                    "blog_title",
-                    blog_url,
-                    "blog_description",
-                    [example_post, ],
-                    filename,
-                    True,
-                    False,
-                )
-
-            opener_mock.assert_called_once_with(filename, "w+", encoding="utf-8")
+            filename = os.path.join(str(tmpdir), "testfeed.rss")
+            Nikola().generic_rss_renderer(
+                default_locale,
+                "blog_title",
+                blog_url,
+                "blog_description",
+                [example_post, ],
+                filename,
+                True,
+                False,
+            )
+
+            with open(filename, "r", encoding="utf-8") as inf:
+                file_content = inf.read()
 
             # Python 3 / unicode strings workaround
             # lxml will complain if the encoding is specified in the
             # xml when running with unicode strings.
             # We do not include this in our content.
-            file_content = [call[1][0] for call in opener_mock.mock_calls[2:-1]][0]
             splitted_content = file_content.split("\n")
             # encoding_declaration = splitted_content[0]
             content_without_encoding_declaration = splitted_content[1:]
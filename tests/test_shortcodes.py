@@ -1,9 +1,12 @@
 """Test shortcodes."""
 
+import os
+
 import pytest
 
 import nikola.utils
 from nikola import shortcodes
+from nikola.state import DiskCache
 
 
 @pytest.mark.parametrize(
@@ -166,6 +169,86 @@ def test_extract_shortcodes(input, expected, monkeypatch):
     assert extracted == expected
 
 
+@pytest.mark.parametrize("count", [10, 1000, 10000])
+def test_many_shortcodes(site, count, monkeypatch):
+    i = iter("SC%d" % i for i in range(count))
+    monkeypatch.setattr(shortcodes, "_new_sc_id", i.__next__)
+    template = "".join(
+        "<p>{{% noargs %}}</p>" if n % 2 else "<p>{{% arg n %}}x{{% /arg %}}</p>"
+        for n in range(count)
+    )
+
+    applied, _ = shortcodes.apply_shortcodes(template, site.shortcode_registry)
+    assert applied.count("<p>noargs  success!</p>") == count // 2
+    assert applied.count("<p>arg ('n',)/[]/x</p>") == count - count // 2
+
+    text, extracted = shortcodes.extract_shortcodes(template)
+    assert len(extracted) == count
+    assert text == "".join("<p>SC%d</p>" % n for n in range(count))
+
+
+def test_parsed_shortcodes_not_modified(site):
+    template = "{{% arg foo=bar %}}data{{% /arg %}}"
+    for _ in range(2):
+        applied, _ = shortcodes.apply_shortcodes(
+            template, site.shortcode_registry, extra_context={"extra": "x"}
+        )
+        assert applied == "arg ()/[('extra', 'x'), ('foo', 'bar')]/data"
+
+
+def test_pure_shortcode_cache(tmpdir):
+    calls = []
+
+    def handler(*args, **kwargs):
+        calls.append(args)
+        return "pure {0}{1}".format(args, kwargs["data"]), [str(dep)]
+
+    dep = tmpdir.join("dep.txt")
+    dep.write("x")
+    cache = DiskCache(str(tmpdir.join("cache")))
+    registry = {"pure": shortcodes.mark_pure(handler), "impure": handler}
+
+    def apply(template):
+        return shortcodes.apply_shortcodes(template, registry, lang="en", cache=cache)
+
+    assert apply("{{% pure a %}}b{{% /pure %}}") == ("pure ('a',)b", [str(dep)])
+    assert apply("{{% pure a %}}b{{% /pure %}}") == ("pure ('a',)b", [str(dep)])
+    assert len(calls) == 1
+
+    apply("{{% pure a %}}c{{% /pure %}}")
+    assert len(calls) == 2
+
+    apply("{{% impure a %}}b{{% /impure %}}")
+    apply("{{% impure a %}}b{{% /impure %}}")
+    assert len(calls) == 4
+
+    # Changed dependencies invalidate the cached output
+    dep.setmtime(dep.mtime() - 10)
+    apply("{{% pure a %}}b{{% /pure %}}")
+    assert len(calls) == 5
+
+
+def test_pure_shortcode_cache_is_pruned(tmpdir):
+    cache = DiskCache(str(tmpdir.join("cache")), max_size=1)
+    for key in ("a", "b", "c"):
+        cache.set(key, key * 100)
+    assert cache.writes == 3
+    assert cache.prune() == 3
+    assert [cache.get(key) for key in ("a", "b", "c")] == [None, None, None]
+
+    cache.max_size = 700
+    cache.set("old", "x" * 300)
+    cache.set("new", "y" * 300)
+    os.utime(cache._entry_path("old"), (0, 0))
+    os.utime(cache._entry_path("new"), (0, 10))
+    # Reading an entry marks it as recently used
+    assert cache.get("old") == "x" * 300
+    cache.set("newest", "z" * 300)
+    assert cache.prune() == 1
+    assert cache.get("new") is None
+    assert cache.get("old") == "x" * 300
+
+
 @pytest.fixture(scope="module")
 def site():
     s = FakeSiteWithShortcodeRegistry()
@@ -64,6 +64,14 @@ def test_disarmed(disarm_slugify, title, expected_slug):
     assert isinstance(o, str)
 
 
+def test_cached_slug_follows_use_slugify(disarm_slugify):
+    """Slugs are cached, but disarming slugify still changes them."""
+    assert nikola.utils.slugify("Hello World", lang="en") == "Hello World"
+    assert nikola.utils.slugify("Hello World", lang="en", force=True) == "hello-world"
+    nikola.utils.USE_SLUGIFY = True
+    assert nikola.utils.slugify("Hello World", lang="en") == "hello-world"
+
+
 @pytest.fixture
 def disarm_slugify():
     nikola.utils.USE_SLUGIFY = False
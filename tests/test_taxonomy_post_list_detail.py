@@ -0,0 +1,28 @@
+"""Test how much of their posts taxonomy post lists depend on."""
+
+import pytest
+
+from nikola.nikola import Nikola
+from nikola.plugin_categories import Taxonomy
+
+
+def test_taxonomy_default_depends_on_text():
+    # tagindex.tmpl (the default template) shows the text of posts
+    assert Taxonomy.post_list_detail == "text"
+
+
+@pytest.mark.parametrize("are_indexes, detail", [(False, "title"), (True, "text")])
+@pytest.mark.parametrize(
+    "plugin, setting",
+    [
+        ("classify_tags", "TAG_PAGES_ARE_INDEXES"),
+        ("classify_categories", "CATEGORY_PAGES_ARE_INDEXES"),
+        ("classify_authors", "AUTHOR_PAGES_ARE_INDEXES"),
+        ("classify_archive", "ARCHIVES_ARE_INDEXES"),
+    ],
+)
+def test_builtin_taxonomies(tmpdir, plugin, setting, are_indexes, detail):
+    site = Nikola(CACHE_FOLDER=str(tmpdir.join("cache")), **{setting: are_indexes})
+    site.init_plugins()
+    taxonomy = site.plugin_manager.getPluginByName(plugin, "Taxonomy").plugin_object
+    assert taxonomy.post_list_detail == detail
@@ -2,6 +2,7 @@
 Testing Nikolas utility functions.
 """
 
+import copy
 import os
 from unittest import mock
 
@@ -14,6 +15,8 @@ from nikola.post import get_meta
 from nikola.utils import (
     TemplateHookRegistry,
     TranslatableSetting,
+    changed_config_keys,
+    config_changed,
     demote_headers,
     get_asset_path,
     get_crumbs,
@@ -273,6 +276,24 @@ def test_TranslatableSetting_with_language_change():
     assert inp["zz"] == setting()
 
 
+def test_TranslatableSetting_string_attributes():
+    """String attributes are looked up on the value, the setting's own attributes are not."""
+    setting = TranslatableSetting("TestSetting", {"xx": "Fancy Blog"}, {"xx": ""})
+    setting.lang = "xx"
+
+    assert setting.upper() == "FANCY BLOG"
+    assert setting.name == "TestSetting"
+    with pytest.raises(AttributeError):
+        setting.no_such_attribute
+
+
+def test_TranslatableSetting_copy():
+    setting = TranslatableSetting("TestSetting", {"xx": "Fancy Blog", "zz": "Schmancy Blog"}, {"xx": "", "zz": ""})
+    copied = copy.deepcopy(setting)
+
+    assert copied("zz") == "Schmancy Blog"
+
+
 @pytest.mark.parametrize(
     "path, files_folders, expected_path_end",
     [
@@ -573,6 +594,43 @@ def test_write_metadata_fallbacks(post, arg):
     assert write_metadata(data, arg) == ".. title: xx\n\n"
 
 
+@pytest.mark.parametrize(
+    "old, new, expected_keys",
+    [
+        ({"a": 1, "b": 2}, {"a": 1, "b": 2}, []),
+        ({"a": 1, "b": 2}, {"a": 1, "b": 3}, ["b"]),
+        ({"a": 1}, {"a": 1, "b": 2}, ["b"]),
+        ({"g": {"title": "x", "lang": "en"}}, {"g": {"title": "y", "lang": "en"}}, ["g.title"]),
+        ({"posts": [{"t": 1}, {"t": 2}]}, {"posts": [{"t": 1}, {"t": 3}]}, ["posts[1].t"]),
+        ({"posts": [1, 2]}, {"posts": [1, 2, 3]}, ["posts"]),
+        ("foo", "bar", ["(all)"]),
+    ],
+)
+def test_changed_config_keys(old, new, expected_keys):
+    assert changed_config_keys(old, new) == expected_keys
+
+
+def test_config_changed_recorder():
+    recorded = {}
+
+    class Recorder:
+        def get(self, key):
+            return recorded.get(key)
+
+        def set(self, key, value):
+            recorded[key] = value
+
+    config_changed.set_recorder(Recorder())
+    try:
+        digest = config_changed({"title": "foo"}, "test")._calc_digest()
+    finally:
+        config_changed.set_recorder(None)
+    assert recorded == {digest: '{"title": "foo"}'}
+
+    config_changed({"title": "bar"}, "test")._calc_digest()
+    assert len(recorded) == 1
+
+
 @pytest.fixture
 def post():
     return FakePost()